@@ -0,0 +1,343 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Raider benchmark suite.
+
+Starts the stub server from ``benchmarks/server.py``, installs the
+project from ``benchmarks/project`` in a temporary RAIDERPATH, and
+measures the time spent in the main parts of Raider. Run it from the
+repository root:
+
+.. code-block:: bash
+
+    python benchmarks/run.py --output baseline.json
+    python benchmarks/run.py --compare baseline.json --threshold 0.2
+
+When comparing, the exit code is 1 if any benchmark got slower than
+the baseline by more than the threshold.
+
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+import requests
+
+from benchmarks.server import start_server
+from raider import Raider, __version__
+
+PROJECT = "benchmark"
+
+
+class Benchmarks:
+    """Class running the benchmarks and storing the results.
+
+    Attributes:
+      rounds:
+        An integer with the number of times each benchmark is run.
+      results:
+        A dictionary mapping the name of each benchmark to its
+        statistics.
+
+    """
+
+    def __init__(self, rounds: int) -> None:
+        """Initializes the Benchmarks object."""
+        self.rounds = rounds
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def measure(
+        self,
+        name: str,
+        function: Callable[[], Any],
+        rounds: Optional[int] = None,
+    ) -> None:
+        """Measures how long a function takes to run.
+
+        Args:
+          name:
+            A string with the name of the benchmark.
+          function:
+            The function to run.
+          rounds:
+            An optional integer to override the number of rounds.
+
+        """
+        samples: List[float] = []
+        for _ in range(rounds or self.rounds):
+            start = time.perf_counter()
+            function()
+            samples.append(time.perf_counter() - start)
+
+        self.results[name] = {
+            "unit": "s",
+            "higher_is_better": False,
+            "rounds": len(samples),
+            "median": statistics.median(samples),
+            "mean": statistics.mean(samples),
+            "min": min(samples),
+            "max": max(samples),
+        }
+        median = self.results[name]["median"]
+        print("{:<32} {:>10.3f}ms".format(name, median * 1000))
+
+    def throughput(
+        self, name: str, count: int, function: Callable[[], Any]
+    ) -> None:
+        """Measures how many items per second a function processes.
+
+        Args:
+          name:
+            A string with the name of the benchmark.
+          count:
+            An integer with the number of items processed by each call.
+          function:
+            The function to run.
+
+        """
+        samples: List[float] = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            function()
+            samples.append(count / (time.perf_counter() - start))
+
+        self.results[name] = {
+            "unit": "items/s",
+            "higher_is_better": True,
+            "rounds": len(samples),
+            "median": statistics.median(samples),
+            "mean": statistics.mean(samples),
+            "min": min(samples),
+            "max": max(samples),
+        }
+        median = self.results[name]["median"]
+        print("{:<32} {:>10.1f}/s".format(name, median))
+
+
+def install_project(config_dir: str) -> None:
+    """Copies the benchmark project in the Raider configuration directory."""
+    os.environ["RAIDERPATH"] = config_dir
+    project_dir = os.path.join(config_dir, "projects", PROJECT)
+    shutil.copytree(os.path.join(ROOT, "benchmarks", "project"), project_dir)
+
+
+def run_benchmarks(
+    base_url: str, rounds: int, fuzz_count: int
+) -> Dict[str, Any]:
+    """Runs all the benchmarks.
+
+    Args:
+      base_url:
+        A string with the URL of the stub server.
+      rounds:
+        An integer with the number of times each benchmark is run.
+      fuzz_count:
+        An integer with the number of payloads sent in each fuzzing
+        round.
+
+    Returns:
+      A dictionary with the results of each benchmark.
+
+    """
+    bench = Benchmarks(rounds)
+
+    bench.measure("project_load", lambda: Raider(PROJECT).project.load())
+
+    raider = Raider(PROJECT)
+    raider.project.load()
+    pconfig = raider.pconfig
+    flowstore = raider.flowstore
+
+    # Raider keeps the connections open, so compare with a Session too
+    session = requests.Session()
+    bench.measure(
+        "requests_session_get", lambda: session.get(base_url + "/page")
+    )
+    bench.measure(
+        "request_send", lambda: flowstore["get_page"].request.send(pconfig)
+    )
+    bench.results["request_send_overhead"] = {
+        "unit": "s",
+        "higher_is_better": False,
+        "rounds": rounds,
+        "median": max(
+            bench.results["request_send"]["median"]
+            - bench.results["requests_session_get"]["median"],
+            0.0,
+        ),
+    }
+
+    for flow, output in [
+        ("get_page", "regex"),
+        ("get_profile", "json"),
+        ("get_token", "html"),
+    ]:
+        bench.measure(
+            "flow_execute_" + output,
+            lambda flow=flow: flowstore[flow].execute(pconfig),
+        )
+
+    for flowgraph in [
+        "form_login",
+        "xsrf_challenge",
+        "multi_step",
+        "delayed_login",
+    ]:
+
+        def run_flowgraph(flowgraph: str = flowgraph) -> None:
+            if not flowstore.walk_flowgraph(pconfig, flowgraph):
+                raise RuntimeError(flowgraph + " didn't return (Success)")
+
+        bench.measure("flowgraph_" + flowgraph, run_flowgraph)
+
+    # The Flows above kept their last response, like while fuzzing
+    for flow in ["get_page", "get_token"]:
+        bench.measure(
+            "deepcopy_x100_" + flow,
+            lambda flow=flow: [
+                copy.deepcopy(flowstore[flow]) for _ in range(100)
+            ],
+        )
+        bench.measure(
+            "clone_x100_" + flow,
+            lambda flow=flow: [flowstore[flow].clone() for _ in range(100)],
+        )
+
+    fuzzer = raider.fuzz("search", "search_term")
+    fuzzer.generator = lambda value: (
+        "payload" + str(index) for index in range(fuzz_count)
+    )
+    bench.throughput("fuzz_throughput", fuzz_count, fuzzer.run)
+
+    return {
+        "meta": {
+            "raider": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": bench.results,
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Compares the results with a baseline.
+
+    Args:
+      current:
+        A dictionary with the new results.
+      baseline:
+        A dictionary with the results to compare with.
+      threshold:
+        A float with the allowed relative change, e.g. 0.2 for 20%.
+
+    Returns:
+      A list with the names of the benchmarks that regressed.
+
+    """
+    regressions = []
+    print()
+    print("{:<32} {:>12} {:>12} {:>9}".format("", "baseline", "current", ""))
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if not old or not old["median"]:
+            continue
+        change = result["median"] / old["median"] - 1
+        if result["higher_is_better"]:
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            "{:<32} {:>12.4g} {:>12.4g} {:>+8.1f}% {}".format(
+                name,
+                old["median"],
+                result["median"],
+                change * 100,
+                "REGRESSION" if regressed else "",
+            )
+        )
+    return regressions
+
+
+def main() -> None:
+    """Parses the arguments and runs the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--output", help="Save the results as JSON in this file."
+    )
+    parser.add_argument(
+        "--compare", help="Compare the results with this JSON file."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed relative slowdown when comparing (default 0.2).",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=20,
+        help="How many times to run each benchmark (default 20).",
+    )
+    parser.add_argument(
+        "--fuzz-count",
+        type=int,
+        default=200,
+        help="Payloads sent in each fuzzing round (default 200).",
+    )
+    args = parser.parse_args()
+
+    server = start_server()
+    base_url = "http://127.0.0.1:" + str(server.server_address[1])
+    os.environ["RAIDER_BENCHMARK_URL"] = base_url
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        install_project(config_dir)
+        results = run_benchmarks(base_url, args.rounds, args.fuzz_count)
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as outfile:
+            json.dump(results, outfile, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as infile:
+            baseline = json.load(infile)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Local HTTP server emulating authenticationtest.com for benchmarks.
+"""
+
+import json
+import secrets
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+USERS = {"bench@authenticationtest.com": "pa$$w0rd"}
+
+# Seconds the delayChallenge login waits before answering
+LOGIN_DELAY = 0.05
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler emulating the authenticationtest.com challenges."""
+
+    protocol_version = "HTTP/1.1"
+    # Send each response in one write, so keep-alive connections don't
+    # wait for the delayed ACK between the headers and the body
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    sessions: Dict[str, Dict[str, str]] = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args) -> None:  # pylint: disable=W0221
+        """Silences the request logging."""
+
+    def session(self) -> Optional[Dict[str, str]]:
+        """Returns the data of the session from the PHPSESSID cookie."""
+        for item in self.headers.get("Cookie", "").split(";"):
+            name, _, value = item.strip().partition("=")
+            if name == "PHPSESSID":
+                return self.sessions.get(value)
+        return None
+
+    def new_session(self) -> str:
+        """Creates a new session and returns its ID."""
+        session_id = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[session_id] = {}
+        return session_id
+
+    def form(self) -> Dict[str, str]:
+        """Returns the urlencoded body parameters."""
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8")
+        return dict(urllib.parse.parse_qsl(body))
+
+    def reply(
+        self,
+        status: int = 200,
+        body: str = "",
+        headers: Optional[Dict[str, str]] = None,
+        content_type: str = "text/html",
+    ) -> None:
+        """Sends the response."""
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def redirect(self, success: bool, session_id: str = "") -> None:
+        """Redirects to the success page, or refuses the login.
+
+        Unlike authenticationtest.com, failed logins return 403 so the
+        hyfiles can tell them apart with the Http operation.
+
+        """
+        if not success:
+            self.reply(403, body="<html><p>Login failed</p></html>")
+            return
+        headers = {"Location": "/loginSuccess/"}
+        if session_id:
+            headers["Set-Cookie"] = "PHPSESSID=" + session_id + "; path=/"
+        self.reply(302, headers=headers)
+
+    def do_GET(self) -> None:  # pylint: disable=C0103
+        """Handles GET requests."""
+        path = urllib.parse.urlparse(self.path)
+        query = dict(urllib.parse.parse_qsl(path.query))
+
+        if path.path in ("/xsrfChallenge/", "/multiStepAuth/"):
+            session_id = self.new_session()
+            token = secrets.token_hex(16)
+            self.sessions[session_id]["token"] = token
+            self.reply(
+                body=(
+                    "<html><body><form method='post'>"
+                    "<input type='hidden' name='xsrfToken' id='xsrfToken' "
+                    "value='" + token + "'>"
+                    "<input name='email'><input name='password'>"
+                    "</form></body></html>"
+                ),
+                headers={"Set-Cookie": "PHPSESSID=" + session_id + "; path=/"},
+            )
+        elif path.path == "/api/profile":
+            self.reply(
+                body=json.dumps(
+                    {"user": {"id": 1, "email": "user@example.com"}}
+                ),
+                content_type="application/json",
+            )
+        elif path.path == "/search":
+            term = query.get("q", "")
+            status = 404 if len(term) % 7 else 200
+            self.reply(
+                status, body="<html><p>Results for " + term + "</p></html>"
+            )
+        else:
+            self.reply(body="<html><p id='page'>" + path.path + "</p></html>")
+
+    def do_POST(self) -> None:  # pylint: disable=C0103
+        """Handles POST requests."""
+        path = urllib.parse.urlparse(self.path)
+        query = dict(urllib.parse.parse_qsl(path.query))
+        form = self.form()
+        valid = USERS.get(form.get("email", "")) == form.get("password")
+
+        if path.path == "/multiStepAuth/" and query.get("step") == "2":
+            session = self.session()
+            if session is not None:
+                session["email"] = form.get("email", "")
+            self.reply(body="<html><p>Step 2</p></html>")
+        elif path.path == "/login/":
+            mode = query.get("mode")
+            session = self.session()
+            if mode == "xsrfChallenge":
+                valid = valid and session is not None
+                valid = valid and session.get("token") == form.get("xsrfToken")
+            elif mode == "multiChallenge":
+                valid = valid and session is not None
+                valid = valid and session.get("email") == form.get("email")
+            elif mode == "delayChallenge":
+                time.sleep(LOGIN_DELAY)
+            self.redirect(valid, self.new_session() if valid else "")
+        else:
+            self.reply(404)
+
+
+def start_server(port: int = 0) -> ThreadingHTTPServer:
+    """Starts the stub server in a background thread.
+
+    Args:
+      port:
+        An integer with the port to listen on. A free port is chosen
+        when set to 0.
+
+    Returns:
+      The running server. Use ``server.server_address`` to get the
+      port, and ``server.shutdown()`` to stop it.
+
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
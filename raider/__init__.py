@@ -1,12 +1,29 @@
 """Import stuff for external access.
 """
 
+from importlib import import_module
+from typing import Any
+
 from raider.__version__ import __version__
-from raider.config import Config
-from raider.flow import Flow
-from raider.flowgraph import FlowGraph
-from raider.flowstore import FlowStore
-from raider.projects import Project
-from raider.raider import Raider
-from raider.request import Request
-from raider.user import User
+
+# Imported on first access, so modules like raider.client don't have to
+# load hy and the rest of Raider
+_EXPORTS = {
+    "Config": "raider.config",
+    "Flow": "raider.flow",
+    "FlowGraph": "raider.flowgraph",
+    "FlowStore": "raider.flowstore",
+    "Project": "raider.projects",
+    "Raider": "raider.raider",
+    "Request": "raider.request",
+    "User": "raider.user",
+}
+
+__all__ = ["__version__", *_EXPORTS]
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the classes exported by the package when first used."""
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name]), name)
+    raise AttributeError("module 'raider' has no attribute " + repr(name))
@@ -0,0 +1,212 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Anomaly detection over the results of fuzzing.
+"""
+
+import logging
+import sys
+from typing import Any, Dict, List, Optional
+
+from raider.results import ResultStore
+from raider.utils import colored_text
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Numeric features compared between the responses
+FEATURES = ("length", "words", "lines", "latency")
+
+# Scale making the MAD comparable to the standard deviation
+MAD_SCALE = 0.6745
+
+
+def robust_scores(values: "np.ndarray") -> "np.ndarray":
+    """Returns the modified z-scores of each column.
+
+    The scores use the median and the median absolute deviation (MAD)
+    instead of the mean and the standard deviation, so a few extreme
+    values don't hide the other outliers. Columns where more than half
+    of the values are the same have a MAD of 0, and use the mean
+    absolute deviation instead.
+
+    Args:
+      values:
+        A two dimensional array with one row per response and one
+        column per feature.
+
+    Returns:
+      An array with the absolute scores, with the same shape.
+
+    """
+    median = np.nanmedian(values, axis=0)
+    deviation = np.abs(values - median)
+    mad = np.nanmedian(deviation, axis=0) / MAD_SCALE
+    mean_ad = np.nanmean(deviation, axis=0) * 1.2533
+    scale = np.where(mad > 0, mad, mean_ad)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(scale > 0, deviation / scale, 0.0)
+    return np.nan_to_num(scores)
+
+
+def z_scores(values: "np.ndarray") -> "np.ndarray":
+    """Returns the absolute z-scores of each column."""
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(std > 0, np.abs(values - mean) / std, 0.0)
+    return np.nan_to_num(scores)
+
+
+def find_anomalies(
+    store: ResultStore,
+    run: Optional[int] = None,
+    threshold: float = 3.5,
+    limit: Optional[int] = 50,
+) -> List[Dict[str, Any]]:
+    """Ranks the fuzzing results by how anomalous they are.
+
+    All the results of the run are loaded in NumPy arrays and scored
+    at once:
+
+    * The length, word and line counts and the latency get robust
+      z-scores based on the median and the MAD. Standard z-scores are
+      reported too.
+    * Responses are clustered by their status code, length, word and
+      line counts. Responses in small clusters are rare, and get a
+      higher score.
+    * Failed requests are always reported.
+
+    The score of a response is its highest robust z-score plus the
+    rarity of its cluster, measured as ``-log10`` of the cluster's
+    share of the results.
+
+    Args:
+      store:
+        The :class:`ResultStore <raider.results.ResultStore>` with the
+        results.
+      run:
+        An optional integer with the ID of the run. The last one is
+        used if not set.
+      threshold:
+        A float with the lowest score of the reported results.
+      limit:
+        An optional integer with the maximum number of results.
+
+    Returns:
+      A list of dictionaries with the ``position``, the ``payload``,
+      the ``status``, the features, the ``score``, the
+      ``cluster_size`` and the ``reasons`` why the result is
+      anomalous, starting with the highest score.
+
+    """
+    if np is None:
+        logging.critical(
+            "NumPy is needed for the analysis. "
+            "Install it with: pip install raider[analysis]"
+        )
+        sys.exit()
+
+    rows = store.columns(
+        "position", "payload", "status", *FEATURES, "error", run=run
+    )
+    if not rows:
+        return []
+
+    table = np.array(rows, dtype=object)
+    table[table == None] = np.nan  # noqa: E711
+    positions = table[:, 0].astype(np.int64)
+    payloads = table[:, 1]
+    errors = table[:, -1]
+    status = np.nan_to_num(table[:, 2].astype(np.float64), nan=-1)
+    status = status.astype(np.int64)
+    values = table[:, 3:-1].astype(np.float64)
+    failed = status < 0
+
+    feature_scores = np.zeros_like(values)
+    zscores = np.zeros_like(values)
+    if not failed.all():
+        feature_scores[~failed] = robust_scores(values[~failed])
+        zscores[~failed] = z_scores(values[~failed])
+
+    # Cluster the responses with the same status and body features
+    signatures = np.column_stack([status, np.nan_to_num(values[:, :3])])
+    _, inverse, counts = np.unique(
+        signatures, axis=0, return_inverse=True, return_counts=True
+    )
+    cluster_sizes = counts[inverse.reshape(-1)]
+    rarity = -np.log10(cluster_sizes / len(rows))
+
+    scores = feature_scores.max(axis=1) + rarity
+    scores[failed] = np.inf
+
+    selected = np.flatnonzero(scores >= threshold)
+    selected = selected[np.argsort(-scores[selected], kind="stable")]
+    if limit is not None:
+        selected = selected[:limit]
+
+    anomalies = []
+    for index in selected:
+        reasons = []
+        if failed[index]:
+            reasons.append("failed: " + str(errors[index]))
+        for column, feature in enumerate(FEATURES):
+            if feature_scores[index, column] >= threshold:
+                reasons.append(
+                    "{} {:g} (robust z {:.1f}, z {:.1f})".format(
+                        feature,
+                        values[index, column],
+                        feature_scores[index, column],
+                        zscores[index, column],
+                    )
+                )
+        if rarity[index] >= 1:
+            reasons.append("cluster of " + str(cluster_sizes[index]))
+        anomaly = {
+            "position": int(positions[index]),
+            "payload": payloads[index],
+            "status": int(status[index]) if not failed[index] else None,
+            "score": float(scores[index]),
+            "cluster_size": int(cluster_sizes[index]),
+            "reasons": reasons,
+        }
+        for column, feature in enumerate(FEATURES):
+            anomaly[feature] = float(values[index, column])
+        anomalies.append(anomaly)
+    return anomalies
+
+
+def print_anomalies(anomalies: List[Dict[str, Any]]) -> None:
+    """Prints the anomalies returned by :func:`find_anomalies`."""
+    print(
+        colored_text(
+            "{:>7} {:>9} {:>6}  {}".format(
+                "Score", "Position", "Status", "Payload"
+            ),
+            "BLUE-BLACK-B",
+        )
+    )
+    for anomaly in anomalies:
+        print(
+            "{:>7.1f} {:>9} {:>6}  {}".format(
+                anomaly["score"],
+                anomaly["position"],
+                str(anomaly["status"]),
+                anomaly["payload"],
+            )
+        )
+        print("{:>25}{}".format("", "; ".join(anomaly["reasons"])))
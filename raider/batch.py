@@ -0,0 +1,504 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Running FlowGraphs for many projects in parallel.
+"""
+
+import io
+import json
+import logging
+import multiprocessing
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from raider.raider import Raider
+from raider.transport import TransportError
+
+
+class BatchError(Exception):
+    """Raised when a batch job can't be run."""
+
+
+class BatchJob:
+    """Class holding one project to run in a batch.
+
+    Attributes:
+      project:
+        A string with the name of the project.
+      flows:
+        A string with the comma separated names of the Flows and
+        FlowGraphs to run.
+      test:
+        A boolean, True to also run the FlowGraphs' test Flows.
+      users:
+        A boolean, True to run the FlowGraph once for every user, like
+        with ``raider run --users``.
+
+    """
+
+    def __init__(
+        self,
+        project: str,
+        flows: str = "DEFAULT",
+        test: bool = False,
+        users: bool = False,
+    ) -> None:
+        """Initializes the BatchJob object.
+
+        Args:
+          project:
+            A string with the name of the project.
+          flows:
+            A string with the comma separated names of the Flows and
+            FlowGraphs to run.
+          test:
+            A boolean, True to also run the FlowGraphs' test Flows.
+          users:
+            A boolean, True to run the FlowGraph for every user.
+
+        """
+        self.project = project
+        self.flows = flows
+        self.test = test
+        self.users = users
+
+    @classmethod
+    def from_manifest(cls, item: Any, defaults: Dict[str, Any]) -> "BatchJob":
+        """Creates a job from an item in the manifest.
+
+        Args:
+          item:
+            Either a string with the project name, or a dictionary with
+            the "project" and optionally "flows", "test" and "users".
+          defaults:
+            A dictionary with the values used when they aren't set in
+            the item.
+
+        Returns:
+          The :class:`BatchJob` object.
+
+        Raises:
+          BatchError: If the item isn't valid.
+
+        """
+        if isinstance(item, str):
+            item = {"project": item}
+        if not isinstance(item, dict) or not item.get("project"):
+            raise BatchError("Invalid manifest entry: " + repr(item))
+        options = {**defaults, **item}
+        unknown = set(options) - {"project", "flows", "test", "users"}
+        if unknown:
+            raise BatchError(
+                "Unknown manifest options: " + ", ".join(sorted(unknown))
+            )
+        return cls(**options)
+
+
+class BatchResult:
+    """Class holding the result of a :class:`BatchJob`.
+
+    Attributes:
+      project:
+        A string with the name of the project.
+      flows:
+        A string with the Flows and FlowGraphs which were run.
+      status:
+        A string, "success" if all Flows and FlowGraphs succeeded,
+        "failure" if one returned (Failure) or didn't return (Success),
+        and "error" if the project couldn't be loaded or run.
+      error:
+        An optional string with the error message.
+      load_time:
+        A float with the seconds spent loading the project.
+      run_time:
+        A float with the seconds spent running the Flows.
+      users:
+        A dictionary with the number of users for each result, when
+        the job ran the FlowGraph for every user.
+      output:
+        A string with what the job printed and logged.
+
+    """
+
+    def __init__(self, project: str, flows: str) -> None:
+        """Initializes the BatchResult object."""
+        self.project = project
+        self.flows = flows
+        self.status = "error"
+        self.error: Optional[str] = None
+        self.load_time = 0.0
+        self.run_time = 0.0
+        self.users: Dict[str, int] = {}
+        self.output = ""
+
+    @property
+    def duration(self) -> float:
+        """Returns the total seconds spent on the job."""
+        return self.load_time + self.run_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the result as a dictionary, used in the report."""
+        return {
+            "project": self.project,
+            "flows": self.flows,
+            "status": self.status,
+            "error": self.error,
+            "load_time": round(self.load_time, 3),
+            "run_time": round(self.run_time, 3),
+            "users": self.users,
+            "output": self.output,
+        }
+
+
+def load_manifest(filename: str) -> Tuple[List[BatchJob], Optional[int]]:
+    """Loads the jobs from a JSON manifest.
+
+    The manifest is either a list of projects, or a dictionary with the
+    "projects" list, the optional "defaults" for all of them, and the
+    number of "jobs" to run in parallel:
+
+    .. code-block:: json
+
+        {
+          "jobs": 8,
+          "defaults": {"flows": "authentication", "test": true},
+          "projects": [
+            "juiceshop",
+            {"project": "reddit", "flows": "DEFAULT"},
+            {"project": "nextcloud", "users": true}
+          ]
+        }
+
+    Args:
+      filename:
+        A string with the path of the manifest.
+
+    Returns:
+      A tuple with the list of :class:`BatchJob` objects, and the
+      number of parallel jobs if it's set in the manifest.
+
+    Raises:
+      BatchError: If the manifest can't be read or isn't valid.
+
+    """
+    try:
+        with open(filename, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError) as err:
+        raise BatchError("Cannot read " + filename + ": " + str(err)) from err
+
+    if isinstance(manifest, list):
+        manifest = {"projects": manifest}
+    if not isinstance(manifest, dict):
+        raise BatchError(filename + " should contain a list or an object")
+    defaults = manifest.get("defaults", {})
+    jobs = [
+        BatchJob.from_manifest(item, defaults)
+        for item in manifest.get("projects", [])
+    ]
+    return jobs, manifest.get("jobs")
+
+
+def run_job(job: BatchJob, proxy: bool = False) -> BatchResult:
+    """Loads a project and runs its Flows and FlowGraphs.
+
+    Runs in a worker process. Nothing is allowed to escape: errors and
+    calls to ``sys.exit`` end the job, and are recorded in the result.
+
+    Args:
+      job:
+        The :class:`BatchJob` to run.
+      proxy:
+        A boolean, True to send the requests through the web proxy.
+
+    Returns:
+      The :class:`BatchResult` of the job.
+
+    """
+    result = BatchResult(job.project, job.flows)
+    output = io.StringIO()
+    started = time.monotonic()
+    loaded = None
+    try:
+        with redirect_stdout(output), redirect_stderr(output):
+            # The Raider object adds a handler writing to the output
+            logging.getLogger("raider").handlers.clear()
+            logging.getLogger().addHandler(logging.StreamHandler())
+
+            raider = Raider(job.project)
+            if not raider.project:
+                raise BatchError(job.project + " doesn't exist")
+            if proxy:
+                raider.gconfig.use_proxy = True
+            raider.project.load()
+            loaded = time.monotonic()
+            result.load_time = loaded - started
+            result.status = run_flows(raider, job, result)
+            raider.project.write_project_file()
+    except SystemExit as err:
+        result.status = "error"
+        result.error = "Exited"
+        if err.code not in (None, 0):
+            result.error += " with " + str(err.code)
+    except (BatchError, TransportError) as err:
+        result.status = "error"
+        result.error = str(err)
+    except Exception as err:  # pylint: disable=broad-except
+        result.status = "error"
+        result.error = repr(err)
+        output.write(traceback.format_exc())
+
+    finished = time.monotonic()
+    if loaded is None:
+        result.load_time = finished - started
+    else:
+        result.run_time = finished - loaded
+    result.output = output.getvalue()
+    return result
+
+
+def run_flows(raider: Raider, job: BatchJob, result: BatchResult) -> str:
+    """Runs the job's Flows and FlowGraphs with a loaded project.
+
+    Unlike :meth:`Raider.run <raider.raider.Raider.run>`, a Flow or
+    FlowGraph which doesn't succeed ends the job instead of exiting.
+
+    Args:
+      raider:
+        The :class:`Raider <raider.raider.Raider>` object of the
+        project.
+      job:
+        The :class:`BatchJob` to run.
+      result:
+        The :class:`BatchResult` where the users' results are stored.
+
+    Returns:
+      A string with the status of the job.
+
+    Raises:
+      BatchError: If a Flow or FlowGraph isn't defined.
+
+    """
+    flowstore = raider.flowstore
+    pconfig = raider.pconfig
+
+    if job.users:
+        result.users = raider.run_users(job.flows, resume=False)
+        if set(result.users) - {"success"}:
+            result.error = "Not all users succeeded"
+            return "failure"
+        return "success"
+
+    for name in job.flows.split(","):
+        if flowstore.is_flow(name):
+            if flowstore.run_flow(pconfig, name) is False:
+                result.error = "Flow " + name + " returned (Failure)"
+                return "failure"
+        elif flowstore.is_flowgraph(name):
+            if flowstore.walk_flowgraph(pconfig, name) is not True:
+                result.error = "FlowGraph " + name + " didn't return (Success)"
+                return "failure"
+            flowgraph = flowstore.flowgraphs[name]
+            if job.test and flowgraph.test:
+                flow_id = flowstore.get_flow_id_by_flow(flowgraph.test)
+                outcome = flowstore.run_flow(pconfig, flow_id)
+                if not isinstance(outcome, bool):
+                    raise BatchError(
+                        "FlowGraph's test flow must return (Success) or "
+                        "(Failure)"
+                    )
+                flowgraph.completed = outcome
+                if not outcome:
+                    result.error = "Test of " + name + " failed"
+                    return "failure"
+        else:
+            raise BatchError(name + " not defined, cannot run!")
+    return "success"
+
+
+def run_job_arguments(
+    arguments: Tuple[int, BatchJob, bool]
+) -> Tuple[int, BatchResult]:
+    """Runs a job with the arguments from the pool's queue.
+
+    The job's index is returned with the result, since the results
+    arrive in the order the jobs finish.
+
+    """
+    index, job, proxy = arguments
+    return index, run_job(job, proxy)
+
+
+class BatchRunner:
+    """Class running the FlowGraphs of many projects in parallel.
+
+    Each :class:`BatchJob` runs in its own process, with at most
+    ``workers`` processes at once. A process only runs one job, so the
+    projects can't affect each other through the state hy or the
+    :term:`hyfiles` leave behind, and a job which crashes or exits
+    only ends itself.
+
+    .. code-block:: python
+
+        runner = BatchRunner(
+            [BatchJob("juiceshop"), BatchJob("reddit", "login")],
+            workers=8,
+        )
+        results = runner.run()
+        runner.print_report()
+
+    Attributes:
+      jobs:
+        A list with the :class:`BatchJob` objects.
+      workers:
+        An integer with the maximum number of projects run at once.
+      proxy:
+        A boolean, True to send the requests through the web proxy.
+      results:
+        A list with the :class:`BatchResult` objects, in the same order
+        as the jobs.
+      elapsed:
+        A float with the seconds the whole batch took.
+
+    """
+
+    def __init__(
+        self, jobs: List[BatchJob], workers: int = 4, proxy: bool = False
+    ) -> None:
+        """Initializes the BatchRunner object.
+
+        Args:
+          jobs:
+            A list with the :class:`BatchJob` objects.
+          workers:
+            An integer with the maximum number of projects run at once.
+          proxy:
+            A boolean, True to send the requests through the web proxy.
+
+        """
+        self.jobs = jobs
+        self.workers = max(1, min(workers, len(jobs) or 1))
+        self.proxy = proxy
+        self.results: List[BatchResult] = []
+        self.elapsed = 0.0
+
+    def run(
+        self, callback: Optional[Callable[[BatchResult], None]] = None
+    ) -> List[BatchResult]:
+        """Runs all the jobs.
+
+        Args:
+          callback:
+            An optional function called with each :class:`BatchResult`
+            as soon as its job finishes.
+
+        Returns:
+          A list with the :class:`BatchResult` objects, in the same
+          order as the jobs.
+
+        """
+        started = time.monotonic()
+        results: Dict[int, BatchResult] = {}
+        arguments = [
+            (index, job, self.proxy) for index, job in enumerate(self.jobs)
+        ]
+        with multiprocessing.Pool(self.workers, maxtasksperchild=1) as pool:
+            for index, result in pool.imap_unordered(
+                run_job_arguments, arguments
+            ):
+                results[index] = result
+                if callback:
+                    callback(result)
+        self.results = [results[index] for index in range(len(self.jobs))]
+        self.elapsed = time.monotonic() - started
+        return self.results
+
+    @property
+    def failed(self) -> List[BatchResult]:
+        """Returns the results of the jobs which didn't succeed."""
+        return [
+            result for result in self.results if result.status != "success"
+        ]
+
+    def report(self) -> Dict[str, Any]:
+        """Returns the aggregated report of the batch.
+
+        Returns:
+          A dictionary with the number of jobs for each status, the
+          timings of the batch, and the results of each job.
+
+        """
+        statuses: Dict[str, int] = {}
+        for result in self.results:
+            statuses[result.status] = statuses.get(result.status, 0) + 1
+        durations = sorted(result.duration for result in self.results)
+        return {
+            "projects": len(self.results),
+            "workers": self.workers,
+            "statuses": statuses,
+            "elapsed": round(self.elapsed, 3),
+            "total_time": round(sum(durations), 3),
+            "slowest": round(durations[-1], 3) if durations else 0.0,
+            "results": [result.to_dict() for result in self.results],
+        }
+
+    def save_report(self, filename: str) -> None:
+        """Saves the aggregated report as JSON.
+
+        Args:
+          filename:
+            A string with the path of the JSON file.
+
+        """
+        with open(filename, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+
+    def print_report(self) -> None:
+        """Prints a table with the results and the timings."""
+        width = max([len(result.project) for result in self.results] + [7])
+        print(
+            "Project".ljust(width)
+            + "  Status   "
+            + "    Load"
+            + "     Run"
+            + "   Total"
+        )
+        for result in self.results:
+            print(
+                result.project.ljust(width)
+                + "  "
+                + result.status.ljust(9)
+                + "{:8.2f}{:8.2f}{:8.2f}".format(
+                    result.load_time, result.run_time, result.duration
+                )
+                + ("  " + result.error if result.error else "")
+            )
+
+        report = self.report()
+        print(
+            str(report["projects"])
+            + " projects in "
+            + "{:.2f}".format(self.elapsed)
+            + "s with "
+            + str(self.workers)
+            + " workers ("
+            + ", ".join(
+                str(count) + " " + status
+                for status, count in sorted(report["statuses"].items())
+            )
+            + ")"
+        )
@@ -0,0 +1,288 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Checkpoints used to resume interrupted fuzzing runs.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+
+class Checkpoint:
+    """Class saving the progress of a fuzzing run.
+
+    The checkpoint is a JSON file with everything needed to continue
+    the run: the ``settings`` it was started with, the ``offset`` of
+    the fuzzing strings, the strings completed after the offset, the
+    ones which failed, and the size of the files the :class:`Save
+    <raider.operations.Save>` operations append to.
+
+    The progress is tracked by position in the shard, so concurrent
+    workers can finish out of order. Everything before ``offset`` is
+    done, and the positions after it which are done too are kept in
+    ``done``. Each shard of a run should use its own file, so several
+    processes can work on the same run.
+
+    The file is replaced atomically, so an interrupted run always
+    leaves a complete checkpoint behind. While saving, no worker runs
+    the operations, so the recorded file sizes match the completed
+    positions. When resuming, the output files are truncated to these
+    sizes, and only the positions which weren't completed are sent.
+
+    Attributes:
+      filename:
+        A string with the path to the JSON file.
+      settings:
+        A dictionary with the settings of the run, used to resume it.
+      interval:
+        A float with the minimum number of seconds between saves.
+      offset:
+        An integer with the number of positions completed from the
+        start of the shard.
+      done:
+        A set with the completed positions after ``offset``.
+      failed:
+        A set with the positions whose request failed. They're sent
+        again when resuming.
+      outputs:
+        A dictionary mapping the files the operations append to, to
+        their size when the checkpoint was saved.
+      run:
+        An optional integer with the ID of the run in the
+        :class:`ResultStore <raider.results.ResultStore>`.
+      finished:
+        A boolean, True if the run finished.
+
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        settings: Optional[Dict[str, Any]] = None,
+        interval: float = 5.0,
+    ) -> None:
+        """Initializes the Checkpoint object.
+
+        Args:
+          filename:
+            A string with the path to the JSON file.
+          settings:
+            An optional dictionary with the settings of the run.
+          interval:
+            A float with the minimum number of seconds between saves.
+
+        """
+        self.filename = os.path.expanduser(filename)
+        self.settings = settings or {}
+        self.interval = interval
+        self.offset = 0
+        self.done: Set[int] = set()
+        self.failed: Set[int] = set()
+        self.outputs: Dict[str, int] = {}
+        self.run: Optional[int] = None
+        self.finished = False
+
+        self._saved = time.monotonic()
+        self._active = 0
+        self._saving = False
+        self._condition = threading.Condition()
+        self._save_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, filename: str) -> "Checkpoint":
+        """Loads a checkpoint from a JSON file.
+
+        Args:
+          filename:
+            A string with the path to the JSON file.
+
+        Returns:
+          The :class:`Checkpoint` object with the saved progress.
+
+        """
+        with open(filename, encoding="utf-8") as checkpoint_file:
+            data = json.load(checkpoint_file)
+
+        checkpoint = cls(filename, data.get("settings"))
+        checkpoint.offset = data.get("offset", 0)
+        checkpoint.done = set(data.get("done", []))
+        checkpoint.failed = set(data.get("failed", []))
+        checkpoint.outputs = data.get("outputs", {})
+        checkpoint.run = data.get("run")
+        checkpoint.finished = data.get("finished", False)
+        return checkpoint
+
+    def track_outputs(self, filenames: Iterable[str]) -> None:
+        """Sets the files whose size is recorded.
+
+        Files already tracked by a loaded checkpoint keep their size,
+        new ones start with their current size.
+
+        """
+        for filename in filenames:
+            if filename not in self.outputs:
+                self.outputs[filename] = (
+                    os.path.getsize(filename)
+                    if os.path.isfile(filename)
+                    else 0
+                )
+
+    def restore_outputs(self) -> None:
+        """Truncates the output files to their size in the checkpoint.
+
+        Removes what was written by the positions which weren't
+        completed, since they'll run again.
+
+        """
+        for filename, size in self.outputs.items():
+            if os.path.isfile(filename) and os.path.getsize(filename) > size:
+                with open(filename, "r+b") as output:
+                    output.truncate(size)
+
+    def pending(self, elements: Iterable[Any]) -> Iterator[Tuple[int, Any]]:
+        """Yields the elements which weren't completed.
+
+        Args:
+          elements:
+            An iterable with all the fuzzing strings of the shard.
+
+        Returns:
+          An iterator with tuples containing the position of the
+          fuzzing strings in the shard and the fuzzing strings.
+
+        """
+        for index, item in enumerate(elements):
+            # Failed positions are done too, so the offset can pass them
+            if index in self.failed or (
+                index >= self.offset and index not in self.done
+            ):
+                yield index, item
+
+    @contextmanager
+    def completing(self, index: int, failed: bool = False) -> Iterator[None]:
+        """Context in which a position finishes.
+
+        The operations writing the output should run inside it. The
+        position is marked as completed when the context exits without
+        an exception, and the checkpoint is saved if ``interval``
+        seconds passed since the last save.
+
+        Args:
+          index:
+            An integer with the position in the shard.
+          failed:
+            A boolean, True if the request failed, so the position is
+            sent again when resuming.
+
+        """
+        with self._condition:
+            while self._saving:
+                self._condition.wait()
+            self._active += 1
+        try:
+            yield
+            self._complete(index, failed)
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+        if time.monotonic() - self._saved >= self.interval:
+            # Skip it if another worker is already saving
+            if self._save_lock.acquire(blocking=False):
+                try:
+                    self._write()
+                finally:
+                    self._save_lock.release()
+
+    def _complete(self, index: int, failed: bool) -> None:
+        """Marks a position as completed."""
+        with self._condition:
+            if failed:
+                self.failed.add(index)
+            else:
+                self.failed.discard(index)
+            if index >= self.offset:
+                self.done.add(index)
+                while self.offset in self.done:
+                    self.done.remove(self.offset)
+                    self.offset += 1
+
+    def save(self, finished: bool = False) -> None:
+        """Writes the checkpoint to the JSON file.
+
+        Waits for the workers to finish running the operations, and
+        writes to a temporary file which then replaces the checkpoint,
+        so it's never left incomplete.
+
+        Args:
+          finished:
+            A boolean, True if the run finished.
+
+        """
+        with self._save_lock:
+            self._write(finished)
+
+    def _write(self, finished: bool = False) -> None:
+        """Writes the checkpoint, holding the save lock."""
+        with self._condition:
+            self._saving = True
+            while self._active:
+                self._condition.wait()
+            self.finished = self.finished or finished
+            data = {
+                "settings": self.settings,
+                "offset": self.offset,
+                "done": sorted(self.done),
+                "failed": sorted(self.failed),
+                "outputs": {
+                    filename: (
+                        os.path.getsize(filename)
+                        if os.path.isfile(filename)
+                        else 0
+                    )
+                    for filename in self.outputs
+                },
+                "run": self.run,
+                "finished": self.finished,
+            }
+            self.outputs = data["outputs"]
+            self._saving = False
+            self._condition.notify_all()
+
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        descriptor, temporary = tempfile.mkstemp(
+            dir=directory, prefix=".checkpoint-", suffix=".json"
+        )
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as output:
+                json.dump(data, output)
+                output.flush()
+                os.fsync(output.fileno())
+            os.replace(temporary, self.filename)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self._saved = time.monotonic()
+
+    @property
+    def completed(self) -> int:
+        """Returns the number of completed positions."""
+        return self.offset + len(self.done)
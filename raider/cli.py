@@ -21,10 +21,15 @@ import argparse
 from IPython import embed
 
 from raider.parsers.config import add_config_parser, run_config_command
+from raider.parsers.daemon import add_daemon_parser, run_daemon_command
 from raider.parsers.delete import add_delete_parser, run_delete_command
 from raider.parsers.edit import add_edit_parser, run_edit_command
+from raider.parsers.fuzz import add_fuzz_parser, run_fuzz_command
 from raider.parsers.inspect import add_inspect_parser, run_inspect_command
+from raider.parsers.load import add_load_parser, run_load_command
 from raider.parsers.new import add_new_parser, run_new_command
+from raider.parsers.results import add_results_parser, run_results_command
+from raider.parsers.resume import add_resume_parser, run_resume_command
 from raider.parsers.run import add_run_parser, run_run_command
 from raider.parsers.shell import add_shell_parser, run_shell_command
 from raider.parsers.show import add_show_parser, run_show_command
@@ -46,6 +51,11 @@ def main() -> None:
         "shell": run_shell_command,
         "run": run_run_command,
         "inspect": run_inspect_command,
+        "load": run_load_command,
+        "fuzz": run_fuzz_command,
+        "results": run_results_command,
+        "resume": run_resume_command,
+        "daemon": run_daemon_command,
     }
 
     add_show_parser(subparsers)
@@ -56,6 +66,11 @@ def main() -> None:
     add_inspect_parser(subparsers)
     add_run_parser(subparsers)
     add_shell_parser(subparsers)
+    add_load_parser(subparsers)
+    add_fuzz_parser(subparsers)
+    add_results_parser(subparsers)
+    add_resume_parser(subparsers)
+    add_daemon_parser(subparsers)
 
     args = parser.parse_args()
     if not args.command:
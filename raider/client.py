@@ -0,0 +1,125 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Thin client sending commands to the Raider daemon.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import Any, Dict, Optional
+
+# Only the standard library is imported here, so the client starts fast
+
+
+def get_socket_path() -> str:
+    """Gets the path of the daemon's Unix socket.
+
+    Returns:
+      A string with the path set in the ``RAIDER_SOCKET`` environment
+      variable, or ``daemon.sock`` in the configuration directory.
+
+    """
+    envpath = os.getenv("RAIDER_SOCKET")
+    if envpath:
+        return envpath
+    confdir = os.getenv("RAIDERPATH") or os.path.expanduser("~/.config/raider")
+    return os.path.join(confdir, "daemon.sock")
+
+
+def send_request(
+    request: Dict[str, Any], socket_path: Optional[str] = None
+) -> int:
+    """Sends a request to the daemon and prints its output.
+
+    Args:
+      request:
+        A dictionary with the request, like ``{"argv": [...], "cwd":
+        ...}`` to run a command.
+      socket_path:
+        An optional string with the path of the daemon's socket.
+
+    Returns:
+      An integer with the exit code of the command.
+
+    Raises:
+      OSError: If the daemon isn't listening on the socket.
+
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path or get_socket_path())
+        connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with connection.makefile("r", encoding="utf-8") as messages:
+            for line in messages:
+                message = json.loads(line)
+                if "stdout" in message:
+                    sys.stdout.write(message["stdout"])
+                    sys.stdout.flush()
+                elif "stderr" in message:
+                    sys.stderr.write(message["stderr"])
+                    sys.stderr.flush()
+                elif "exit" in message:
+                    return message["exit"]
+    # The daemon stopped before the command finished
+    return 1
+
+
+def main() -> None:
+    """Runs a ``raider`` command in the daemon."""
+    parser = argparse.ArgumentParser(
+        prog="raider-client",
+        description="Run raider commands in a running `raider daemon`.",
+    )
+    parser.add_argument("--socket", help="Path of the daemon's socket.")
+    parser.add_argument(
+        "--status", help="Show the daemon's status.", action="store_true"
+    )
+    parser.add_argument("--stop", help="Stop the daemon.", action="store_true")
+    parser.add_argument(
+        "argv",
+        nargs=argparse.REMAINDER,
+        help="The run, fuzz or show command with its arguments.",
+    )
+    args = parser.parse_args()
+
+    if args.stop:
+        request: Dict[str, Any] = {"stop": True}
+    elif args.status:
+        request = {"status": True}
+    elif args.argv:
+        request = {"argv": args.argv, "cwd": os.getcwd()}
+    else:
+        parser.print_help()
+        sys.exit(2)
+
+    socket_path = args.socket or get_socket_path()
+    try:
+        code = send_request(request, socket_path)
+    except OSError as err:
+        sys.stderr.write(
+            "No raider daemon listening on "
+            + socket_path
+            + " ("
+            + str(err)
+            + "). Start one with `raider daemon`.\n"
+        )
+        code = 1
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Lightweight copies of Flows sharing their immutable parts.
+"""
+
+from functools import partial
+from types import FunctionType, MethodType
+from typing import Any, Dict, Optional, TypeVar
+
+T = TypeVar("T", bound="Clonable")
+
+# Types which are always shared, checked first since they're the most
+# common attributes
+SHARED_TYPES = frozenset(
+    (str, bytes, int, float, bool, type(None), FunctionType, type)
+)
+
+
+class Clonable:
+    """Parent class for the objects copied by :meth:`clone`.
+
+    ``copy.deepcopy`` copies everything reachable from a :class:`Flow
+    <raider.flow.Flow>`: the previous response with its body and
+    headers, the compiled regular expressions, the hy code of the
+    operations, and so on. Most of it never changes while a Flow runs.
+    Only the objects holding the state of a run need to be copied: the
+    Flow, its :class:`Request <raider.request.Request>`, the stores,
+    the :class:`Plugins <raider.plugins.common.Plugin>` and the
+    :class:`Operations <raider.operations.Operation>`.
+
+    :meth:`clone` makes a shallow copy of the object, then goes through
+    its attributes. Other :class:`Clonable` objects are cloned, lists,
+    tuples and dictionaries are rebuilt with cloned items, and methods
+    bound to a cloned object are bound to its clone. Everything else,
+    like strings, responses, compiled regular expressions and hy
+    models, is shared with the original.
+
+    """
+
+    def clone(self: T, memo: Optional[Dict[int, Any]] = None) -> T:
+        """Returns a copy sharing the immutable attributes.
+
+        Args:
+          memo:
+            An optional dictionary mapping the ``id`` of the objects
+            already cloned to their clone, so objects used in several
+            places are only cloned once, like with ``copy.deepcopy``.
+
+        Returns:
+          The cloned object.
+
+        """
+        if memo is None:
+            memo = {}
+        if id(self) in memo:
+            return memo[id(self)]
+
+        # Same as copy.copy, without going through __reduce_ex__
+        clone = object.__new__(type(self))
+        memo[id(self)] = clone
+        clone.__dict__.update(
+            {
+                key: clone_value(value, memo)
+                for key, value in vars(self).items()
+            }
+        )
+        return clone
+
+
+def clone_value(value: Any, memo: Dict[int, Any]) -> Any:
+    """Returns the value with its :class:`Clonable` objects cloned.
+
+    Args:
+      value:
+        The value to copy.
+      memo:
+        A dictionary with the objects already cloned.
+
+    Returns:
+      The copied value, or the same value if it doesn't contain any
+      :class:`Clonable` object.
+
+    """
+    kind = type(value)
+    if kind in SHARED_TYPES:
+        return value
+    if kind is dict:
+        return {
+            clone_value(key, memo): clone_value(item, memo)
+            for key, item in value.items()
+        }
+    if kind is list:
+        return [clone_value(item, memo) for item in value]
+    if kind is tuple:
+        return tuple(clone_value(item, memo) for item in value)
+    if kind is MethodType:
+        owner = clone_value(value.__self__, memo)
+        if owner is value.__self__:
+            return value
+        return MethodType(value.__func__, owner)
+    if kind is partial:
+        return partial(
+            clone_value(value.func, memo),
+            *clone_value(value.args, memo),
+            **clone_value(value.keywords, memo),
+        )
+    if isinstance(value, Clonable):
+        cloned = memo.get(id(value))
+        return value.clone(memo) if cloned is None else cloned
+    return value
@@ -0,0 +1,219 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Concurrency control adapting to the target's latency and errors.
+"""
+
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from raider.timing import percentile
+
+
+class ConcurrencyController:
+    """Class limiting how many requests run at the same time.
+
+    With ``adaptive`` enabled, the limit is adjusted using additive
+    increase, multiplicative decrease (AIMD). The responses are
+    evaluated in windows, and after each window the limit is:
+
+    * multiplied by ``decrease`` if there were connection errors or
+      timeouts, any 429 responses, more than ``error_ratio`` 5xx
+      responses, or if the p95 latency rose above
+      ``latency_tolerance`` times the best p95 seen so far, plus
+      ``latency_slack`` seconds.
+    * increased by ``increase`` otherwise.
+
+    Responses to requests started before the last change are ignored,
+    so one overload doesn't cause several decreases in a row.
+
+    Workers call :meth:`acquire` before sending a request, :meth:`record`
+    with the result, and :meth:`release` when done.
+
+    Attributes:
+      limit:
+        An integer with the current number of concurrent requests.
+      minimum:
+        An integer with the lowest allowed limit.
+      maximum:
+        An integer with the highest allowed limit.
+      adaptive:
+        A boolean, if False the limit never changes.
+      increase:
+        An integer added to the limit after a healthy window.
+      decrease:
+        A float multiplying the limit after an unhealthy window.
+      window:
+        An integer with the minimum number of responses in a window.
+        Windows are never smaller than the current limit.
+      error_ratio:
+        A float with the ratio of 5xx responses considered unhealthy.
+      latency_tolerance:
+        A float with how many times the p95 latency can grow over the
+        best one before backing off.
+      latency_slack:
+        A float with the number of seconds added to the latency
+        threshold, so the noise on fast targets doesn't cause backoffs.
+      baseline:
+        A float with the best p95 latency seen, or None.
+      history:
+        A list of (time, old limit, new limit, reason) tuples with all
+        the changes.
+      callback:
+        An optional function called with the old limit, the new limit
+        and the reason after each change.
+      in_flight:
+        An integer with the number of requests running.
+
+    """
+
+    def __init__(
+        self,
+        initial: int = 1,
+        minimum: int = 1,
+        maximum: int = 64,
+        adaptive: bool = True,
+        callback: Optional[Callable[[int, int, str], None]] = None,
+    ) -> None:
+        """Initializes the ConcurrencyController object.
+
+        Args:
+          initial:
+            An integer with the starting limit.
+          minimum:
+            An integer with the lowest allowed limit.
+          maximum:
+            An integer with the highest allowed limit.
+          adaptive:
+            A boolean, if False the limit stays at ``initial``.
+          callback:
+            An optional function called with the old limit, the new
+            limit and the reason after each change.
+
+        """
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.adaptive = adaptive
+        self.callback = callback
+
+        self.increase = 1
+        self.decrease = 0.5
+        self.window = 20
+        self.error_ratio = 0.1
+        self.latency_tolerance = 1.5
+        self.latency_slack = 0.01
+
+        self.baseline: Optional[float] = None
+        self.history: List[Tuple[float, int, int, str]] = []
+        self.in_flight = 0
+
+        self._samples: List[Tuple[float, Optional[int], bool]] = []
+        self._changed = time.monotonic()
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """Waits until another request can be started.
+
+        Returns:
+          A float with the time the request started, to be passed to
+          :meth:`record`.
+
+        """
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic()
+
+    def release(self) -> None:
+        """Marks a request as finished."""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def record(
+        self,
+        started: float,
+        latency: float,
+        status: Optional[int] = None,
+        error: bool = False,
+    ) -> None:
+        """Records the result of a request.
+
+        Args:
+          started:
+            A float with the time returned by :meth:`acquire`.
+          latency:
+            A float with the number of seconds the request took.
+          status:
+            An optional integer with the HTTP status code.
+          error:
+            A boolean, True if the request failed or timed out.
+
+        """
+        if not self.adaptive:
+            return
+        with self._condition:
+            if started < self._changed:
+                return
+            self._samples.append((latency, status, error))
+            if len(self._samples) >= max(self.window, self.limit):
+                self._evaluate()
+
+    def _evaluate(self) -> None:
+        """Changes the limit based on the samples in the window."""
+        samples = self._samples
+        self._samples = []
+
+        errors = sum(1 for _, _, error in samples if error)
+        statuses = [status for _, status, _ in samples if status]
+        throttled = statuses.count(429)
+        server_errors = sum(1 for status in statuses if status >= 500)
+        p95 = percentile(
+            [latency for latency, _, error in samples if not error], 95
+        )
+
+        reason = None
+        if errors:
+            reason = str(errors) + " failed requests"
+        elif throttled:
+            reason = str(throttled) + " responses with 429"
+        elif server_errors > self.error_ratio * len(samples):
+            reason = str(server_errors) + " responses with 5xx"
+        elif self.baseline is not None and p95 > (
+            self.baseline * self.latency_tolerance + self.latency_slack
+        ):
+            reason = "p95 {:.0f}ms over {:.0f}ms baseline".format(
+                p95 * 1000, self.baseline * 1000
+            )
+
+        if reason:
+            new_limit = max(int(self.limit * self.decrease), self.minimum)
+        else:
+            if self.baseline is None or p95 < self.baseline:
+                self.baseline = p95
+            new_limit = min(self.limit + self.increase, self.maximum)
+            reason = "healthy, p95 {:.0f}ms".format(p95 * 1000)
+
+        if new_limit != self.limit:
+            old_limit = self.limit
+            self.limit = new_limit
+            self._changed = time.monotonic()
+            self.history.append((self._changed, old_limit, new_limit, reason))
+            self._condition.notify_all()
+            if self.callback:
+                self.callback(old_limit, new_limit, reason)
@@ -0,0 +1,425 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Long-lived Raider process serving commands over a Unix socket.
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from raider.client import get_socket_path
+from raider.logger import CustomFormatter
+from raider.parsers.fuzz import add_fuzz_parser, run_fuzz_command
+from raider.parsers.run import add_run_parser, run_run_command
+from raider.parsers.show import add_show_parser, run_show_command
+from raider.raider import Raider
+
+# Commands the daemon accepts, the others only make sense in the CLI
+COMMANDS = {
+    "run": (add_run_parser, run_run_command),
+    "fuzz": (add_fuzz_parser, run_fuzz_command),
+    "show": (add_show_parser, run_show_command),
+}
+
+
+class Connection:
+    """Class sending messages to a client.
+
+    Each message is a JSON object on its own line. The output of the
+    command is sent in ``{"stdout": ...}`` and ``{"stderr": ...}``
+    messages as it's written, and the last message is ``{"exit":
+    code}``.
+
+    Attributes:
+      closed:
+        A boolean, True if the client disconnected.
+
+    """
+
+    def __init__(self, wfile: BinaryIO) -> None:
+        """Initializes the Connection object.
+
+        Args:
+          wfile:
+            The file object writing to the client's socket.
+
+        """
+        self.closed = False
+        self._wfile = wfile
+        self._lock = threading.Lock()
+
+    def send(self, **message: Any) -> None:
+        """Sends a message, unless the client disconnected."""
+        data = json.dumps(message).encode("utf-8") + b"\n"
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self._wfile.write(data)
+                self._wfile.flush()
+            except OSError:
+                # The command keeps running, its output is discarded
+                self.closed = True
+
+
+class OutputStream(io.TextIOBase):
+    """File object sending what's written to it to the client.
+
+    Replaces ``sys.stdout`` and ``sys.stderr`` while a command runs.
+
+    """
+
+    def __init__(self, connection: Connection, name: str) -> None:
+        """Initializes the OutputStream object.
+
+        Args:
+          connection:
+            The :class:`Connection` to the client.
+          name:
+            A string with the name of the stream, "stdout" or "stderr".
+
+        """
+        super().__init__()
+        self.connection = connection
+        self.name = name
+
+    def writable(self) -> bool:
+        """Returns True, since the stream can be written."""
+        return True
+
+    def write(self, text: str) -> int:
+        """Sends the text to the client."""
+        if text:
+            self.connection.send(**{self.name: text})
+        return len(text)
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """Handles one request sent to the daemon's socket."""
+
+    server: "DaemonServer"
+
+    def handle(self) -> None:
+        """Reads the JSON request and passes it to the daemon."""
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return
+        if isinstance(request, dict):
+            self.server.daemon.handle(request, Connection(self.wfile))
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """Unix socket server of the :class:`Daemon`.
+
+    Attributes:
+      daemon:
+        The :class:`Daemon` handling the requests.
+
+    """
+
+    def __init__(self, socket_path: str, daemon: "Daemon") -> None:
+        """Initializes the DaemonServer object.
+
+        The socket is only accessible to the current user.
+
+        """
+        self.daemon = daemon
+        umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, DaemonHandler)
+        finally:
+            os.umask(umask)
+
+
+class Daemon:
+    """Class keeping projects loaded between commands.
+
+    Each ``raider`` invocation imports Raider, evaluates the project's
+    :term:`hyfiles` and opens new connections before sending the first
+    request. The daemon does it only once. It keeps one :class:`Raider
+    <raider.raider.Raider>` object with the projects loaded the first
+    time they're used, and runs the ``run``, ``fuzz`` and ``show``
+    commands sent by ``raider-client`` to its Unix socket:
+
+    .. code-block:: bash
+
+        $ raider daemon --preload myproject &
+        $ raider-client run myproject login
+        $ raider-client fuzz myproject search --wordlist q=words.txt
+        $ raider-client --stop
+
+    The commands take the same arguments as in the CLI, run in the
+    client's working directory, and their output and exit code are
+    sent back to the client. They run one at a time, and everything
+    stays in memory between them: the transport with its open
+    connections, and the cookies, headers and data of the users. The
+    hyfiles changed since the previous command are reloaded with
+    :meth:`Project.reload <raider.projects.Project.reload>`.
+
+    Attributes:
+      socket_path:
+        A string with the path of the Unix socket.
+      raider:
+        The :class:`Raider <raider.raider.Raider>` object running the
+        commands.
+      default_project:
+        An optional string with the project used when a command
+        doesn't specify one.
+      served:
+        An integer with the number of commands run.
+      started:
+        A float with the ``time.monotonic`` when the daemon started.
+
+    """
+
+    def __init__(self, socket_path: Optional[str] = None) -> None:
+        """Initializes the Daemon object.
+
+        Args:
+          socket_path:
+            An optional string with the path of the Unix socket. The
+            one from :func:`get_socket_path
+            <raider.client.get_socket_path>` is used if not set.
+
+        """
+        self.socket_path = socket_path or get_socket_path()
+        self.raider = Raider()
+        self.default_project = self.raider.gconfig.active_project
+        self.served = 0
+        self.started = time.monotonic()
+        self.parser = self.create_parser()
+
+        self._stopping = False
+
+    @staticmethod
+    def create_parser() -> argparse.ArgumentParser:
+        """Returns the parser for the commands accepted by the daemon."""
+        parser = argparse.ArgumentParser(prog="raider")
+        subparsers = parser.add_subparsers(help="Command", dest="command")
+        for add_parser, _ in COMMANDS.values():
+            add_parser(subparsers)
+        return parser
+
+    def preload(self, projects: List[str]) -> None:
+        """Loads projects before the first command needs them.
+
+        Args:
+          projects:
+            A list with the names of the projects.
+
+        """
+        self.raider.projects.refresh()
+        for name in projects:
+            project = self.raider.projects[name]
+            if not project:
+                self.raider.logger.critical(name + " doesn't exist.")
+                continue
+            self.raider.logger.info("Loading %s project", name)
+            project.load()
+
+    def serve(self) -> None:
+        """Accepts commands until the daemon is stopped."""
+        if os.path.exists(self.socket_path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as test:
+                try:
+                    test.connect(self.socket_path)
+                except OSError:
+                    # Left behind by a daemon which was killed
+                    os.unlink(self.socket_path)
+                else:
+                    raise OSError(
+                        "A daemon is already listening on " + self.socket_path
+                    )
+
+        # Messages logged with logging.* outside of commands shouldn't
+        # go to a client's stream
+        logging.basicConfig()
+        server = DaemonServer(self.socket_path, self)
+        if threading.current_thread() is threading.main_thread():
+            # Clean up the socket when stopped with kill too
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+        self.raider.logger.info("Listening on %s", self.socket_path)
+        try:
+            while not self._stopping:
+                server.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.unlink(self.socket_path)
+            for project in self.raider.projects.instances():
+                if project.loaded:
+                    project.flowstore.stop_prefetching()
+                    project.pconfig.close_transport()
+
+    def handle(self, request: Dict[str, Any], connection: Connection) -> None:
+        """Handles a request from a client.
+
+        Args:
+          request:
+            A dictionary with the request. It has either the ``argv``
+            and ``cwd`` of the command to run, ``status`` to get the
+            daemon's status, or ``stop`` to stop the daemon.
+          connection:
+            The :class:`Connection` to the client.
+
+        """
+        if request.get("stop"):
+            self._stopping = True
+            connection.send(stdout="Stopping raider daemon\n")
+            connection.send(exit=0)
+        elif request.get("status"):
+            connection.send(stdout=self.status())
+            connection.send(exit=0)
+        elif isinstance(request.get("argv"), list):
+            code = self.execute(
+                [str(item) for item in request["argv"]],
+                request.get("cwd") or os.getcwd(),
+                connection,
+            )
+            self.served += 1
+            connection.send(exit=code)
+
+    def execute(
+        self, argv: List[str], cwd: str, connection: Connection
+    ) -> int:
+        """Runs a command, sending its output to the client.
+
+        Args:
+          argv:
+            A list with the arguments of the command, starting with
+            the command name, like with the ``raider`` CLI.
+          cwd:
+            A string with the client's working directory.
+          connection:
+            The :class:`Connection` to the client.
+
+        Returns:
+          An integer with the exit code of the command.
+
+        """
+        stdout = OutputStream(connection, "stdout")
+        stderr = OutputStream(connection, "stderr")
+        handler = logging.StreamHandler(stderr)
+        handler.setFormatter(CustomFormatter())
+        loggers = [logging.getLogger(), self.raider.logger]
+        for logger in loggers:
+            logger.addHandler(handler)
+
+        directory = os.getcwd()
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                os.chdir(cwd)
+                args = self.parser.parse_args(argv)
+                if not args.command:
+                    self.parser.print_help()
+                    return 0
+                self.prepare(args)
+                COMMANDS[args.command][1](args)
+        except SystemExit as err:
+            if err.code is None or isinstance(err.code, int):
+                return err.code or 0
+            stderr.write(str(err.code) + "\n")
+            return 1
+        except Exception:  # pylint: disable=broad-except
+            stderr.write(traceback.format_exc())
+            return 1
+        finally:
+            for logger in loggers:
+                logger.removeHandler(handler)
+            os.chdir(directory)
+            self.discard_failed()
+        return 0
+
+    def prepare(self, args: argparse.Namespace) -> None:
+        """Points the Raider object to the command's project.
+
+        Args:
+          args:
+            The parsed arguments of the command. The Raider object is
+            set in their ``raider`` attribute, so the command uses it
+            instead of creating a new one.
+
+        """
+        self.raider.projects.refresh()
+        gconfig = self.raider.gconfig
+        if args.command != "show":
+            gconfig.active_project = args.project or self.default_project
+
+        # The proxy is set when the transport is created
+        use_proxy = bool(getattr(args, "proxy", False))
+        if use_proxy != gconfig.use_proxy:
+            gconfig.use_proxy = use_proxy
+            for project in self.raider.projects.instances():
+                project.pconfig.close_transport()
+
+        # Only the hyfiles changed since the last command are evaluated
+        if args.command == "show":
+            for project in self.raider.projects.instances():
+                if project.loaded:
+                    project.reload()
+        elif self.raider.project and self.raider.project.loaded:
+            self.raider.project.reload()
+
+        if self.raider.project:
+            # Timings are only recorded for the commands asking for them
+            self.raider.pconfig.timings = None
+        args.raider = self.raider
+
+    def discard_failed(self) -> None:
+        """Replaces the projects which failed to load.
+
+        A hyfile with an error stops the loading halfway, so the
+        project is created again to be loaded from scratch next time.
+
+        """
+        for project in self.raider.projects.instances():
+            if project.loaded:
+                continue
+            if project.flows or project.flowstore.values:
+                # Created again when it's accessed
+                self.raider.projects[project.name] = None
+
+    def status(self) -> str:
+        """Returns a string with the daemon's status."""
+        loaded = [
+            project.name
+            for project in self.raider.projects.instances()
+            if project.loaded
+        ]
+        return (
+            "raider daemon listening on "
+            + self.socket_path
+            + "\nUptime: "
+            + str(int(time.monotonic() - self.started))
+            + "s\nCommands served: "
+            + str(self.served)
+            + "\nLoaded projects: "
+            + (", ".join(sorted(loaded)) or "none")
+            + "\n"
+        )
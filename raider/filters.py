@@ -0,0 +1,226 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Filters hiding the uninteresting fuzzing responses.
+"""
+
+import logging
+import random
+import re
+import string
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from requests.models import Response
+
+from raider.results import response_features
+
+# Features compared with the baseline responses
+BASELINE_FEATURES = ("length", "words", "lines")
+
+
+def random_payload(length: int) -> str:
+    """Returns a random alphanumeric string used for calibration."""
+    return "".join(
+        random.choices(string.ascii_letters + string.digits, k=length)
+    )
+
+
+def strip_payloads(content: bytes, payloads: Sequence[str]) -> bytes:
+    """Removes the reflected fuzzing strings from the response body.
+
+    Args:
+      content:
+        The bytes with the response body.
+      payloads:
+        A list with the fuzzing strings sent in the request.
+
+    Returns:
+      The response body without the fuzzing strings, so responses to
+      strings of different lengths can be compared.
+
+    """
+    for payload in payloads:
+        if payload:
+            content = content.replace(payload.encode("utf-8"), b"")
+    return content
+
+
+class ResponseFilter:
+    """Class deciding which fuzzing responses are hidden.
+
+    Most responses to fuzzing are the same "not found" or "invalid"
+    page. A hidden response doesn't reach the :class:`Flow's
+    <raider.flow.Flow>` operations, like :class:`Print
+    <raider.operations.Print>` and :class:`Save
+    <raider.operations.Save>`, and isn't recorded in the
+    :class:`ResultStore <raider.results.ResultStore>`.
+
+    Responses are hidden if they match one of the manual filters, or
+    one of the ``baseline`` responses learned by :meth:`calibrate`. The
+    fuzzing strings are removed from the body before comparing it with
+    the baseline, so reflected strings don't make the responses look
+    different.
+
+    Attributes:
+      status:
+        A set of integers with the status codes to hide.
+      size:
+        An optional tuple with the minimum and maximum length in bytes
+        of the bodies to hide.
+      words:
+        A set of integers with the word counts to hide.
+      lines:
+        A set of integers with the line counts to hide.
+      regex:
+        An optional compiled regular expression. Responses with a body
+        matching it are hidden.
+      baseline:
+        A list of dictionaries with the ``status`` code and the
+        features which didn't change between the calibration responses.
+      hidden:
+        An integer with the number of hidden responses.
+
+    """
+
+    def __init__(
+        self,
+        status: Optional[Iterable[int]] = None,
+        size: Optional[Tuple[int, int]] = None,
+        words: Optional[Iterable[int]] = None,
+        lines: Optional[Iterable[int]] = None,
+        regex: Optional[str] = None,
+    ) -> None:
+        """Initializes the ResponseFilter object.
+
+        Args:
+          status:
+            An optional list of integers with the status codes to hide.
+          size:
+            An optional tuple with the minimum and maximum length in
+            bytes of the bodies to hide.
+          words:
+            An optional list of integers with the word counts to hide.
+          lines:
+            An optional list of integers with the line counts to hide.
+          regex:
+            An optional string with a regular expression. Responses
+            with a body matching it are hidden.
+
+        """
+        self.status = set(status or ())
+        self.size = size
+        self.words = set(words or ())
+        self.lines = set(lines or ())
+        self.regex = re.compile(regex.encode("utf-8")) if regex else None
+        self.baseline: List[Dict[str, Any]] = []
+        self.hidden = 0
+        self._lock = threading.Lock()
+
+    def calibrate(
+        self, samples: Sequence[Tuple[Response, Sequence[str]]]
+    ) -> None:
+        """Learns the baseline from the responses to random strings.
+
+        The responses are grouped by status code. For each group, the
+        length, the word count and the line count which were the same
+        in every response become the baseline. Groups where all of them
+        changed can't be recognized, and are not hidden.
+
+        Args:
+          samples:
+            A list of tuples with the :class:`Response
+            <requests.models.Response>` objects and the random strings
+            sent in the request.
+
+        """
+        groups: Dict[int, List[Dict[str, Any]]] = {}
+        for response, payloads in samples:
+            features = response_features(
+                response, strip_payloads(response.content or b"", payloads)
+            )
+            groups.setdefault(features["status"], []).append(features)
+
+        self.baseline = []
+        for status, group in groups.items():
+            signature = {"status": status}
+            for feature in BASELINE_FEATURES:
+                values = {item[feature] for item in group}
+                if len(values) == 1:
+                    signature[feature] = values.pop()
+            if len(signature) == 1:
+                logging.warning(
+                    "Responses with status %s change too much, "
+                    "they won't be filtered.",
+                    status,
+                )
+                continue
+            self.baseline.append(signature)
+
+    def is_hidden(self, response: Response, payloads: Sequence[str]) -> bool:
+        """Returns True if the response should be hidden.
+
+        Args:
+          response:
+            The :class:`Response <requests.models.Response>` object.
+          payloads:
+            A list with the fuzzing strings sent in the request.
+
+        """
+        hidden = self._matches(response, payloads)
+        if hidden:
+            with self._lock:
+                self.hidden += 1
+        return hidden
+
+    def _matches(self, response: Response, payloads: Sequence[str]) -> bool:
+        """Returns True if the response matches any filter."""
+        content = response.content or b""
+        features = response_features(response)
+        if features["status"] in self.status:
+            return True
+        if self.size and self.size[0] <= features["length"] <= self.size[1]:
+            return True
+        if features["words"] in self.words:
+            return True
+        if features["lines"] in self.lines:
+            return True
+        if self.regex and self.regex.search(content):
+            return True
+
+        if not self.baseline:
+            return False
+        features = response_features(
+            response, strip_payloads(content, payloads)
+        )
+        for signature in self.baseline:
+            if all(
+                features[name] == value for name, value in signature.items()
+            ):
+                return True
+        return False
+
+    def describe(self) -> List[str]:
+        """Returns the descriptions of the baseline responses."""
+        descriptions = []
+        for signature in self.baseline:
+            description = "status " + str(signature["status"])
+            for feature in BASELINE_FEATURES:
+                if feature in signature:
+                    description += (
+                        ", " + str(signature[feature]) + " " + feature
+                    )
+            descriptions.append(description)
+        return descriptions
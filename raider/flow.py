@@ -16,19 +16,23 @@
 """Flow class holding the information exchanged between server and client.
 """
 
+import time
 from typing import List, Optional
 
 import hy
 import requests
 
+from raider.cloning import Clonable
 from raider.config import Config
 from raider.operations import Operation
 from raider.plugins.common import Plugin
 from raider.request import Request
+from raider.timing import measure
+from raider.transport import AsyncTransport
 from raider.user import User
 
 
-class Flow:
+class Flow(Clonable):
     """Class dealing with the information exchange from HTTP communication.
 
     A Flow object in Raider defines all the information about one
@@ -113,17 +117,58 @@ class Flow:
 
         """
         self.pconfig = pconfig
+        start = time.perf_counter()
         self.response = self.request.send(pconfig)
+        self.extract_outputs(pconfig, time.perf_counter() - start)
+
+    async def async_execute(
+        self, pconfig: Config, transport: AsyncTransport
+    ) -> None:
+        """Sends the request and extracts the outputs using asyncio.
+
+        Same as :meth:`execute`, but the request is sent through an
+        :class:`AsyncTransport <raider.transport.AsyncTransport>`, so
+        the event loop can run other Flows while waiting for the
+        response.
+
+        Args:
+          pconfig:
+            The ProjectConfig object with the project settings.
+          transport:
+            The :class:`AsyncTransport
+            <raider.transport.AsyncTransport>` used to send the request.
+
+        """
+        self.pconfig = pconfig
+        start = time.perf_counter()
+        self.response = await self.request.async_send(pconfig, transport)
+        self.extract_outputs(pconfig, time.perf_counter() - start)
+
+    def extract_outputs(self, pconfig: Config, elapsed: float) -> None:
+        """Extracts the outputs from the response.
+
+        Args:
+          pconfig:
+            The ProjectConfig object with the project settings.
+          elapsed:
+            A float with the number of seconds it took to get the
+            response, recorded if timings are enabled.
+
+        """
+        if getattr(pconfig, "timings", None):
+            pconfig.timings.add_request(self.response, elapsed)
+
         if self.outputs:
             for output in self.outputs:
-                if output.needs_response:
-                    output.extract_value_from_response(self.response)
-                    if output.name_not_known_in_advance:
-                        output.extract_name_from_response(self.response)
-                elif output.depends_on_other_plugins:
-                    for item in output.plugins:
-                        item.get_value(pconfig)
-                    output.get_value(pconfig)
+                with measure(pconfig, "plugin:extract", output.name):
+                    if output.needs_response:
+                        output.extract_value_from_response(self.response)
+                        if output.name_not_known_in_advance:
+                            output.extract_name_from_response(self.response)
+                    elif output.depends_on_other_plugins:
+                        for item in output.plugins:
+                            item.get_value(pconfig)
+                        output.get_value(pconfig)
 
     def run_operations(self) -> Optional[str]:
         """Runs the defined :class:`operations <raider.operations.Operation>`.
@@ -141,9 +186,13 @@ class Flow:
         if self.operations:
             for item in self.operations:
                 if isinstance(item, hy.models.Expression):
-                    hy.eval(item)
+                    with measure(self.pconfig, "operation", "hy"):
+                        hy.eval(item)
                 else:
-                    next_flow = item.run(self.pconfig, self.response)
+                    with measure(
+                        self.pconfig, "operation", type(item).__name__
+                    ):
+                        next_flow = item.run(self.pconfig, self.response)
 
                 if next_flow or isinstance(next_flow, bool):
                     break
@@ -15,12 +15,16 @@
 
 
 import sys
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import igraph
 
 import raider.plugins as Plugins
 from raider.flow import Flow
+from raider.prefetch import TokenPrefetcher
+from raider.profiler import profile_section
+from raider.timing import measure
+from raider.transport import AsyncTransport
 from raider.user import User
 
 
@@ -30,16 +34,53 @@ class FlowStore:
         self.flowgraphs = {}
         self.pconfig = pconfig
         self.logger = pconfig.logger
+        self._plugins: Optional[List[Plugins.Plugin]] = None
+        self.prefetchers: Dict[str, TokenPrefetcher] = {}
 
     def add_flow(self, key: str, value: str) -> None:
+        self._plugins = None
+        if key in self.keys:
+            # Reloaded Flows keep their position
+            self.flows.vs[self.get_flow_id_by_name(key)]["object"] = value
+            prefetcher = self.prefetchers.get(key)
+            if prefetcher:
+                # Discards the tokens fetched with the old Flow
+                prefetcher.stop()
+                prefetcher.flow = value
+            return
         self.flows.add_vertices(1)
         index = self.flows.vcount() - 1
         self.flows.vs[index]["name"] = key
         self.flows.vs[index]["object"] = value
 
+    def remove_flow(self, key: str) -> None:
+        """Removes a Flow which isn't defined anymore.
+
+        Args:
+          key:
+            A string with the name of the Flow.
+
+        """
+        self._plugins = None
+        if key in self.keys:
+            self.flows.delete_vertices(self.get_flow_id_by_name(key))
+        prefetcher = self.prefetchers.pop(key, None)
+        if prefetcher:
+            prefetcher.stop()
+
     def add_flowgraph(self, key: str, value: str) -> None:
         self.flowgraphs[key] = value
 
+    def remove_flowgraph(self, key: str) -> None:
+        """Removes a FlowGraph which isn't defined anymore.
+
+        Args:
+          key:
+            A string with the name of the FlowGraph.
+
+        """
+        self.flowgraphs.pop(key, None)
+
     def __getitem__(self, name: Any) -> Any:
         """Getter to return a Flow by the name."""
         if name in self.keys:
@@ -108,6 +149,29 @@ class FlowStore:
             return []
         return self.flows.vs[::]["object"]
 
+    def plugins(self) -> List[Plugins.Plugin]:
+        """Returns all the Plugins used by the Flows.
+
+        Includes the inputs of the requests, the outputs, and the
+        Plugins they depend on, each one once.
+
+        """
+        if self._plugins is None:
+            found: Dict[int, Plugins.Plugin] = {}
+            pending = []
+            for flow in self.values:
+                pending.extend((flow.request.list_inputs() or {}).values())
+                pending.extend(flow.outputs or [])
+            while pending:
+                plugin = pending.pop()
+                if id(plugin) in found:
+                    continue
+                found[id(plugin)] = plugin
+                if plugin.depends_on_other_plugins:
+                    pending.extend(plugin.plugins)
+            self._plugins = list(found.values())
+        return self._plugins
+
     def run_flow(self, pconfig, flow_id: Union[int, str]) -> Optional[str]:
         """Runs one authentication Flow.
 
@@ -130,6 +194,103 @@ class FlowStore:
 
         """
 
+        flow_name, flow = self.get_flow_to_run(pconfig, flow_id)
+        prefetcher = self.prefetchers.get(flow_name)
+        if prefetcher:
+            token = prefetcher.get()
+            if token:
+                prefetcher.serve(token)
+                self.save_outputs(pconfig, flow)
+                return token.next_flow
+            self.logger.warning(
+                "No prefetched token for %s, running it", flow_name
+            )
+
+        with measure(pconfig, "flow", flow_name), profile_section(
+            pconfig, "flow:" + flow_name
+        ):
+            flow.execute(pconfig)
+            operations_result = self.finish_flow(pconfig, flow)
+        return operations_result
+
+    def prefetch(self, pconfig, flow_name: str, **kwargs: Any) -> None:
+        """Serves a Flow's outputs from tokens fetched in the background.
+
+        When the Flow is run with :meth:`run_flow`, the request isn't
+        sent, and its outputs get the values from a :class:`Token
+        <raider.prefetch.Token>` fetched by a :class:`TokenPrefetcher
+        <raider.prefetch.TokenPrefetcher>`.
+
+        Args:
+          pconfig:
+            A ProjectConfig object with the project settings.
+          flow_name:
+            A string with the name of the Flow producing the tokens.
+          kwargs:
+            The ``size``, ``workers``, ``max_age`` and ``timeout`` of
+            the :class:`TokenPrefetcher
+            <raider.prefetch.TokenPrefetcher>`.
+
+        """
+        flow = self[flow_name]
+        if not flow:
+            self.logger.critical(
+                "Flow %s not defined. Cannot prefetch", flow_name
+            )
+            sys.exit()
+        self.prefetchers[flow_name] = TokenPrefetcher(flow, pconfig, **kwargs)
+
+    def stop_prefetching(self) -> None:
+        """Stops fetching tokens in the background."""
+        for prefetcher in self.prefetchers.values():
+            prefetcher.stop()
+
+    async def async_run_flow(
+        self, pconfig, flow_id: Union[int, str], transport: AsyncTransport
+    ) -> Optional[str]:
+        """Runs one Flow using asyncio.
+
+        Same as :meth:`run_flow`, but the request is sent through an
+        :class:`AsyncTransport <raider.transport.AsyncTransport>`.
+
+        Args:
+          pconfig:
+            A ProjectConfig object with the project settings.
+          flow_id:
+            A string with the name of the Flow, or an integer with its
+            index.
+          transport:
+            The :class:`AsyncTransport
+            <raider.transport.AsyncTransport>` used to send the request.
+
+        Returns:
+          Optionally, a string with the name of the next Flow.
+
+        """
+        flow_name, flow = self.get_flow_to_run(pconfig, flow_id)
+        with measure(pconfig, "flow", flow_name):
+            await flow.async_execute(pconfig, transport)
+            operations_result = self.finish_flow(pconfig, flow)
+        return operations_result
+
+    def get_flow_to_run(
+        self, pconfig, flow_id: Union[int, str]
+    ) -> Tuple[str, Flow]:
+        """Returns the name and the Flow object to run.
+
+        Exits if the Flow isn't defined.
+
+        Args:
+          pconfig:
+            A ProjectConfig object with the project settings.
+          flow_id:
+            A string with the name of the Flow, or an integer with its
+            index.
+
+        Returns:
+          A tuple with the name of the Flow and the Flow object.
+
+        """
         flow: Optional[Flow]
         if isinstance(flow_id, int):
             flow_name = self.get_flow_name_by_id(flow_id)
@@ -145,7 +306,36 @@ class FlowStore:
             sys.exit()
 
         self.logger.info("Running flow " + flow_name)
-        flow.execute(pconfig)
+        if getattr(pconfig, "timings", None):
+            pconfig.timings.flow = flow_name
+        return flow_name, flow
+
+    def finish_flow(self, pconfig, flow: Flow) -> Optional[str]:
+        """Saves the outputs in the active user and runs the operations.
+
+        Args:
+          pconfig:
+            A ProjectConfig object with the project settings.
+          flow:
+            The Flow object that received the response.
+
+        Returns:
+          Optionally, a string with the name of the next Flow.
+
+        """
+        self.save_outputs(pconfig, flow)
+        return flow.run_operations()
+
+    def save_outputs(self, pconfig, flow: Flow) -> None:
+        """Saves the outputs of the Flow in the active user.
+
+        Args:
+          pconfig:
+            A ProjectConfig object with the project settings.
+          flow:
+            The Flow object with the extracted outputs.
+
+        """
         if flow.outputs:
             for item in flow.outputs:
                 if isinstance(item, Plugins.Cookie):
@@ -155,8 +345,70 @@ class FlowStore:
                 elif isinstance(item, Plugins.Plugin):
                     pconfig.active_user.set_data(item)
 
-        operations_result = flow.run_operations()
-        return operations_result
+    def walk_flowgraph(self, pconfig, name: str) -> Optional[bool]:
+        """Runs the Flows of a FlowGraph until it finishes.
+
+        Starts with the FlowGraph's ``start`` Flow, and follows the
+        :class:`Next <raider.operations.Next>` operations until a Flow
+        doesn't return the name of another Flow.
+
+        Args:
+          pconfig:
+            A ProjectConfig object with the project settings.
+          name:
+            A string with the name of the FlowGraph.
+
+        Returns:
+          True if the FlowGraph ended with (Success), False if it ended
+          with (Failure), and None otherwise.
+
+        """
+        flowgraph = self.flowgraphs[name]
+        flow = flowgraph.start
+        flow_id = self.get_flow_id_by_flow(flow)
+        with measure(pconfig, "flowgraph", name):
+            next_flow = self.run_flow(pconfig, flow_id)
+            while isinstance(next_flow, str):
+                next_flow = self.run_flow(pconfig, next_flow)
+
+        return next_flow
+
+    async def async_walk_flowgraph(
+        self, pconfig, name: str, transport: AsyncTransport
+    ) -> Optional[bool]:
+        """Runs the Flows of a FlowGraph until it finishes, using asyncio.
+
+        Same as :meth:`walk_flowgraph`, but the requests are sent
+        through an :class:`AsyncTransport
+        <raider.transport.AsyncTransport>`. Many FlowGraphs can run
+        concurrently on the same event loop, as long as each one uses
+        its own Project, since the Plugins store their values in the
+        Flow objects.
+
+        Args:
+          pconfig:
+            A ProjectConfig object with the project settings.
+          name:
+            A string with the name of the FlowGraph.
+          transport:
+            The :class:`AsyncTransport
+            <raider.transport.AsyncTransport>` used to send the requests.
+
+        Returns:
+          True if the FlowGraph ended with (Success), False if it ended
+          with (Failure), and None otherwise.
+
+        """
+        flowgraph = self.flowgraphs[name]
+        flow_id = self.get_flow_id_by_flow(flowgraph.start)
+        with measure(pconfig, "flowgraph", name):
+            next_flow = await self.async_run_flow(pconfig, flow_id, transport)
+            while isinstance(next_flow, str):
+                next_flow = await self.async_run_flow(
+                    pconfig, next_flow, transport
+                )
+
+        return next_flow
 
     def run_flowgraph(self, pconfig, name: str, test: bool = False) -> None:
         """Runs all authentication flows.
@@ -174,11 +426,7 @@ class FlowStore:
 
         """
         flowgraph = self.flowgraphs[name]
-        flow = flowgraph.start
-        flow_id = self.get_flow_id_by_flow(flow)
-        next_flow = self.run_flow(pconfig, flow_id)
-        while isinstance(next_flow, str):
-            next_flow = self.run_flow(pconfig, next_flow)
+        next_flow = self.walk_flowgraph(pconfig, name)
 
         if not next_flow:
             self.logger.critical(
@@ -198,3 +446,50 @@ class FlowStore:
                     "FlowGraph's test flow must return (Success) or (Failure)"
                 )
                 sys.exit()
+
+    async def async_run_flowgraph(
+        self,
+        pconfig,
+        name: str,
+        transport: AsyncTransport,
+        test: bool = False,
+    ) -> None:
+        """Runs a FlowGraph using asyncio.
+
+        Same as :meth:`run_flowgraph`, but the requests are sent through
+        an :class:`AsyncTransport <raider.transport.AsyncTransport>`.
+
+        Args:
+          pconfig:
+            A ProjectConfig object with the project settings.
+          name:
+            A string with the name of the FlowGraph.
+          transport:
+            The :class:`AsyncTransport
+            <raider.transport.AsyncTransport>` used to send the requests.
+          test:
+            A boolean, if True the FlowGraph's test Flow is run after
+            it finished.
+
+        """
+        flowgraph = self.flowgraphs[name]
+        next_flow = await self.async_walk_flowgraph(pconfig, name, transport)
+
+        if not next_flow:
+            self.logger.critical(
+                "FlowGraph " + name + " didn't return (Success). Exiting!"
+            )
+            sys.exit()
+
+        if test and flowgraph.test:
+            flow_id = self.get_flow_id_by_flow(flowgraph.test)
+            result = await self.async_run_flow(pconfig, flow_id, transport)
+
+            if isinstance(result, bool):
+                flowgraph.completed = result
+                self.logger.info("FlowGraph.completed = " + str(result))
+            else:
+                self.logger.critical(
+                    "FlowGraph's test flow must return (Success) or (Failure)"
+                )
+                sys.exit()
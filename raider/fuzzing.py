@@ -16,29 +16,160 @@
 """Fuzzing attacks to be run on Flows.
 """
 
+import itertools
 import logging
 import sys
-from copy import deepcopy
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
 from functools import partial
-from typing import Callable, List, Optional
-
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from raider.checkpoint import Checkpoint
+from raider.concurrency import ConcurrencyController
+from raider.filters import ResponseFilter, random_payload
 from raider.flow import Flow
 from raider.plugins.common import Plugin
+from raider.profiler import profile_section
 from raider.projects import Project
+from raider.results import ResultStore
+from raider.sessions import Session, SessionPool
+from raider.similarity import ResponseClusters
+from raider.snapshots import Snapshot
+from raider.timing import measure
+from raider.transport import TransportError
+from raider.utils import colored_text
+
+# A function returning the fuzzing strings, given the original value
+Generator = Callable[[str], Iterable[str]]
+
+
+def file_generator(
+    value: str, filename: str, prepend: bool = False, append: bool = False
+) -> Iterator[str]:
+    """Generates the fuzzing strings from a file.
+
+    The file is read one line at a time, so wordlists of any size can
+    be used.
+
+    Args:
+      value:
+        The original value of the field.
+      filename:
+        The filename with the inputs.
+      prepend:
+        A boolean flag meaning the original value will be prepended
+        with the fuzzing string.
+      append:
+        A boolean flag meaning the original value will be appended with
+        the fuzzing string.
+
+    Returns:
+      An iterator with the final strings to be fuzzed.
+
+    """
+    with open(filename, encoding="utf-8") as contents:
+        for line in contents:
+            item = line.strip()
+            if prepend:
+                yield item + value
+            elif append:
+                yield value + item
+            else:
+                yield item
+
+
+def pitchfork(
+    factories: Sequence[Callable[[], Iterable[str]]]
+) -> Iterator[Tuple[str, ...]]:
+    """Combines the fuzzing strings one by one.
+
+    The first strings from all generators are used together, then the
+    second ones, and so on, until the shortest generator ends.
+
+    Args:
+      factories:
+        A list of functions returning the iterables with the fuzzing
+        strings for each fuzzing point.
+
+    Returns:
+      An iterator with tuples containing one string for each fuzzing
+      point.
+
+    """
+    return zip(*(factory() for factory in factories))
+
+
+def cluster_bomb(
+    factories: Sequence[Callable[[], Iterable[str]]]
+) -> Iterator[Tuple[str, ...]]:
+    """Combines every fuzzing string with every other one.
+
+    Unlike ``itertools.product``, nothing is stored in memory: the
+    generators of the inner fuzzing points are called again for each
+    string of the outer ones.
+
+    Args:
+      factories:
+        A list of functions returning the iterables with the fuzzing
+        strings for each fuzzing point.
+
+    Returns:
+      An iterator with tuples containing one string for each fuzzing
+      point, for all the combinations.
+
+    """
+    if not factories:
+        yield ()
+        return
+    for item in factories[0]():
+        for rest in cluster_bomb(factories[1:]):
+            yield (item,) + rest
 
 
 class Fuzz:
-    """Fuzz an input."""
+    """Fuzz one or more inputs of a Flow.
+
+    Each fuzzing point has its own generator. With multiple fuzzing
+    points, the fuzzing strings are combined one by one (pitchfork), or
+    every string with every other one when the CLUSTER_BOMB flag is
+    set. The combinations are generated lazily, so the memory used
+    doesn't depend on their number.
+
+    """
 
     # Fuzzing flags
     IS_AUTHENTICATION = 0x01
+    # Adjust the number of workers to the target's latency and errors
+    ADAPTIVE_CONCURRENCY = 0x02
+    # Try all the combinations of the fuzzing strings
+    CLUSTER_BOMB = 0x04
+    # Learn the uninteresting responses from random strings and hide them
+    AUTO_CALIBRATE = 0x08
+    # Restore the state from when the fuzzed Flow was reached, instead of
+    # following the FlowGraph again
+    RESTORE_SNAPSHOT = 0x10
 
     def __init__(
         self,
         project: Project,
         flow: Flow,
-        fuzzing_point: str,
+        fuzzing_point: Union[str, List[str]],
         flags: int = 0,
+        flowgraph: Optional[str] = None,
     ) -> None:
         """Initialize the Fuzz object.
 
@@ -58,144 +189,667 @@ class Fuzz:
             fuzzed.
           fuzzing_point:
             The name given to the :class:`Plugin
-            <raider.plugins.Plugin>` which should be fuzzed.
-          fuzzing_generator:
-            A function which returns a Python generator, that will
-            create the strings that will be used for fuzzing. The
-            function should accept one argument. This will be the value
-            of the plugin before fuzzing. It can be considered when
-            building the fuzzing list, or ignored.
+            <raider.plugins.Plugin>` which should be fuzzed, or a list
+            with the names of multiple Plugins.
+          flags:
+            An integer with the fuzzing flags. Set IS_AUTHENTICATION
+            to follow the ``flowgraph`` while fuzzing,
+            ADAPTIVE_CONCURRENCY to adjust the number of ``workers``
+            automatically, CLUSTER_BOMB to try all combinations of
+            the fuzzing strings, AUTO_CALIBRATE to hide the responses
+            looking like the ones to random strings, and
+            RESTORE_SNAPSHOT to restore the state from when the fuzzed
+            Flow was reached instead of following the FlowGraph again.
+          flowgraph:
+            An optional string with the name of the :class:`FlowGraph
+            <raider.flowgraph.FlowGraph>` leading to the fuzzed
+            :class:`Flow <raider.flow.Flow>`. The ``DEFAULT`` FlowGraph
+            is used if not set.
 
         """
 
         self.project = project
         self.flow = flow
-        self.fuzzing_point = fuzzing_point
+        if isinstance(fuzzing_point, str):
+            fuzzing_point = [fuzzing_point]
+        self.fuzzing_points = list(fuzzing_point)
         self.flags = flags
+        self.flowgraph = flowgraph or "DEFAULT"
 
-        self.generator: Optional[Callable[..., List[str]]] = None
+        self.generators: Dict[str, Generator] = {}
         self.processor: Callable[[str], str] = lambda value: value
 
+        # Only run the combinations from this shard (index, count)
+        self.shard = (0, 1)
+
+        # Number of fuzzing strings in one batch when profiling
+        self.batch_size = 100
+
+        # Number of concurrent requests, or the maximum number with
+        # ADAPTIVE_CONCURRENCY. With IS_AUTHENTICATION, the number of
+        # sessions in the pool.
+        self.workers = 1
+        self.controller: Optional[ConcurrencyController] = None
+        self.sessions: Optional[SessionPool] = None
+
+        # Fuzzing strings whose request couldn't be sent, with the error
+        self.failures: List[Tuple[str, str]] = []
+
+        # Where the result of every request is recorded, if set
+        self.results: Optional[ResultStore] = None
+
+        # Hidden responses don't run the operations and aren't recorded
+        self.filters: Optional[ResponseFilter] = None
+        # Number of random strings sent with AUTO_CALIBRATE
+        self.calibration_count = 4
+
+        # Groups the near-duplicate responses, if set
+        self.clusters: Optional[ResponseClusters] = None
+
+        # Saves the progress so the run can be resumed, if set
+        self.checkpoint: Optional[Checkpoint] = None
+
     def run(self) -> None:
-        """Runs the fuzzer."""
-        if self.is_authentication:
-            self.attack_authentication()
-        else:
-            self.attack_function()
+        """Runs the fuzzer.
+
+        With a ``checkpoint``, the fuzzing strings completed by a
+        previous run are skipped, and the files the operations append
+        to are truncated to their size when the checkpoint was saved.
+
+        """
+        checkpoint = self.checkpoint
+        if checkpoint:
+            checkpoint.track_outputs(self.output_files())
+            checkpoint.restore_outputs()
+
+        if self.results:
+            if checkpoint and checkpoint.run:
+                self.results.resume_run(checkpoint.run)
+            else:
+                self.results.start_run(self.flow_name, self.fuzzing_points)
+            if checkpoint:
+                checkpoint.run = self.results.run
+
+        finished = False
+        try:
+            if self.is_authentication:
+                self.attack_authentication()
+            else:
+                self.attack_function()
+            finished = True
+        finally:
+            self.project.flowstore.stop_prefetching()
+            if self.results:
+                self.results.flush()
+            if checkpoint:
+                checkpoint.save(finished)
+
+    def set_generator(
+        self, generator: Generator, fuzzing_point: Optional[str] = None
+    ) -> None:
+        """Sets the generator of a fuzzing point.
+
+        Args:
+          generator:
+            A function receiving the original value of the Plugin, and
+            returning an iterable with the fuzzing strings. It's called
+            again every time the strings are needed, so it should
+            return a new iterable each time.
+          fuzzing_point:
+            An optional string with the name of the fuzzing point. The
+            first one is used if not set.
+
+        """
+        self.generators[fuzzing_point or self.fuzzing_point] = generator
 
     def set_input_file(
-        self, filename: str, prepend: bool = False, append: bool = False
+        self,
+        filename: str,
+        prepend: bool = False,
+        append: bool = False,
+        fuzzing_point: Optional[str] = None,
     ) -> None:
         """Sets the input file for the fuzzer.
 
         Uses the input file to generate fuzzing strings, and sets the
-        generator function to return those values.
+        generator function to return those values. The file is read
+        lazily, one line at a time.
+
+        Args:
+          filename:
+            A string with the path to the file with the inputs.
+          prepend:
+            A boolean flag meaning the original value will be prepended
+            with the fuzzing string.
+          append:
+            A boolean flag meaning the original value will be appended
+            with the fuzzing string.
+          fuzzing_point:
+            An optional string with the name of the fuzzing point. The
+            first one is used if not set.
 
         """
+        self.set_generator(
+            partial(
+                file_generator,
+                filename=filename,
+                prepend=prepend,
+                append=append,
+            ),
+            fuzzing_point,
+        )
 
-        def fuzzing_generator(
-            value: str, filename: str, prepend: bool, append: bool
-        ) -> List[str]:
-            """Generate a list of strings to use for fuzzing.
-
-            Args:
-              value:
-                The original value of the field.
-              filename:
-                The filename with the inputs.
-              prepend:
-                A boolean flag meaning the original value will be
-                prepended with the fuzzing string.
-              append:
-                A boolean flag meaning the original value will be
-                appended with the fuzzing string.
-
-            Returns:
-              A list of final strings to be fuzzed.
-            """
-            fuzzstrings = []
-            with open(filename, encoding="utf-8") as contents:
-                for item in contents.readlines():
-                    if prepend:
-                        fuzzstrings.append(item.strip() + value)
-                    elif append:
-                        fuzzstrings.append(value + item.strip())
-                    else:
-                        fuzzstrings.append(item.strip())
+    def payloads(self, values: Sequence[str]) -> Iterator[Tuple[str, ...]]:
+        """Returns the combinations of fuzzing strings for this shard.
 
-            return fuzzstrings
+        With CLUSTER_BOMB, the strings of the first fuzzing point are
+        split between the shards, and each shard combines its strings
+        with all the strings of the other fuzzing points. Otherwise the
+        combinations are split one by one.
 
-        self.generator = partial(
-            fuzzing_generator,
-            filename=filename,
-            prepend=prepend,
-            append=append,
-        )
+        Args:
+          values:
+            A list with the original values of the fuzzed Plugins, in
+            the same order as ``fuzzing_points``.
+
+        Returns:
+          An iterator with tuples containing one fuzzing string for
+          each fuzzing point.
+
+        """
+        for name in self.fuzzing_points:
+            if name not in self.generators:
+                logging.critical(
+                    "Cannot run fuzzing without configuring the "
+                    "generator for %s.",
+                    name,
+                )
+                sys.exit()
+
+        factories = [
+            partial(self.generators[name], value)
+            for name, value in zip(self.fuzzing_points, values)
+        ]
+        index, count = self.shard
+        if self.flags & self.CLUSTER_BOMB:
+            # Split on the first fuzzing point, so a shard doesn't
+            # generate the combinations of the other shards
+            outer = factories[0]
+            factories[0] = lambda: itertools.islice(
+                outer(), index, None, count
+            )
+            return cluster_bomb(factories)
 
-    def get_fuzzing_input(self, flow: Flow) -> Plugin:
-        """Returns the Plugin associated with the fuzzing input.
+        return itertools.islice(pitchfork(factories), index, None, count)
+
+    def get_fuzzing_inputs(self, flow: Flow) -> List[Plugin]:
+        """Returns the Plugins associated with the fuzzing points.
 
         Args:
           flow:
-            The flow object with the plugin to be returned.
+            The flow object with the plugins to be returned.
 
         Returns:
-          The plugin object to be fuzzed.
+          A list with the plugin objects to be fuzzed, in the same
+          order as ``fuzzing_points``.
+
         """
         flow_inputs = flow.request.list_inputs()
-        if flow_inputs:
-            fuzzing_plugin = flow_inputs.get(self.fuzzing_point)
+        if not flow_inputs:
+            logging.critical("Flow %s has no inputs", self.flow_name)
+            sys.exit()
+
+        plugins = []
+        for name in self.fuzzing_points:
+            fuzzing_plugin = flow_inputs.get(name)
             if not fuzzing_plugin:
-                logging.critical(
-                    "Fuzzing point %s not found", self.fuzzing_point
-                )
+                logging.critical("Fuzzing point %s not found", name)
                 sys.exit()
-        else:
-            logging.critical("Flow %s has no inputs", flow.name)
-            sys.exit()
+            plugins.append(fuzzing_plugin)
 
-        return fuzzing_plugin
+        return plugins
+
+    def set_values(
+        self, plugins: List[Plugin], combination: Tuple[str, ...]
+    ) -> None:
+        """Sets the fuzzing strings as the values of the Plugins."""
+        for plugin, item in zip(plugins, combination):
+            plugin.value = self.processor(item)
+            plugin.function = plugin.return_value
 
     def attack_function(self) -> None:
-        """Attacks a flow defined in ``_functions``.
+        """Attacks a single Flow.
 
         Fuzz blindly the Flow object. It doesn't take into account the
         authentication process, so this function is useful for fuzzing
         stuff as an already authenticated user.
 
-        Args:
-          user:
-            A :class:`User <raider.user.User>` object with the user
-            specific information.
-          config:
-            A :class:`Config <raider.config.Config>` object with global
-            **Raider** configuration.
-
         """
-        user = self.project.active_user
-        config = self.project.config
-        flow = deepcopy(self.flow)
-        fuzzing_plugin = self.get_fuzzing_input(flow)
-        flow.get_plugin_values(user)
+        pconfig = self.project.pconfig
+        flow = self.flow.clone()
+        plugins = self.get_fuzzing_inputs(flow)
 
         # Reset plugin flags because it doesn't need userdata nor
         # the HTTP response anymore when fuzzing
-        fuzzing_plugin.flags = 0
+        for plugin in plugins:
+            plugin.flags = 0
+
+        elements = self.payloads([plugin.value for plugin in plugins])
+        self.calibrate(flow, plugins)
+        if self.workers > 1 or self.is_adaptive:
+            self.attack_concurrently(elements)
+            return
+
+        for index, item in self.pending(elements):
+            batch = "fuzz:batch-" + str(index // self.batch_size)
+            with profile_section(pconfig, batch):
+                self.set_values(plugins, item)
+                started = time.perf_counter()
+                try:
+                    flow.execute(pconfig)
+                except TransportError as err:
+                    with self.completing(index, failed=True):
+                        self.record_failure(item, err, index)
+                    continue
+                with self.completing(index):
+                    if self.is_hidden(flow, plugins):
+                        continue
+                    self.record_result(
+                        index, item, flow, time.perf_counter() - started
+                    )
+                    flow.run_operations()
+
+    def attack_concurrently(self, elements: Iterable[Tuple[str, ...]]) -> None:
+        """Attacks a single Flow with concurrent requests.
+
+        Each worker thread fuzzes its own copy of the Flow. The number
+        of requests running at the same time is limited by a
+        :class:`ConcurrencyController
+        <raider.concurrency.ConcurrencyController>`, which with the
+        ADAPTIVE_CONCURRENCY flag starts at one request and adjusts
+        itself up to ``workers``, reporting every change.
+
+        Args:
+          elements:
+            An iterable with the combinations of fuzzing strings.
+
+        """
+        pconfig = self.project.pconfig
+        flow_name = self.flow_name
+        self.controller = ConcurrencyController(
+            initial=1 if self.is_adaptive else self.workers,
+            maximum=self.workers,
+            adaptive=self.is_adaptive,
+            callback=self.report_concurrency,
+        )
+        controller = self.controller
+        local = threading.local()
+
+        def attack(index: int, item: Tuple[str, ...]) -> None:
+            if not hasattr(local, "flow"):
+                local.flow = self.flow.clone()
+                local.plugins = self.get_fuzzing_inputs(local.flow)
+                for plugin in local.plugins:
+                    plugin.flags = 0
+            if getattr(pconfig, "timings", None):
+                pconfig.timings.flow = flow_name
+
+            started = time.monotonic()
+            batch = "fuzz:batch-" + str(index // self.batch_size)
+            try:
+                with profile_section(pconfig, batch):
+                    self.set_values(local.plugins, item)
+                    try:
+                        local.flow.execute(pconfig)
+                    except TransportError as err:
+                        controller.record(
+                            started, time.monotonic() - started, error=True
+                        )
+                        with self.completing(index, failed=True):
+                            self.record_failure(item, err, index)
+                        return
+                    latency = time.monotonic() - started
+                    controller.record(
+                        started, latency, local.flow.response.status_code
+                    )
+                    with self.completing(index):
+                        if self.is_hidden(local.flow, local.plugins):
+                            return
+                        self.record_result(index, item, local.flow, latency)
+                        local.flow.run_operations()
+            finally:
+                controller.release()
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="raider-fuzz"
+        ) as executor:
+            for index, item in self.pending(elements):
+                controller.acquire()
+                future = executor.submit(attack, index, item)
+                future.add_done_callback(self.log_exception)
+
+    def attack_sessions(self, elements: Iterable[Tuple[str, ...]]) -> None:
+        """Attacks a Flow inside a FlowGraph with a pool of sessions.
+
+        Used by ``attack_authentication`` with more than one worker.
+        Each of the ``workers`` sessions in the :class:`SessionPool
+        <raider.sessions.SessionPool>` follows the FlowGraph on its
+        own, so one-time tokens aren't shared. A session sends one
+        fuzzing request at a time, and when the fuzzed Flow moves to
+        another Flow, it follows the FlowGraph again in the background
+        while the other sessions keep fuzzing.
+
+        Args:
+          elements:
+            An iterable with the combinations of fuzzing strings.
 
-        if not self.generator:
+        """
+        pconfig = self.project.pconfig
+        flow_name = self.flow_name
+        self.sessions = SessionPool(
+            self.project,
+            flow_name,
+            self.flowgraph,
+            size=self.workers,
+            prepare=self.prepare_session,
+        )
+        pool = self.sessions
+
+        def attack(
+            index: int, item: Tuple[str, ...], session: Session
+        ) -> None:
+            next_flow = None
+            batch = "fuzz:batch-" + str(index // self.batch_size)
+            try:
+                with profile_section(pconfig, batch), measure(
+                    pconfig, "flow", flow_name
+                ):
+                    session.flowstore.get_flow_to_run(
+                        session.pconfig, flow_name
+                    )
+                    self.set_values(session.plugins, item)
+                    started = time.perf_counter()
+                    try:
+                        session.flow.execute(session.pconfig)
+                    except TransportError as err:
+                        with self.completing(index, failed=True):
+                            self.record_failure(item, err, index)
+                        pool.invalidate(session)
+                        return
+                    with self.completing(index):
+                        hidden = self.is_hidden(session.flow, session.plugins)
+                        if not hidden:
+                            self.record_result(
+                                index,
+                                item,
+                                session.flow,
+                                time.perf_counter() - started,
+                            )
+                        next_flow = self.finish_flow(
+                            session.project, session.flow, hidden
+                        )
+            except BaseException:
+                pool.invalidate(session)
+                raise
+            pool.checkin(session, next_flow)
+
+        pool.start()
+        try:
+            if self.flags & self.AUTO_CALIBRATE:
+                session = self.checkout_session()
+                self.calibrate(session.flow, session.plugins)
+                pool.invalidate(session)
+
+            with ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="raider-fuzz"
+            ) as executor:
+                for index, item in self.pending(elements):
+                    session = self.checkout_session()
+                    future = executor.submit(attack, index, item, session)
+                    future.add_done_callback(self.log_exception)
+        finally:
+            pool.close()
+
+    def prepare_session(self, session: Session) -> None:
+        """Finds the fuzzed Plugins of a new session."""
+        session.plugins = self.get_fuzzing_inputs(session.flow)
+        for plugin in session.plugins:
+            plugin.flags = 0
+
+    def checkout_session(self) -> Session:
+        """Returns a session ready to be fuzzed, or exits if none is."""
+        session = self.sessions.checkout() if self.sessions else None
+        if not session:
             logging.critical(
-                "Cannot run fuzzing without configuring the generator."
+                "No session could reach the %s flow.", self.flow_name
             )
             sys.exit()
+        return session
+
+    @staticmethod
+    def log_exception(future: Future) -> None:
+        """Logs the exception raised by a fuzzing request."""
+        if future.exception():
+            logging.error("Fuzzing failed: %s", future.exception())
+
+    def calibrate(
+        self,
+        flow: Flow,
+        plugins: List[Plugin],
+        reset: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Learns which responses to hide with AUTO_CALIBRATE.
+
+        Sends ``calibration_count`` requests with random strings of
+        different lengths in every fuzzing point. The responses to them
+        become the baseline of the ``filters``, and fuzzing responses
+        looking the same are hidden. The operations aren't run on the
+        calibration responses.
+
+        Args:
+          flow:
+            The :class:`Flow <raider.flow.Flow>` to send the requests
+            with.
+          plugins:
+            A list with the fuzzed Plugins of the Flow.
+          reset:
+            An optional function called after each request, to reach
+            the Flow again when the request used up its state, like a
+            one-time token.
+
+        """
+        if not self.flags & self.AUTO_CALIBRATE:
+            return
+        if not self.filters:
+            self.filters = ResponseFilter()
+
+        pconfig = self.project.pconfig
+        samples = []
+        for index in range(self.calibration_count):
+            item = tuple(random_payload(8 + 4 * index) for _ in plugins)
+            self.set_values(plugins, item)
+            try:
+                flow.execute(pconfig)
+            except TransportError as err:
+                logging.error("Calibration request failed: %s", err)
+            else:
+                samples.append(
+                    (flow.response, [plugin.value for plugin in plugins])
+                )
+            if reset:
+                reset()
+
+        self.filters.calibrate(samples)
+        for description in self.filters.describe():
+            print(colored_text("Hiding: ", "BLUE-BLACK-B") + description)
+
+    @staticmethod
+    def finish_flow(project: Project, flow: Flow, hidden: bool) -> Any:
+        """Saves the outputs and runs the operations of the fuzzed Flow.
 
-        for item in self.generator(fuzzing_plugin.value):
-            fuzzing_plugin.value = self.processor(item)
-            fuzzing_plugin.function = fuzzing_plugin.return_value
-            flow.execute(user, config)
-            flow.run_operations()
+        The outputs and :class:`Next <raider.operations.Next>` always
+        run, so the FlowGraph is followed with fresh tokens. For hidden
+        responses, the :class:`Print <raider.operations.Print>` and
+        :class:`Save <raider.operations.Save>` operations are skipped.
+
+        Args:
+          project:
+            The :class:`Project <raider.projects.Project>` the Flow
+            belongs to.
+          flow:
+            The fuzzed :class:`Flow <raider.flow.Flow>`.
+          hidden:
+            A boolean, True if the response matches the ``filters``.
+
+        Returns:
+          The value returned by the operations, usually the name of the
+          next Flow.
+
+        """
+        pconfig = project.pconfig
+        pconfig.hide_output = hidden
+        try:
+            return project.flowstore.finish_flow(pconfig, flow)
+        finally:
+            pconfig.hide_output = False
+
+    def is_hidden(self, flow: Flow, plugins: List[Plugin]) -> bool:
+        """Returns True if the response matches the ``filters``."""
+        if not self.filters:
+            return False
+        return self.filters.is_hidden(
+            flow.response, [plugin.value for plugin in plugins]
+        )
+
+    def record_failure(
+        self,
+        item: Tuple[str, ...],
+        error: Exception,
+        index: Optional[int] = None,
+    ) -> None:
+        """Records fuzzing strings whose request couldn't be sent.
+
+        Args:
+          item:
+            A tuple with the fuzzing strings.
+          error:
+            The exception raised while sending the request.
+          index:
+            An optional integer with the position of the fuzzing
+            strings in this shard.
+
+        """
+        payload = ", ".join(item)
+        logging.error("Fuzzing with %s failed: %s", payload, error)
+        self.failures.append((payload, str(error)))
+        if self.results and index is not None:
+            self.results.record(
+                self.position(index), payload, error=str(error)
+            )
+
+    def record_result(
+        self,
+        index: int,
+        item: Tuple[str, ...],
+        flow: Flow,
+        latency: float,
+    ) -> None:
+        """Records the response in ``results`` and ``clusters``.
+
+        Args:
+          index:
+            An integer with the position of the fuzzing strings in this
+            shard.
+          item:
+            A tuple with the fuzzing strings.
+          flow:
+            The :class:`Flow <raider.flow.Flow>` with the response.
+          latency:
+            A float with the number of seconds the request took.
+
+        """
+        position = self.position(index)
+        fingerprint = None
+        if self.clusters:
+            fingerprint = self.clusters.add(
+                position,
+                flow.response.content or b"",
+                [self.processor(value) for value in item],
+            )
+        if self.results:
+            self.results.record(
+                position,
+                ", ".join(item),
+                flow.response,
+                latency,
+                simhash=fingerprint,
+            )
+
+    def pending(
+        self, elements: Iterable[Tuple[str, ...]]
+    ) -> Iterable[Tuple[int, Tuple[str, ...]]]:
+        """Returns the fuzzing strings to send, with their position.
+
+        Skips the ones completed according to the ``checkpoint``.
+
+        """
+        if self.checkpoint:
+            return self.checkpoint.pending(elements)
+        return enumerate(elements)
+
+    def completing(
+        self, index: int, failed: bool = False
+    ) -> ContextManager[None]:
+        """Returns the context in which the fuzzing strings finish.
+
+        The operations run inside it, so the ``checkpoint`` isn't saved
+        while they write their outputs.
+
+        Args:
+          index:
+            An integer with the position of the fuzzing strings in this
+            shard.
+          failed:
+            A boolean, True if the request couldn't be sent.
+
+        """
+        if self.checkpoint:
+            return self.checkpoint.completing(index, failed)
+        return nullcontext()
+
+    def output_files(self) -> List[str]:
+        """Returns the files the operations of the Flow append to."""
+        return [
+            operation.filename
+            for operation in self.flow.operations or []
+            if getattr(operation, "will_append", False)
+        ]
+
+    def position(self, index: int) -> int:
+        """Returns the position of the fuzzing strings in all shards.
+
+        Positions are unique across the shards, but with CLUSTER_BOMB
+        they don't follow the order of the combinations.
+
+        """
+        shard, count = self.shard
+        return shard + index * count
+
+    @staticmethod
+    def report_concurrency(old: int, new: int, reason: str) -> None:
+        """Prints the changes in the number of concurrent requests."""
+        print(
+            colored_text("Concurrency: ", "BLUE-BLACK-B")
+            + str(old)
+            + " -> "
+            + str(new)
+            + " ("
+            + reason
+            + ")"
+        )
 
     def attack_authentication(self) -> None:
-        """Attacks a Flow defined in ``_authentication``.
+        """Attacks a Flow inside a FlowGraph.
 
         Unlike ``attack_function``, this will take into account the
         finite state machine defined in the hyfiles. This should be used
@@ -203,56 +857,147 @@ class Fuzz:
         for example if some token needs to be extracted again from a
         previous authentication step for fuzzing to work.
 
-        It will first follow the authentication process until reaching
-        the desired state, then it will try fuzzing it, and if a
-        :class:`Next <raider.operations.Next>` operation is
-        encountered, it will follow the instruction and move to this
-        flow, then continue fuzzing.
+        It will first follow the FlowGraph until reaching the desired
+        Flow, then it will try fuzzing it, and if a :class:`Next
+        <raider.operations.Next>` operation is encountered, it will
+        follow the instruction and move to this flow, then continue
+        fuzzing. With the RESTORE_SNAPSHOT flag, a :class:`Snapshot
+        <raider.snapshots.Snapshot>` is taken when the Flow is reached,
+        and restored instead, so the previous Flows aren't sent again.
+        This only works when the server doesn't invalidate the state,
+        for example with one-time tokens.
+
+        The fuzzed Flow isn't copied, so the outputs extracted while
+        following the FlowGraph are used by its inputs. The fuzzed
+        Plugins are restored when the attack is over.
+
+        With more than one worker, ``attack_sessions`` fuzzes the Flow
+        with a pool of independently authenticated sessions instead.
 
         """
-        authentication = self.project.authentication
-        user = self.project.active_user
-        config = self.project.config
+        pconfig = self.project.pconfig
+        flowstore = self.project.flowstore
+        flow_name = self.flow_name
+        flowgraph = flowstore.flowgraphs.get(self.flowgraph)
+        if not flowgraph:
+            logging.critical("FlowGraph %s not defined", self.flowgraph)
+            sys.exit()
 
-        while authentication.current_flow_name != self.flow.name:
-            authentication.run_current_flow(user, config)
+        if self.workers > 1:
+            plugins = self.get_fuzzing_inputs(self.flow)
+            self.attack_sessions(
+                self.payloads([plugin.value for plugin in plugins])
+            )
+            return
 
-        flow = deepcopy(self.flow)
-        fuzzing_plugin = self.get_fuzzing_input(flow)
+        start = flowstore.get_flow_name_by_flow(flowgraph.start)
+        self.reach_flow(start)
+        snapshot = None
+        if self.flags & self.RESTORE_SNAPSHOT:
+            snapshot = Snapshot.capture(self.project, flow_name)
 
-        # Reset plugin flags because it doesn't need userdata nor
-        # the HTTP response anymore when fuzzing
-        fuzzing_plugin.flags = 0
+        plugins = self.get_fuzzing_inputs(self.flow)
+        originals = [
+            (plugin.flags, plugin.function, plugin.value) for plugin in plugins
+        ]
 
-        if not self.generator:
-            logging.critical(
-                "Cannot run fuzzing without configuring the generator."
-            )
-            sys.exit()
+        elements = self.payloads([plugin.value for plugin in plugins])
 
-        elements = self.generator(fuzzing_plugin.value)
-
-        for item in elements:
-            fuzzing_plugin.value = self.processor(item)
-            fuzzing_plugin.function = fuzzing_plugin.return_value
-            flow.execute(user, config)
-            next_flow = flow.run_operations()
-            if next_flow:
-                while next_flow != flow.name:
-                    if next_flow:
-                        next_flow = authentication.run_flow(
-                            next_flow, user, config
+        # Reset plugin flags because it doesn't need userdata nor
+        # the HTTP response anymore when fuzzing
+        for plugin in plugins:
+            plugin.flags = 0
+
+        def reset() -> None:
+            if snapshot:
+                snapshot.restore(self.project)
+            else:
+                self.reach_flow(start)
+
+        try:
+            self.calibrate(self.flow, plugins, reset)
+            for index, item in self.pending(elements):
+                next_flow = None
+                batch = "fuzz:batch-" + str(index // self.batch_size)
+                with profile_section(pconfig, batch), measure(
+                    pconfig, "flow", flow_name
+                ):
+                    flowstore.get_flow_to_run(pconfig, flow_name)
+                    self.set_values(plugins, item)
+                    started = time.perf_counter()
+                    try:
+                        self.flow.execute(pconfig)
+                    except TransportError as err:
+                        with self.completing(index, failed=True):
+                            self.record_failure(item, err, index)
+                        continue
+                    with self.completing(index):
+                        hidden = self.is_hidden(self.flow, plugins)
+                        if not hidden:
+                            self.record_result(
+                                index,
+                                item,
+                                self.flow,
+                                time.perf_counter() - started,
+                            )
+                        next_flow = self.finish_flow(
+                            self.project, self.flow, hidden
                         )
+                if isinstance(next_flow, str) and next_flow != flow_name:
+                    if snapshot:
+                        snapshot.restore(self.project)
                     else:
-                        logging.critical(
-                            (
-                                "Cannot reach the %s flow. ",
-                                "Make sure you defined Next correctly.",
-                            ),
-                            flow.name,
-                        )
+                        self.reach_flow(next_flow)
+        finally:
+            for plugin, original in zip(plugins, originals):
+                plugin.flags, plugin.function, plugin.value = original
+
+    def reach_flow(self, next_flow: Optional[str]) -> None:
+        """Runs the Flows until reaching the fuzzed Flow.
+
+        Args:
+          next_flow:
+            A string with the name of the first Flow to run.
+
+        """
+        pconfig = self.project.pconfig
+        flowstore = self.project.flowstore
+        while next_flow != self.flow_name:
+            if not isinstance(next_flow, str):
+                logging.critical(
+                    "Cannot reach the %s flow. "
+                    "Make sure you defined Next correctly.",
+                    self.flow_name,
+                )
+                sys.exit()
+            next_flow = flowstore.run_flow(pconfig, next_flow)
+
+    @property
+    def fuzzing_point(self) -> str:
+        """Returns the name of the first fuzzing point."""
+        return self.fuzzing_points[0]
+
+    @property
+    def generator(self) -> Optional[Generator]:
+        """Returns the generator of the first fuzzing point."""
+        return self.generators.get(self.fuzzing_point)
+
+    @generator.setter
+    def generator(self, value: Generator) -> None:
+        """Sets the generator of the first fuzzing point."""
+        self.set_generator(value)
+
+    @property
+    def flow_name(self) -> str:
+        """Returns the name of the fuzzed Flow."""
+        return self.project.flowstore.get_flow_name_by_flow(self.flow)
 
     @property
     def is_authentication(self) -> bool:
         """Returns True if the IS_AUTHENTICATION flag is set."""
         return bool(self.flags & self.IS_AUTHENTICATION)
+
+    @property
+    def is_adaptive(self) -> bool:
+        """Returns True if the ADAPTIVE_CONCURRENCY flag is set."""
+        return bool(self.flags & self.ADAPTIVE_CONCURRENCY)
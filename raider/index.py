@@ -0,0 +1,475 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Persistent index of the projects used by ``raider show``.
+"""
+
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import hy
+
+import raider.operations as Operations
+import raider.plugins as Plugins
+from raider.utils import (
+    get_config_file,
+    get_project_dir,
+    get_project_file,
+    list_hyfiles,
+    list_projects,
+)
+
+# Increased when the format changes, so old indexes are rebuilt
+INDEX_VERSION = 1
+
+PLUGIN_CLASSES = frozenset(
+    name
+    for name, value in vars(Plugins).items()
+    if isinstance(value, type) and issubclass(value, Plugins.Plugin)
+)
+OPERATION_CLASSES = frozenset(
+    name
+    for name, value in vars(Operations).items()
+    if isinstance(value, type) and issubclass(value, Operations.Operation)
+)
+
+
+def get_head(model: Any) -> Optional[str]:
+    """Returns the name called by a hy expression.
+
+    Args:
+      model:
+        A hy model.
+
+    Returns:
+      A string with the name of the called function or class, like
+      "Flow" or "Request.get", or None if the model isn't a call.
+
+    """
+    if not isinstance(model, hy.models.Expression) or not model:
+        return None
+    head = model[0]
+    if isinstance(head, hy.models.Symbol):
+        return str(head)
+    # (. Request get) in newer hy versions
+    if get_head(head) == "." and len(head) > 2:
+        return ".".join(str(item) for item in head[1:])
+    return None
+
+
+def get_symbols(model: Any) -> List[str]:
+    """Returns the mangled names of the symbols inside a hy model."""
+    symbols = []
+    models = [model]
+    while models:
+        item = models.pop()
+        if isinstance(item, hy.models.Symbol):
+            name = str(item).split(".")[0]
+            if name and hy.mangle(name) not in symbols:
+                symbols.append(hy.mangle(name))
+        elif get_head(item) == "." and len(item) > 1:
+            # Only the object, not the attribute names
+            models.append(item[1])
+        elif isinstance(item, hy.models.Sequence):
+            models.extend(reversed(item))
+    return symbols
+
+
+def get_calls(model: Any, names: frozenset) -> List[str]:
+    """Returns the names from ``names`` called inside a hy model."""
+    calls = []
+    models = [model]
+    while models:
+        item = models.pop()
+        head = get_head(item)
+        if head:
+            head = head.split(".")[0]
+            if head in names and head not in calls:
+                calls.append(head)
+        if isinstance(item, hy.models.Sequence):
+            models.extend(reversed(item))
+    return calls
+
+
+def get_name(model: Any) -> Optional[str]:
+    """Returns the mangled name of a symbol, or None for other models."""
+    if isinstance(model, hy.models.Symbol):
+        return hy.mangle(model)
+    return None
+
+
+def split_arguments(
+    arguments: Any,
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """Splits the arguments of a hy call in positional and keywords."""
+    positional = []
+    keywords = {}
+    items = list(arguments)
+    while items:
+        item = items.pop(0)
+        if isinstance(item, hy.models.Keyword) and items:
+            keywords[item.name] = items.pop(0)
+        else:
+            positional.append(item)
+    return positional, keywords
+
+
+def parse_hyfile(filename: str) -> Dict[str, Any]:
+    """Finds the objects defined in a hyfile without evaluating it.
+
+    Only the top level ``setv`` forms are considered. Flows, FlowGraphs
+    and Plugins created inside other forms or by macros aren't found.
+
+    Args:
+      filename:
+        A string with the path of the hyfile.
+
+    Returns:
+      A dictionary with the "flows", "flowgraphs" and "plugins" defined
+      in the hyfile, in the order they're defined.
+
+    """
+    entry: Dict[str, Dict[str, Any]] = {
+        "flows": {},
+        "flowgraphs": {},
+        "plugins": {},
+    }
+    with open(filename, encoding="utf-8") as hyfile:
+        try:
+            while True:
+                form = hy.read(hyfile)
+                if get_head(form) == "setv":
+                    arguments = list(form[1:])
+                    for name, value in zip(arguments[::2], arguments[1::2]):
+                        if isinstance(name, hy.models.Symbol):
+                            add_definition(entry, hy.mangle(name), value)
+        except EOFError:
+            pass
+    return entry
+
+
+def add_definition(entry: Dict[str, Any], name: str, value: Any) -> None:
+    """Adds a Flow, FlowGraph or Plugin to a hyfile's index entry."""
+    head = get_head(value)
+    if not head:
+        return
+    positional, keywords = split_arguments(value[1:])
+    if head == "Flow":
+        request = keywords.get("request")
+        if request is None and positional:
+            request = positional[0]
+        entry["flows"][name] = {
+            "uses": get_symbols(request) if request is not None else [],
+            "outputs": get_symbols(keywords.get("outputs", [])),
+            "operations": get_calls(
+                keywords.get("operations", []), OPERATION_CLASSES
+            ),
+        }
+    elif head == "FlowGraph":
+        start = keywords.get("start", positional[0] if positional else None)
+        test = keywords.get(
+            "test", positional[1] if len(positional) > 1 else None
+        )
+        entry["flowgraphs"][name] = {
+            "start": get_name(start),
+            "test": get_name(test),
+        }
+    elif head.split(".")[0] in PLUGIN_CLASSES:
+        entry["plugins"][name] = head.split(".")[0]
+
+
+class SearchIndex:
+    """Class holding what's defined in the projects' hyfiles.
+
+    Listing the Flows and FlowGraphs with ``raider show`` used to load
+    every project, evaluating all of its :term:`hyfiles`. The index
+    reads the hyfiles with the hy reader instead, without evaluating
+    anything, and finds the Flows, FlowGraphs and Plugins defined with
+    top level ``setv`` forms. For each Flow, it records the names used
+    in its request, its outputs and its operations.
+
+    The index is saved to a JSON file in the configuration directory.
+    Refreshing it compares the modification time and size of the
+    hyfiles with the ones in the index, and only reads the changed
+    ones. The directory of a project is only listed again if its
+    modification time changed.
+
+    Objects created by macros or inside other forms aren't indexed. Use
+    ``raider show --evaluate`` to load the projects instead.
+
+    Attributes:
+      filename:
+        A string with the path of the JSON file.
+      projects:
+        A dictionary with the indexed projects.
+      changed:
+        A boolean, True if the index changed since it was loaded.
+
+    """
+
+    def __init__(self, filename: Optional[str] = None) -> None:
+        """Initializes the SearchIndex object.
+
+        Args:
+          filename:
+            An optional string with the path of the JSON file,
+            ``search_index.json`` in the configuration directory by
+            default.
+
+        """
+        self.filename = filename or get_config_file("search_index.json")
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        self.changed = False
+
+    @classmethod
+    def open(cls, filename: Optional[str] = None) -> "SearchIndex":
+        """Loads the index and refreshes it.
+
+        Args:
+          filename:
+            An optional string with the path of the JSON file.
+
+        Returns:
+          The up to date :class:`SearchIndex`. It's saved if anything
+          changed.
+
+        """
+        index = cls(filename)
+        index.load()
+        index.refresh()
+        if index.changed:
+            index.save()
+        return index
+
+    def load(self) -> None:
+        """Loads the index from the JSON file, if it's valid."""
+        try:
+            with open(self.filename, encoding="utf-8") as index_file:
+                data = json.load(index_file)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.projects = data.get("projects", {})
+
+    def save(self) -> None:
+        """Writes the index, replacing the JSON file atomically."""
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        descriptor, temporary = tempfile.mkstemp(
+            dir=directory, prefix=".search_index-", suffix=".json"
+        )
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as output:
+                json.dump(
+                    {"version": INDEX_VERSION, "projects": self.projects},
+                    output,
+                )
+            os.replace(temporary, self.filename)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.changed = False
+
+    def refresh(self) -> None:
+        """Reads the hyfiles which changed since they were indexed."""
+        names = list_projects()
+        for name in list(self.projects):
+            if name not in names:
+                del self.projects[name]
+                self.changed = True
+        for name in names:
+            self.refresh_project(name)
+
+    def refresh_project(self, name: str) -> None:
+        """Reads the changed hyfiles of a project.
+
+        Args:
+          name:
+            A string with the name of the project.
+
+        """
+        project = self.projects.setdefault(name, {"mtime": None})
+        mtime = os.stat(get_project_dir(name)).st_mtime_ns
+        if project["mtime"] != mtime:
+            hyfiles = list_hyfiles(name)
+            old = project.get("hyfiles", {})
+            project["hyfiles"] = {
+                hyfile: old.get(hyfile, {}) for hyfile in hyfiles
+            }
+            project["mtime"] = mtime
+            self.changed = True
+
+        for hyfile, entry in project["hyfiles"].items():
+            try:
+                stat = os.stat(get_project_file(name, hyfile))
+            except FileNotFoundError:
+                # Removed in the same second the directory was listed
+                project["mtime"] = None
+                continue
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            if entry.get("stamp") == stamp:
+                continue
+            try:
+                entry.update(parse_hyfile(get_project_file(name, hyfile)))
+            except Exception as err:  # pylint: disable=broad-except
+                # Syntax errors are reported when the project is loaded
+                entry.update({"flows": {}, "flowgraphs": {}, "plugins": {}})
+                entry["error"] = str(err)
+            else:
+                entry.pop("error", None)
+            entry["stamp"] = stamp
+            self.changed = True
+
+    def hyfiles(self, project: str) -> Dict[str, Dict[str, Any]]:
+        """Returns the indexed hyfiles of a project.
+
+        Like when loading the project, names defined again are only
+        listed in the first hyfile defining them, and the DEFAULT
+        FlowGraph is added to the hyfile with the first Flow.
+
+        """
+        result = {}
+        seen = set()
+        default = None
+        hyfiles = self.projects.get(project, {}).get("hyfiles", {})
+        for hyfile, entry in hyfiles.items():
+            flows = {
+                name: flow
+                for name, flow in entry.get("flows", {}).items()
+                if name not in seen
+            }
+            flowgraphs = {
+                name: flowgraph
+                for name, flowgraph in entry.get("flowgraphs", {}).items()
+                if name not in seen
+            }
+            seen.update(flows)
+            seen.update(flowgraphs)
+            if flows and default is None:
+                default = hyfile
+                flowgraphs = {
+                    "DEFAULT": {"start": next(iter(flows)), "test": None},
+                    **flowgraphs,
+                }
+            result[hyfile] = {
+                **entry,
+                "flows": flows,
+                "flowgraphs": flowgraphs,
+            }
+        return result
+
+    def search_projects(self, search: str = None) -> Any:
+        """Returns the projects matching the search string.
+
+        Same as :meth:`Projects.search_projects
+        <raider.projects.Projects.search_projects>`.
+
+        """
+        if not search:
+            return sorted(self.projects)
+        matches = sorted(
+            name for name in self.projects if search.lower() in name.lower()
+        )
+        return {project: {} for project in matches}
+
+    def search_hyfiles(self, results, search: str = None) -> Dict:
+        """Returns the hyfiles matching the search string.
+
+        Same as :meth:`Projects.search_hyfiles
+        <raider.projects.Projects.search_hyfiles>`.
+
+        """
+        matches: Dict[str, Dict[str, Any]] = {}
+        for project in results:
+            for hyfile in sorted(self.hyfiles(project)):
+                if not search or search.lower() in hyfile.lower():
+                    matches.setdefault(project, {})[hyfile] = {}
+            if not search and project not in matches:
+                matches[project] = {}
+        return matches
+
+    def search_flows(
+        self,
+        results,
+        search_flows: str = None,
+        search_flowgraphs: str = None,
+    ) -> Dict:
+        """Returns the Flows and FlowGraphs matching the search strings.
+
+        Same as :meth:`Projects.search_flows
+        <raider.projects.Projects.search_flows>`.
+
+        """
+        for project, hyfiles in results.items():
+            indexed = self.hyfiles(project)
+            for hyfile in hyfiles:
+                entry = indexed.get(hyfile, {})
+                hyfiles[hyfile]["flows"] = [
+                    flow
+                    for flow in entry.get("flows", {})
+                    if not search_flows or search_flows.lower() in flow.lower()
+                ]
+                hyfiles[hyfile]["flowgraphs"] = [
+                    flowgraph
+                    for flowgraph in entry.get("flowgraphs", {})
+                    if not search_flowgraphs
+                    or search_flowgraphs.lower() in flowgraph.lower()
+                ]
+        return results
+
+    def get_flowgraph(
+        self, project: str, name: str
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Returns the names of the start and test Flows of a FlowGraph.
+
+        Args:
+          project:
+            A string with the name of the project.
+          name:
+            A string with the name of the FlowGraph.
+
+        Returns:
+          A tuple with the names of the start and test Flows.
+
+        """
+        for entry in self.hyfiles(project).values():
+            flowgraph = entry.get("flowgraphs", {}).get(name)
+            if flowgraph:
+                return flowgraph["start"], flowgraph["test"]
+        return None, None
+
+    def get_inputs(self, project: str, flow: str) -> List[str]:
+        """Returns the Plugins used in a Flow's request.
+
+        Args:
+          project:
+            A string with the name of the project.
+          flow:
+            A string with the name of the Flow.
+
+        Returns:
+          A list with the names of the Plugins defined in the project
+          and used in the Flow's request.
+
+        """
+        hyfiles = self.hyfiles(project).values()
+        plugins = set()
+        uses: List[str] = []
+        for entry in hyfiles:
+            plugins.update(entry.get("plugins", {}))
+            if flow in entry.get("flows", {}):
+                uses = entry["flows"][flow]["uses"]
+        return [name for name in uses if name in plugins]
@@ -0,0 +1,427 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Rate limiting and concurrency limits for the HTTP requests.
+"""
+
+import asyncio
+import collections
+import threading
+import time
+import urllib.parse
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional
+
+from raider.utils import colored_text
+
+# Seconds used to calculate the current throughput
+THROUGHPUT_WINDOW = 10.0
+
+
+class TokenBucket:
+    """Class implementing a token bucket.
+
+    Tokens are added at a constant ``rate``, up to ``burst`` tokens.
+    Each request takes one token. When there are no tokens left, the
+    request is given a time in the future when it can be sent, so the
+    waiting requests are served in order.
+
+    Attributes:
+      rate:
+        A float with the number of tokens added per second.
+      burst:
+        An integer with the maximum number of tokens.
+      tokens:
+        A float with the number of available tokens. It's negative when
+        requests are waiting.
+
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """Initializes the TokenBucket object.
+
+        Args:
+          rate:
+            A float with the number of requests allowed per second.
+          burst:
+            An integer with the number of requests which can be sent
+            at once, after the bucket was idle.
+
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes one token.
+
+        Returns:
+          A float with the number of seconds to wait before sending the
+          request.
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class HostLimit:
+    """Class holding the limits and the statistics for one host.
+
+    Attributes:
+      host:
+        A string with the host name and the port.
+      bucket:
+        A :class:`TokenBucket` object if the rate is limited, or None.
+      max_in_flight:
+        An integer with the maximum number of concurrent requests, or
+        None if it's unlimited.
+      semaphore:
+        A threading.BoundedSemaphore enforcing ``max_in_flight``, or
+        None.
+      in_flight:
+        An integer with the number of requests being sent right now.
+      requests:
+        An integer with the number of requests sent.
+      queued:
+        A float with the total number of seconds requests waited
+        because of the limits.
+
+    """
+
+    def __init__(
+        self,
+        host: str,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        max_in_flight: Optional[int] = None,
+    ) -> None:
+        """Initializes the HostLimit object.
+
+        Args:
+          host:
+            A string with the host name and the port.
+          rate:
+            An optional float with the number of requests per second.
+          burst:
+            An integer with the size of the token bucket.
+          max_in_flight:
+            An optional integer with the maximum number of concurrent
+            requests.
+
+        """
+        self.host = host
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.requests = 0
+        self.queued = 0.0
+
+        self.semaphore = (
+            threading.BoundedSemaphore(max_in_flight)
+            if max_in_flight
+            else None
+        )
+        self._async_semaphore: Optional[asyncio.Semaphore] = None
+        self._finished: Deque[float] = collections.deque()
+        self._lock = threading.Lock()
+
+    @property
+    def async_semaphore(self) -> Optional[asyncio.Semaphore]:
+        """Returns the semaphore used by asyncio tasks."""
+        if self.max_in_flight and not self._async_semaphore:
+            self._async_semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._async_semaphore
+
+    def started(self, queued: float) -> None:
+        """Records a request which got past the limits."""
+        with self._lock:
+            self.in_flight += 1
+            self.queued += queued
+
+    def finished(self) -> None:
+        """Records a request which finished."""
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self._finished.append(now)
+            while self._finished[0] < now - THROUGHPUT_WINDOW:
+                self._finished.popleft()
+
+    @property
+    def throughput(self) -> float:
+        """Returns the requests per second in the last seconds."""
+        since = time.monotonic() - THROUGHPUT_WINDOW
+        with self._lock:
+            recent = [item for item in self._finished if item >= since]
+        return len(recent) / THROUGHPUT_WINDOW
+
+
+class RateLimiter:
+    """Class limiting the requests sent to each host.
+
+    Every host gets its own token bucket limiting the requests per
+    second, and its own limit of concurrent requests. The limits are
+    enforced by the :class:`Transport <raider.transport.Transport>`, so
+    they apply to everything sending requests: Flows, FlowGraphs,
+    fuzzing and load tests.
+
+    Each project has one RateLimiter in its ProjectConfig. It's
+    configured with the ``_rate_limit`` variable in the
+    :term:`hyfiles`, which can be overridden from the command line:
+
+    .. code-block:: hylang
+
+        (setv _rate_limit
+              {"rate" 10
+               "burst" 5
+               "max_in_flight" 4
+               "hosts" {"api.example.com" {"rate" 2}}})
+
+    The ``rate``, ``burst`` and ``max_in_flight`` keys are the default
+    limits for every host, and ``hosts`` contains the limits for
+    specific hosts.
+
+    Attributes:
+      rate:
+        An optional float with the number of requests per second.
+      burst:
+        An integer with the number of requests which can be sent at
+        once after being idle.
+      max_in_flight:
+        An optional integer with the maximum number of concurrent
+        requests.
+      hosts:
+        A dictionary mapping host names to dictionaries with their own
+        ``rate``, ``burst`` and ``max_in_flight``.
+
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        max_in_flight: Optional[int] = None,
+        hosts: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """Initializes the RateLimiter object.
+
+        Args:
+          rate:
+            An optional float with the number of requests per second.
+          burst:
+            An integer with the size of the token bucket.
+          max_in_flight:
+            An optional integer with the maximum number of concurrent
+            requests.
+          hosts:
+            An optional dictionary with the limits for specific hosts.
+
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.hosts: Dict[str, Dict[str, Any]] = dict(hosts or {})
+        self._limits: Dict[str, HostLimit] = {}
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        hosts: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """Changes the limits.
+
+        Only the arguments which are set are changed.
+
+        Args:
+          rate:
+            An optional float with the number of requests per second.
+          burst:
+            An optional integer with the size of the token bucket.
+          max_in_flight:
+            An optional integer with the maximum number of concurrent
+            requests.
+          hosts:
+            An optional dictionary with the limits for specific hosts,
+            merged with the existing ones.
+
+        """
+        with self._lock:
+            if rate is not None:
+                self.rate = rate
+            if burst is not None:
+                self.burst = burst
+            if max_in_flight is not None:
+                self.max_in_flight = max_in_flight
+            if hosts:
+                self.hosts.update(hosts)
+            self._limits = {}
+
+    @property
+    def active(self) -> bool:
+        """Returns True if any limit is set."""
+        return bool(self.rate or self.max_in_flight or self.hosts)
+
+    def host_limit(self, url: str) -> HostLimit:
+        """Returns the :class:`HostLimit` object for the URL's host.
+
+        Args:
+          url:
+            A string with the URL of the request.
+
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._limits:
+                settings = {
+                    "rate": self.rate,
+                    "burst": self.burst,
+                    "max_in_flight": self.max_in_flight,
+                }
+                settings.update(
+                    self.hosts.get(host)
+                    or self.hosts.get(host.split(":")[0])
+                    or {}
+                )
+                self._limits[host] = HostLimit(host, **settings)
+            return self._limits[host]
+
+    @contextmanager
+    def limit(self, url: str, pconfig: Any = None) -> Iterator[None]:
+        """Waits until the request can be sent.
+
+        The context should contain the code sending the request. The
+        time spent waiting is recorded as ``request:queue`` in the
+        :class:`Timings <raider.timing.Timings>`.
+
+        Args:
+          url:
+            A string with the URL of the request.
+          pconfig:
+            An optional ProjectConfig object used to record the timings.
+
+        """
+        if not self.active:
+            yield
+            return
+
+        limit = self.host_limit(url)
+        start = time.perf_counter()
+        if limit.bucket:
+            delay = limit.bucket.reserve()
+            if delay:
+                time.sleep(delay)
+        if limit.semaphore:
+            limit.semaphore.acquire()
+        self._started(limit, time.perf_counter() - start, pconfig)
+        try:
+            yield
+        finally:
+            if limit.semaphore:
+                limit.semaphore.release()
+            limit.finished()
+
+    @asynccontextmanager
+    async def async_limit(
+        self, url: str, pconfig: Any = None
+    ) -> AsyncIterator[None]:
+        """Same as :meth:`limit`, but without blocking the event loop."""
+        if not self.active:
+            yield
+            return
+
+        limit = self.host_limit(url)
+        start = time.perf_counter()
+        if limit.bucket:
+            delay = limit.bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+        semaphore = limit.async_semaphore
+        if semaphore:
+            await semaphore.acquire()
+        self._started(limit, time.perf_counter() - start, pconfig)
+        try:
+            yield
+        finally:
+            if semaphore:
+                semaphore.release()
+            limit.finished()
+
+    @staticmethod
+    def _started(limit: HostLimit, queued: float, pconfig: Any) -> None:
+        """Records the time the request waited."""
+        limit.started(queued)
+        timings = getattr(pconfig, "timings", None)
+        if timings:
+            timings.add("request:queue", timings.flow, queued)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the statistics for each host.
+
+        Returns:
+          A dictionary mapping the host names to dictionaries with the
+          number of ``requests`` sent, the requests ``in_flight``, the
+          current ``throughput`` in requests per second, and the total
+          seconds the requests were ``queued``.
+
+        """
+        with self._lock:
+            limits = list(self._limits.values())
+        return {
+            limit.host: {
+                "requests": limit.requests,
+                "in_flight": limit.in_flight,
+                "throughput": limit.throughput,
+                "queued": limit.queued,
+            }
+            for limit in limits
+        }
+
+    def print_stats(self) -> None:
+        """Prints the statistics for each host."""
+        stats = self.stats()
+        if not stats:
+            return
+        print(
+            colored_text(
+                "{:<40} {:>9} {:>9} {:>11} {:>11}".format(
+                    "Host", "Requests", "In flight", "Throughput", "Queued"
+                ),
+                "BLUE-BLACK-B",
+            )
+        )
+        for host, row in stats.items():
+            print(
+                "{:<40} {:>9} {:>9} {:>9.1f}/s {:>10.2f}s".format(
+                    host[:40],
+                    row["requests"],
+                    row["in_flight"],
+                    row["throughput"],
+                    row["queued"],
+                )
+            )
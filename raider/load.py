@@ -0,0 +1,326 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Load testing by running FlowGraphs with concurrent virtual users.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from raider.config import Config
+from raider.limits import RateLimiter
+from raider.projects import Project
+from raider.timing import Timings
+from raider.utils import colored_text
+
+
+class LoadTest:
+    """Class running a FlowGraph with many concurrent virtual users.
+
+    Each virtual user runs in its own thread, with its own copy of the
+    project, so the Plugins, cookies and the active user aren't shared
+    between them. The copies share the transport, the rate limits and
+    the circuit breaker. Virtual users run the FlowGraph in a loop until
+    the ``duration`` passed, or until they completed their
+    ``iterations``.
+
+    Attributes:
+      gconfig:
+        The global Config object.
+      project:
+        A string with the name of the project.
+      flowgraph:
+        A string with the name of the FlowGraph to run.
+      users:
+        An integer with the number of virtual users.
+      duration:
+        An optional float with the number of seconds to run the test.
+      iterations:
+        An optional integer with the number of times each virtual user
+        runs the FlowGraph.
+      ramp_up:
+        A float with the number of seconds until all virtual users are
+        started. They are started at regular intervals.
+      limiter:
+        The :class:`RateLimiter <raider.limits.RateLimiter>` shared by
+        all virtual users, so the limits apply to the whole test.
+      timings:
+        A :class:`Timings <raider.timing.Timings>` object with the
+        measurements from all virtual users.
+      outcomes:
+        A dictionary with the number of iterations for each result:
+        ``success``, ``failure``, ``unfinished`` and ``error``.
+      elapsed:
+        A float with the number of seconds the test took.
+
+    """
+
+    def __init__(
+        self,
+        gconfig: Config,
+        project: str,
+        flowgraph: str,
+        users: int = 1,
+        duration: Optional[float] = None,
+        iterations: Optional[int] = None,
+        ramp_up: float = 0,
+        rate_limit: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Initializes the LoadTest object.
+
+        Args:
+          gconfig:
+            The global Config object.
+          project:
+            A string with the name of the project.
+          flowgraph:
+            A string with the name of the FlowGraph to run.
+          users:
+            An integer with the number of virtual users.
+          duration:
+            An optional float with the number of seconds to run the
+            test.
+          iterations:
+            An optional integer with the number of times each virtual
+            user runs the FlowGraph. When neither ``duration`` nor
+            ``iterations`` is set, each user runs it once.
+          ramp_up:
+            A float with the number of seconds until all virtual users
+            are started.
+          rate_limit:
+            An optional dictionary with the ``rate``, ``burst`` and
+            ``max_in_flight`` overriding the project's ``_rate_limit``.
+
+        """
+        self.gconfig = gconfig
+        self.logger = gconfig.logger
+        self.project = project
+        self.flowgraph = flowgraph
+        self.users = users
+        self.duration = duration
+        if not duration and not iterations:
+            iterations = 1
+        self.iterations = iterations
+        self.ramp_up = ramp_up
+        self.rate_limit = rate_limit or {}
+        self.limiter: Optional[RateLimiter] = None
+
+        self.timings = Timings()
+        self.outcomes: Dict[str, int] = {}
+        self.elapsed = 0.0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self) -> None:
+        """Runs the load test and waits until it's over.
+
+        The project is loaded for every virtual user before the test
+        starts, so ``elapsed`` only counts the FlowGraphs.
+
+        """
+        self.timings.clear()
+        self.outcomes = {}
+        self._stop.clear()
+
+        project = Project(self.gconfig, self.project)
+        project.load()
+        if not project.flowstore.is_flowgraph(self.flowgraph):
+            self.logger.critical(
+                "FlowGraph %s not defined, cannot run!", self.flowgraph
+            )
+            return
+        self.limiter = project.pconfig.limiter
+        self.limiter.configure(**self.rate_limit)
+        projects = [project]
+        for _ in range(self.users - 1):
+            # Loaded again, since the Plugins keep their values and
+            # the derived ones read them through closures
+            copy = Project(self.gconfig, self.project)
+            copy.load()
+            copy.pconfig.share(project.pconfig)
+            projects.append(copy)
+
+        threads = []
+        start = time.perf_counter()
+        for index in range(self.users):
+            delay = self.ramp_up * index / self.users
+            thread = threading.Thread(
+                target=self.virtual_user,
+                args=(index, delay, projects[index]),
+                name="raider-vu-" + str(index),
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+
+        try:
+            if self.duration:
+                self._stop.wait(self.duration)
+                self._stop.set()
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.logger.warning("Interrupted, stopping virtual users.")
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.elapsed = time.perf_counter() - start
+
+    def virtual_user(self, index: int, delay: float, project: Project) -> None:
+        """Runs the FlowGraph in a loop as one virtual user.
+
+        Args:
+          index:
+            An integer with the number of this virtual user.
+          delay:
+            A float with the number of seconds to wait before starting.
+          project:
+            The virtual user's loaded :class:`Project
+            <raider.projects.Project>`.
+
+        """
+        if self._stop.wait(delay):
+            return
+
+        timings = Timings()
+        project.pconfig.timings = timings
+        outcomes: Dict[str, int] = {}
+        count = 0
+        self.logger.info("Virtual user %d started", index)
+        while not self._stop.is_set():
+            if self.iterations and count >= self.iterations:
+                break
+            count += 1
+            try:
+                result = project.flowstore.walk_flowgraph(
+                    project.pconfig, self.flowgraph
+                )
+            except Exception as err:  # pylint: disable=broad-except
+                self.logger.error("Virtual user %d: %s", index, str(err))
+                outcome = "error"
+            except SystemExit:
+                # Flows exit on errors, which would end the thread
+                self.logger.error("Virtual user %d: Flow exited", index)
+                outcome = "error"
+            else:
+                if result is True:
+                    outcome = "success"
+                elif result is False:
+                    outcome = "failure"
+                else:
+                    outcome = "unfinished"
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        self.timings.merge(timings)
+        with self._lock:
+            for outcome, number in outcomes.items():
+                self.outcomes[outcome] = self.outcomes.get(outcome, 0) + number
+
+    def report(self) -> Dict[str, Any]:
+        """Returns the results of the load test.
+
+        Returns:
+          A dictionary with the elapsed time, the number of iterations
+          and requests per second, the outcome of the iterations, and
+          the latency percentiles per FlowGraph, per Flow and per
+          status code.
+
+        """
+        iterations = sum(self.outcomes.values())
+        requests_count = sum(self.timings.status_codes.values())
+        elapsed = self.elapsed or 1.0
+
+        latencies: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self.timings.summary():
+            if row["category"] in (
+                "flowgraph",
+                "request:total",
+                "request:status",
+                "request:queue",
+            ):
+                latencies.setdefault(row["category"], []).append(row)
+
+        return {
+            "elapsed": self.elapsed,
+            "users": self.users,
+            "iterations": iterations,
+            "iterations_per_second": iterations / elapsed,
+            "requests": requests_count,
+            "requests_per_second": requests_count / elapsed,
+            "outcomes": self.outcomes,
+            "latencies": latencies,
+        }
+
+    def print_report(self) -> None:
+        """Prints the results of the load test."""
+        report = self.report()
+        print(
+            colored_text("Virtual users: ", "BLUE-BLACK-B")
+            + str(report["users"])
+            + colored_text("  Elapsed: ", "BLUE-BLACK-B")
+            + "{:.1f}s".format(report["elapsed"])
+        )
+        print(
+            colored_text("Iterations: ", "BLUE-BLACK-B")
+            + "{} ({:.1f}/s)".format(
+                report["iterations"], report["iterations_per_second"]
+            )
+            + colored_text("  Requests: ", "BLUE-BLACK-B")
+            + "{} ({:.1f}/s)".format(
+                report["requests"], report["requests_per_second"]
+            )
+        )
+        print(
+            colored_text("Outcomes: ", "BLUE-BLACK-B")
+            + ", ".join(
+                name + "=" + str(number)
+                for name, number in sorted(report["outcomes"].items())
+            )
+        )
+
+        titles = {
+            "flowgraph": "FlowGraph",
+            "request:total": "Flow",
+            "request:status": "Status",
+            "request:queue": "Queued",
+        }
+        for category, title in titles.items():
+            rows = report["latencies"].get(category)
+            if not rows:
+                continue
+            print()
+            print(
+                colored_text(
+                    "{:<30} {:>7} {:>11} {:>11} {:>11} {:>11}".format(
+                        title, "Count", "p50", "p95", "p99", "Max"
+                    ),
+                    "BLUE-BLACK-B",
+                )
+            )
+            for row in rows:
+                print(
+                    "{:<30} {:>7} {:>9.1f}ms {:>9.1f}ms {:>9.1f}ms "
+                    "{:>9.1f}ms".format(
+                        row["name"][:30],
+                        row["count"],
+                        row["p50"] * 1000,
+                        row["p95"] * 1000,
+                        row["p99"] * 1000,
+                        row["max"] * 1000,
+                    )
+                )
@@ -24,6 +24,7 @@ from typing import Any, Callable, List, Optional, Union
 import requests
 from requests_toolbelt.utils import dump
 
+from raider.cloning import Clonable
 from raider.plugins.common import Plugin
 from raider.utils import colored_text
 
@@ -62,7 +63,7 @@ def execute_actions(
     return None
 
 
-class Operation:
+class Operation(Clonable):
     """Parent class for all operations.
 
     Each Operation class inherits from here.
@@ -104,6 +105,10 @@ class Operation:
     # to make sure old data doesn't get overwritten.
     WILL_APPEND = 0x08
 
+    # Operation prints or saves the results, so it's skipped for the
+    # responses hidden while fuzzing
+    writes_output = False
+
     def __init__(
         self,
         function: Callable[..., Any],
@@ -153,6 +158,8 @@ class Operation:
         self.pconfig = pconfig
         self.logger = self.pconfig.logger
 
+        if self.writes_output and pconfig.hide_output:
+            return None
         self.logger.debug("Running operation %s", str(self))
         if self.needs_userdata:
             self.get_plugin_values()
@@ -396,6 +403,8 @@ class Save(Operation):
         The path to the file where the data should be saved.
     """
 
+    writes_output = True
+
     def __init__(
         self,
         filename: str,
@@ -526,6 +535,8 @@ class Print(Operation):
 
     """
 
+    writes_output = True
+
     def __init__(
         self,
         *args: Union[str, Plugin],
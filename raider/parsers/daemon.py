@@ -0,0 +1,30 @@
+import argparse
+import sys
+
+from raider.daemon import Daemon
+
+
+def add_daemon_parser(parser) -> None:
+    daemon_parser = parser.add_parser(
+        "daemon", help="Keep projects loaded and serve raider-client"
+    )
+    daemon_parser.add_argument(
+        "--socket",
+        help="Listen on this Unix socket instead of the default one.",
+    )
+    daemon_parser.add_argument(
+        "--preload",
+        action="append",
+        metavar="PROJECT",
+        help="Load PROJECT before accepting commands.",
+    )
+
+
+def run_daemon_command(args: argparse.Namespace) -> None:
+    daemon = Daemon(args.socket)
+    daemon.preload(args.preload or [])
+    try:
+        daemon.serve()
+    except OSError as err:
+        daemon.raider.logger.critical(str(err))
+        sys.exit(1)
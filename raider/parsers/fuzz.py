@@ -0,0 +1,240 @@
+import argparse
+import os
+import re
+import sys
+
+from raider import Raider
+from raider.checkpoint import Checkpoint
+from raider.filters import ResponseFilter
+from raider.similarity import ResponseClusters, print_clusters
+from raider.utils import get_project_file, list_projects
+
+
+def add_fuzz_parser(parser) -> None:
+    fuzz_parser = parser.add_parser("fuzz", help="Fuzz the inputs of a Flow")
+    fuzz_parser.add_argument("project", help="Project name")
+    fuzz_parser.add_argument("flow", help="Flow to fuzz")
+    fuzz_parser.add_argument(
+        "--wordlist",
+        action="append",
+        required=True,
+        metavar="POINT=FILE",
+        help="Fuzz the Plugin named POINT with the strings from FILE.",
+    )
+    fuzz_parser.add_argument(
+        "--mode",
+        choices=["pitchfork", "clusterbomb"],
+        default="pitchfork",
+        help="Combine the wordlists one by one, or try all combinations.",
+    )
+    fuzz_parser.add_argument(
+        "--shard",
+        default="0/1",
+        help="Only run the combinations from this shard (index/count).",
+    )
+    fuzz_parser.add_argument(
+        "--flowgraph",
+        help="Follow this FlowGraph to reach the Flow while fuzzing.",
+    )
+    fuzz_parser.add_argument(
+        "--prefetch",
+        action="append",
+        metavar="FLOW",
+        help="Fetch the one-time tokens from FLOW in the background.",
+    )
+    fuzz_parser.add_argument(
+        "--snapshot",
+        help="Restore the state instead of following the FlowGraph again.",
+        action="store_true",
+    )
+    fuzz_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of concurrent requests, or sessions with --flowgraph.",
+    )
+    fuzz_parser.add_argument(
+        "--adaptive",
+        help="Adjust the concurrent requests to the target's health.",
+        action="store_true",
+    )
+    fuzz_parser.add_argument(
+        "--calibrate",
+        help="Hide responses looking like the ones to random strings.",
+        action="store_true",
+    )
+    fuzz_parser.add_argument(
+        "--hide-status",
+        metavar="CODES",
+        help="Hide responses with these comma separated status codes.",
+    )
+    fuzz_parser.add_argument(
+        "--hide-size",
+        metavar="MIN-MAX",
+        help="Hide responses with a body length in this range.",
+    )
+    fuzz_parser.add_argument(
+        "--hide-words",
+        metavar="COUNTS",
+        help="Hide responses with these comma separated word counts.",
+    )
+    fuzz_parser.add_argument(
+        "--hide-lines",
+        metavar="COUNTS",
+        help="Hide responses with these comma separated line counts.",
+    )
+    fuzz_parser.add_argument(
+        "--hide-regex",
+        metavar="REGEX",
+        help="Hide responses with a body matching this regex.",
+    )
+    fuzz_parser.add_argument(
+        "--cluster",
+        help="Show one response for each group of near-duplicates.",
+        action="store_true",
+    )
+    fuzz_parser.add_argument(
+        "--checkpoint",
+        nargs="?",
+        const="",
+        metavar="FILE",
+        help="Save the progress, in the project or FILE, to resume later.",
+    )
+    fuzz_parser.add_argument(
+        "--proxy",
+        help="Send the request through the specified web proxy.",
+        action="store_true",
+    )
+    fuzz_parser.add_argument(
+        "--rate",
+        type=float,
+        help="Maximum requests per second to each host.",
+    )
+    fuzz_parser.add_argument(
+        "--burst",
+        type=int,
+        help="Requests allowed at once when the rate limit was idle.",
+    )
+    fuzz_parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="Maximum concurrent requests to each host.",
+    )
+
+
+def run_fuzz_command(args: argparse.Namespace) -> None:
+    raider = getattr(args, "raider", None) or Raider(args.project)
+    if args.proxy:
+        raider.gconfig.use_proxy = True
+
+    if args.project not in list_projects():
+        raider.logger.critical(args.project + " doesn't exist. Cannot fuzz!")
+        sys.exit()
+
+    wordlists = {}
+    for item in args.wordlist:
+        point, _, filename = item.partition("=")
+        if not filename:
+            raider.logger.critical(
+                "Wordlist %s should be in the POINT=FILE format.", item
+            )
+            sys.exit()
+        wordlists[point] = filename
+
+    try:
+        index, count = [int(item) for item in args.shard.split("/")]
+    except ValueError:
+        raider.logger.critical("Shard %s is not index/count.", args.shard)
+        sys.exit()
+
+    prefetch = getattr(args, "prefetch", None)
+    if prefetch and not args.flowgraph:
+        raider.logger.critical("--prefetch only works with --flowgraph.")
+        sys.exit()
+    if prefetch and args.workers > 1:
+        raider.logger.critical(
+            "--prefetch doesn't work with more than one worker, "
+            "the sessions don't share the tokens."
+        )
+        sys.exit()
+
+    try:
+        size = split_integers(args.hide_size, "-")
+        if size and len(size) != 2:
+            raise ValueError("size should be MIN-MAX")
+        filters = ResponseFilter(
+            status=split_integers(args.hide_status),
+            size=(size[0], size[1]) if size else None,
+            words=split_integers(args.hide_words),
+            lines=split_integers(args.hide_lines),
+            regex=args.hide_regex,
+        )
+    except (ValueError, re.error) as err:
+        raider.logger.critical("Invalid filter: %s", err)
+        sys.exit()
+
+    fuzzer = raider.fuzz(
+        args.flow,
+        list(wordlists),
+        flowgraph=args.flowgraph,
+        workers=args.workers,
+        adaptive=args.adaptive,
+        cluster_bomb=args.mode == "clusterbomb",
+        calibrate=args.calibrate,
+        snapshot=getattr(args, "snapshot", False),
+        prefetch=prefetch,
+    )
+    fuzzer.filters = filters
+    if args.cluster:
+        fuzzer.clusters = ResponseClusters()
+    raider.limit_rate(args.rate, args.burst, args.max_in_flight)
+    for point, filename in wordlists.items():
+        fuzzer.set_input_file(filename, fuzzing_point=point)
+    fuzzer.shard = (index, count)
+    if args.checkpoint is not None:
+        filename = get_checkpoint_file(args, index, count)
+        if not getattr(args, "resume", False) and os.path.exists(filename):
+            raider.logger.critical(
+                "Checkpoint %s exists, resume it or remove it.", filename
+            )
+            sys.exit()
+        fuzzer.checkpoint = get_checkpoint(args, filename)
+        if fuzzer.checkpoint.completed:
+            print(
+                "Resuming from "
+                + str(fuzzer.checkpoint.completed)
+                + " completed"
+            )
+    fuzzer.run()
+
+    for payload, error in fuzzer.failures:
+        print("Failed: " + payload + " (" + error + ")")
+    if filters.hidden:
+        print("Hidden: " + str(filters.hidden) + " responses")
+    if fuzzer.clusters:
+        print_clusters(fuzzer.clusters, fuzzer.results)
+
+
+def get_checkpoint_file(args, index, count):
+    return args.checkpoint or get_project_file(
+        args.project,
+        "_checkpoint_{}_{}of{}.json".format(args.flow, index, count),
+    )
+
+
+def get_checkpoint(args, filename):
+    if getattr(args, "resume", False) and os.path.isfile(filename):
+        return Checkpoint.load(filename)
+    settings = {
+        key: value for key, value in vars(args).items() if key != "command"
+    }
+    settings.pop("resume", None)
+    settings.pop("raider", None)
+    settings["checkpoint"] = filename
+    return Checkpoint(filename, settings)
+
+
+def split_integers(value, separator=","):
+    if not value:
+        return []
+    return [int(item) for item in value.split(separator)]
@@ -0,0 +1,88 @@
+import argparse
+import sys
+
+from raider import Raider
+from raider.load import LoadTest
+from raider.utils import list_projects
+
+
+def add_load_parser(parser) -> None:
+    load_parser = parser.add_parser(
+        "load", help="Run a FlowGraph with concurrent virtual users"
+    )
+    load_parser.add_argument("project", help="Project name")
+    load_parser.add_argument(
+        "flowgraph",
+        nargs="?",
+        default="DEFAULT",
+        help="FlowGraph to run",
+    )
+    load_parser.add_argument(
+        "--users",
+        type=int,
+        default=1,
+        help="Number of concurrent virtual users.",
+    )
+    load_parser.add_argument(
+        "--duration",
+        type=float,
+        help="Run for this many seconds.",
+    )
+    load_parser.add_argument(
+        "--iterations",
+        type=int,
+        help="Number of times each virtual user runs the FlowGraph.",
+    )
+    load_parser.add_argument(
+        "--ramp-up",
+        type=float,
+        default=0,
+        help="Seconds until all virtual users are started.",
+    )
+    load_parser.add_argument(
+        "--proxy",
+        help="Send the request through the specified web proxy.",
+        action="store_true",
+    )
+    load_parser.add_argument(
+        "--rate",
+        type=float,
+        help="Maximum requests per second to each host.",
+    )
+    load_parser.add_argument(
+        "--burst",
+        type=int,
+        help="Requests allowed at once when the rate limit was idle.",
+    )
+    load_parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="Maximum concurrent requests to each host.",
+    )
+
+
+def run_load_command(args: argparse.Namespace) -> None:
+    raider = Raider(args.project)
+    if args.proxy:
+        raider.gconfig.use_proxy = True
+
+    if args.project not in list_projects():
+        raider.logger.critical(args.project + " doesn't exist. Cannot run!")
+        sys.exit()
+
+    load_test = LoadTest(
+        raider.gconfig,
+        args.project,
+        args.flowgraph,
+        users=args.users,
+        duration=args.duration,
+        iterations=args.iterations,
+        ramp_up=args.ramp_up,
+        rate_limit={
+            "rate": args.rate,
+            "burst": args.burst,
+            "max_in_flight": args.max_in_flight,
+        },
+    )
+    load_test.run()
+    load_test.print_report()
@@ -0,0 +1,137 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from raider import Raider
+from raider.analysis import find_anomalies, print_anomalies
+from raider.results import COLUMNS, ResultStore
+from raider.similarity import cluster_results, print_clusters
+from raider.utils import get_project_file, list_projects
+
+
+def add_results_parser(parser) -> None:
+    results_parser = parser.add_parser(
+        "results", help="Analyze the results of fuzzing"
+    )
+    results_parser.add_argument("project", help="Project name")
+    results_parser.add_argument(
+        "--runs",
+        help="List the fuzzing runs.",
+        action="store_true",
+    )
+    results_parser.add_argument(
+        "--run",
+        type=int,
+        help="Show this run instead of the last one.",
+    )
+    results_parser.add_argument(
+        "--group-by",
+        metavar="COLUMNS",
+        help="Count the results grouped by these comma separated columns.",
+    )
+    results_parser.add_argument(
+        "--anomalies",
+        help="Rank the results by how anomalous they are.",
+        action="store_true",
+    )
+    results_parser.add_argument(
+        "--clusters",
+        help="Show one result for each group of near-duplicates.",
+        action="store_true",
+    )
+    results_parser.add_argument(
+        "--distance",
+        type=int,
+        default=3,
+        help="Maximum different bits between near-duplicates.",
+    )
+    results_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=3.5,
+        help="Lowest anomaly score shown.",
+    )
+    results_parser.add_argument(
+        "--where",
+        default="1",
+        help="Only show results matching this SQL condition.",
+    )
+    results_parser.add_argument(
+        "--order-by",
+        default="position",
+        help="Sort by this column, prefixed by - for descending order.",
+    )
+    results_parser.add_argument(
+        "--limit",
+        type=int,
+        default=100,
+        help="Maximum number of results to show.",
+    )
+
+
+def run_results_command(args: argparse.Namespace) -> None:
+    raider = Raider(args.project)
+    if args.project not in list_projects():
+        raider.logger.critical(args.project + " doesn't exist.")
+        sys.exit()
+
+    filename = get_project_file(args.project, "_results.db")
+    if not os.path.isfile(filename):
+        raider.logger.critical("No fuzzing results for " + args.project)
+        sys.exit()
+
+    store = ResultStore(filename)
+    if args.runs:
+        for run, flow, points, started, count in store.runs():
+            print(
+                "{:>5}  {}  {} ({})  {} results".format(
+                    run,
+                    time.strftime("%Y-%m-%d %H:%M", time.localtime(started)),
+                    flow,
+                    points,
+                    count,
+                )
+            )
+        return
+
+    try:
+        if args.anomalies:
+            print_anomalies(
+                find_anomalies(
+                    store, args.run, args.threshold, limit=args.limit
+                )
+            )
+            return
+
+        if args.clusters:
+            print_clusters(
+                cluster_results(store, args.run, args.distance),
+                store,
+                args.run,
+            )
+            return
+
+        if args.group_by:
+            store.print_groups(*args.group_by.split(","), run=args.run)
+            return
+
+        rows = store.query(
+            args.where,
+            order_by=args.order_by,
+            limit=args.limit,
+            run=args.run,
+        )
+    except (ValueError, sqlite3.Error) as err:
+        raider.logger.critical(err)
+        sys.exit()
+
+    for row in rows:
+        print(
+            "  ".join(
+                str(row[column])
+                for column in COLUMNS[1:]
+                if column not in ("error", "simhash") or row[column]
+            )
+        )
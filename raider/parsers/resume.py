@@ -0,0 +1,48 @@
+import argparse
+import glob
+import os
+import sys
+
+from raider import Raider
+from raider.checkpoint import Checkpoint
+from raider.parsers.fuzz import run_fuzz_command
+from raider.utils import get_project_dir, list_projects
+
+
+def add_resume_parser(parser) -> None:
+    resume_parser = parser.add_parser(
+        "resume", help="Resume interrupted fuzzing runs"
+    )
+    resume_parser.add_argument("project", help="Project name")
+    resume_parser.add_argument(
+        "checkpoints",
+        nargs="*",
+        metavar="CHECKPOINT",
+        help="Checkpoint files to resume, all unfinished ones by default.",
+    )
+
+
+def run_resume_command(args: argparse.Namespace) -> None:
+    raider = Raider(args.project)
+    if args.project not in list_projects():
+        raider.logger.critical(args.project + " doesn't exist. Cannot resume!")
+        sys.exit()
+
+    filenames = args.checkpoints or sorted(
+        glob.glob(
+            os.path.join(get_project_dir(args.project), "_checkpoint_*.json")
+        )
+    )
+    checkpoints = [Checkpoint.load(filename) for filename in filenames]
+    checkpoints = [
+        checkpoint for checkpoint in checkpoints if not checkpoint.finished
+    ]
+    if not checkpoints:
+        print("Nothing to resume.")
+        return
+
+    for checkpoint in checkpoints:
+        print("Resuming " + checkpoint.filename)
+        settings = dict(checkpoint.settings)
+        settings["checkpoint"] = checkpoint.filename
+        run_fuzz_command(argparse.Namespace(**settings, resume=True))
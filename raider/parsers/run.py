@@ -2,12 +2,17 @@ import argparse
 import sys
 
 from raider import Raider
+from raider.batch import BatchError, BatchJob, BatchRunner, load_manifest
 from raider.utils import list_projects
 
 
 def add_run_parser(parser) -> None:
     run_parser = parser.add_parser("run", help="Run Flow or Flowgraph")
-    run_parser.add_argument("project", nargs="?", help="Project name")
+    run_parser.add_argument(
+        "project",
+        nargs="?",
+        help="Project name, or comma separated names to run a batch",
+    )
     run_parser.add_argument(
         "flows",
         nargs="?",
@@ -25,10 +30,74 @@ def add_run_parser(parser) -> None:
         help="Run the FlowGraph's test Flow.",
         action="store_true",
     )
+    run_parser.add_argument(
+        "--watch",
+        help="Run again when the project's hyfiles change.",
+        action="store_true",
+    )
+    run_parser.add_argument(
+        "--timings",
+        help="Print how long each Flow, Plugin and Operation took.",
+        action="store_true",
+    )
+    run_parser.add_argument(
+        "--profile",
+        metavar="DIRECTORY",
+        help="Profile the project and save the results in DIRECTORY.",
+    )
+    run_parser.add_argument(
+        "--users",
+        help="Run the FlowGraph once for every user.",
+        action="store_true",
+    )
+    run_parser.add_argument(
+        "--shard",
+        default="0/1",
+        help="Only run the users from this shard (index/count).",
+    )
+    run_parser.add_argument(
+        "--restart",
+        help="Run again the users with a result already recorded.",
+        action="store_true",
+    )
+    run_parser.add_argument(
+        "--rate",
+        type=float,
+        help="Maximum requests per second to each host.",
+    )
+    run_parser.add_argument(
+        "--burst",
+        type=int,
+        help="Requests allowed at once when the rate limit was idle.",
+    )
+    run_parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="Maximum concurrent requests to each host.",
+    )
+    run_parser.add_argument(
+        "--manifest",
+        metavar="FILE",
+        help="Run the projects from a JSON manifest in a batch.",
+    )
+    run_parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Number of projects run at once in a batch.",
+    )
+    run_parser.add_argument(
+        "--report",
+        metavar="FILE",
+        help="Save the batch report as JSON in FILE.",
+    )
 
 
 def run_run_command(args: argparse.Namespace) -> None:
-    raider = Raider(args.project)
+    if args.manifest or (args.project and "," in args.project):
+        run_batch(args)
+        return
+
+    raider = getattr(args, "raider", None) or Raider(args.project)
     if args.proxy:
         raider.gconfig.use_proxy = True
 
@@ -39,11 +108,99 @@ def run_run_command(args: argparse.Namespace) -> None:
         sys.exit()
 
     if raider.project:
+        if args.profile:
+            raider.enable_profiler(args.profile)
         raider.project.load()
+        raider.limit_rate(args.rate, args.burst, args.max_in_flight)
     else:
         raider.logger.critical(args.project + " doesn't exist. Cannot run!")
         sys.exit()
 
-    raider.run(args.flows, args.test)
+    if args.timings:
+        raider.enable_timings()
+
+    try:
+        if args.users:
+            results = raider.run_users(
+                args.flows, shard=args.shard, resume=not args.restart
+            )
+            for result, count in results.items():
+                print(result + ": " + str(count))
+        else:
+            raider.run(args.flows, args.test)
+        if args.watch:
+            raider.project.watch(lambda hyfiles: rerun(raider, args, hyfiles))
+    finally:
+        if args.timings:
+            raider.timings.print_summary()
+            raider.pconfig.limiter.print_stats()
+        if args.profile:
+            raider.save_profile()
 
     raider.project.write_project_file()
+
+
+def rerun(raider, args, hyfiles):
+    print("Reloaded " + ", ".join(hyfiles))
+    try:
+        raider.run(args.flows, args.test)
+    except SystemExit:
+        # Keep watching after failures
+        pass
+    except Exception as err:  # pylint: disable=broad-except
+        raider.logger.exception("Run failed: %s", err)
+
+
+def run_batch(args):
+    unsupported = [
+        "--" + name.replace("_", "-")
+        for name in (
+            "rate",
+            "burst",
+            "max_in_flight",
+            "timings",
+            "profile",
+            "watch",
+        )
+        if getattr(args, name, None) not in (None, False)
+    ]
+    if getattr(args, "shard", "0/1") != "0/1":
+        unsupported.append("--shard")
+    if unsupported:
+        print(
+            "Cannot use " + ", ".join(unsupported) + " in a batch",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+
+    if args.manifest:
+        try:
+            jobs, workers = load_manifest(args.manifest)
+        except BatchError as err:
+            print(err, file=sys.stderr)
+            sys.exit(2)
+    else:
+        jobs = [
+            BatchJob(project, args.flows, args.test, args.users)
+            for project in args.project.split(",")
+        ]
+        workers = None
+
+    runner = BatchRunner(
+        jobs,
+        workers=args.jobs or workers or 4,
+        proxy=args.proxy,
+    )
+    runner.run(
+        lambda result: print(
+            "{}: {} ({:.2f}s)".format(
+                result.project, result.status, result.duration
+            )
+        )
+    )
+    print()
+    runner.print_report()
+    if args.report:
+        runner.save_report(args.report)
+    if runner.failed:
+        sys.exit(1)
@@ -32,10 +32,15 @@ def add_show_parser(parser) -> None:
     show_parser.add_argument(
         "--operations", nargs="?", help="Show Operations", const=""
     )
+    show_parser.add_argument(
+        "--evaluate",
+        help="Load the projects instead of using the search index.",
+        action="store_true",
+    )
 
 
 def run_show_command(args):
-    raider = Raider(args.projects)
+    raider = getattr(args, "raider", None) or Raider(args.projects)
     matches = Search(raider, args)
     matches.search()
     matches.print()
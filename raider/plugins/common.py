@@ -21,8 +21,11 @@ from typing import Callable, Dict, List, Optional
 
 import requests
 
+from raider.cloning import Clonable
+from raider.timing import measure
 
-class Plugin:
+
+class Plugin(Clonable):
     """Parent class for all :class:`Plugins <Plugin>`.
 
     Each :class:`Plugin` class inherits from here. ``get_value``
@@ -144,14 +147,15 @@ class Plugin:
 
         """
         if not self.needs_response:
-            if self.needs_userdata:
-                self.value = self.function(pconfig.active_user.to_dict())
-            elif self.depends_on_other_plugins:
-                for item in self.plugins:
-                    item.get_value(pconfig)
-                self.value = self.function()
-            else:
-                self.value = self.function()
+            with measure(pconfig, "plugin:get_value", self.name):
+                if self.needs_userdata:
+                    self.value = self.function(pconfig.active_user.to_dict())
+                elif self.depends_on_other_plugins:
+                    for item in self.plugins:
+                        item.get_value(pconfig)
+                    self.value = self.function()
+                else:
+                    self.value = self.function()
         return self.value
 
     def extract_value_from_response(
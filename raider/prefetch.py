@@ -0,0 +1,272 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Background pre-fetching of one-time tokens.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+import requests
+
+from raider.flow import Flow
+from raider.transport import TransportError
+
+
+class Token:
+    """Class holding the outputs of one run of the producer Flow.
+
+    Attributes:
+      values:
+        A list of tuples with the name and the value of each output
+        Plugin, in the same order as the Flow's ``outputs``.
+      response:
+        The :class:`requests.models.Response` object the outputs were
+        extracted from.
+      next_flow:
+        The value returned by the Flow's operations, usually the name
+        of the next Flow.
+      created:
+        A float with the ``time.monotonic`` when the token was fetched.
+
+    """
+
+    def __init__(
+        self,
+        values: List[Tuple[str, Optional[str]]],
+        response: Optional[requests.models.Response],
+        next_flow: Any,
+    ) -> None:
+        """Initializes the Token object."""
+        self.values = values
+        self.response = response
+        self.next_flow = next_flow
+        self.created = time.monotonic()
+
+
+class TokenPrefetcher:
+    """Class fetching one-time tokens in the background.
+
+    Flows which need a fresh CSRF token or nonce for every request
+    double the number of round trips, and the token has to arrive
+    before the request using it is sent. The prefetcher runs the
+    producer Flow, the one whose outputs extract the token, on
+    ``workers`` background threads, and keeps up to ``size`` tokens in
+    a queue.
+
+    When the :class:`FlowStore <raider.flowstore.FlowStore>` runs the
+    producer Flow, it's served from the queue instead. The outputs of
+    the Flow, like :class:`Regex <raider.plugins.Regex>`, :class:`Html
+    <raider.plugins.Html>` or :class:`Cookie <raider.plugins.Cookie>`,
+    get the values extracted by the background request, and are saved
+    in the active user as if the Flow just ran. Since all the outputs
+    of one response are served together, a token stays paired with the
+    session cookie it was issued for.
+
+    Each worker sends its own copy of the Flow, so the outputs aren't
+    overwritten while being served. The workers start the first time a
+    token is needed.
+
+    Attributes:
+      flow:
+        The producer :class:`Flow <raider.flow.Flow>`.
+      pconfig:
+        The ProjectConfig object used to send the requests.
+      size:
+        An integer with the maximum number of tokens in the queue.
+      workers:
+        An integer with the number of threads fetching tokens.
+      max_age:
+        An optional float with the number of seconds after which a
+        token is discarded instead of served.
+      timeout:
+        A float with the number of seconds to wait for a token. When
+        none arrives in time, the Flow is run in the foreground.
+      served:
+        An integer with the number of tokens served from the queue.
+      expired:
+        An integer with the number of discarded tokens.
+      error:
+        The exception which stopped a worker, other than a
+        :class:`TransportError <raider.transport.TransportError>`, or
+        None. It's raised by :meth:`get` instead of waiting.
+
+    """
+
+    def __init__(
+        self,
+        flow: Flow,
+        pconfig: Any,
+        size: int = 8,
+        workers: int = 2,
+        max_age: Optional[float] = None,
+        timeout: float = 30.0,
+    ) -> None:
+        """Initializes the TokenPrefetcher object.
+
+        Args:
+          flow:
+            The producer :class:`Flow <raider.flow.Flow>`.
+          pconfig:
+            The ProjectConfig object used to send the requests.
+          size:
+            An integer with the maximum number of tokens in the queue.
+          workers:
+            An integer with the number of threads fetching tokens.
+          max_age:
+            An optional float with the number of seconds after which a
+            token is discarded.
+          timeout:
+            A float with the number of seconds to wait for a token.
+
+        """
+        self.flow = flow
+        self.pconfig = pconfig
+        self.size = size
+        self.workers = workers
+        self.max_age = max_age
+        self.timeout = timeout
+        self.served = 0
+        self.expired = 0
+        self.error: Optional[Exception] = None
+
+        # None is queued when a worker fails, to wake up get()
+        self._tokens: "queue.Queue[Optional[Token]]" = queue.Queue(
+            maxsize=size
+        )
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Starts the threads fetching the tokens."""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            self.error = None
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._fetch,
+                    args=(self.flow.clone(),),
+                    name="raider-prefetch-" + str(index),
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stops the threads and discards the fetched tokens."""
+        with self._lock:
+            self._stop.set()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join()
+        while not self._tokens.empty():
+            self._tokens.get_nowait()
+
+    def get(self) -> Optional[Token]:
+        """Returns the next valid token from the queue.
+
+        Starts the workers if needed, and waits up to ``timeout``
+        seconds for a token.
+
+        Returns:
+          The :class:`Token`, or None if no token arrived in time.
+
+        Raises:
+          Exception: The ``error`` which stopped a worker, if there are
+            no tokens left.
+
+        """
+        self.start()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if self.error is not None and self._tokens.empty():
+                raise self.error
+            try:
+                token = self._tokens.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if token is None:
+                # Wakes up the other callers too
+                self._wake()
+                raise self.error
+            age = time.monotonic() - token.created
+            if self.max_age and age > self.max_age:
+                self.expired += 1
+                continue
+            self.served += 1
+            return token
+
+    def serve(self, token: Token) -> None:
+        """Sets the values of the token in the producer Flow's outputs.
+
+        Args:
+          token:
+            The :class:`Token` returned by :meth:`get`.
+
+        """
+        outputs = self.flow.outputs or []
+        for output, (name, value) in zip(outputs, token.values):
+            output.name = name
+            output.value = value
+        self.flow.response = token.response
+        self.flow.pconfig = self.pconfig
+
+    def _fetch(self, flow: Flow) -> None:
+        """Runs a copy of the producer Flow, queueing the tokens."""
+        while not self._stop.is_set():
+            try:
+                flow.execute(self.pconfig)
+                next_flow = flow.run_operations()
+            except TransportError as err:
+                logging.error("Fetching a token failed: %s", err)
+                self._stop.wait(1.0)
+                continue
+            except Exception as err:  # pylint: disable=broad-except
+                logging.exception("Fetching a token failed")
+                self.error = err
+                self._wake()
+                return
+            token = Token(
+                [(item.name, item.value) for item in flow.outputs or []],
+                flow.response,
+                next_flow,
+            )
+            while not self._stop.is_set():
+                try:
+                    self._tokens.put(token, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    def _wake(self) -> None:
+        """Queues None, so the callers waiting in get() raise the error."""
+        try:
+            self._tokens.put_nowait(None)
+        except queue.Full:
+            pass
+
+    @property
+    def available(self) -> int:
+        """Returns the number of tokens in the queue."""
+        return self._tokens.qsize()
@@ -0,0 +1,270 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Profiler scoped to project loading, Flows and fuzzing batches.
+"""
+
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+from contextlib import contextmanager, nullcontext
+from types import FrameType
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+
+def is_generated(filename: str) -> bool:
+    """Returns True if the code doesn't come from a real file."""
+    return filename.startswith("<") and not filename.startswith("<frozen")
+
+
+def relabel_stats(stats: Dict[Any, Any], label: str) -> Dict[Any, Any]:
+    """Replaces the file name of generated code with a label.
+
+    Code evaluated from :term:`hyfiles` doesn't have a real file name,
+    so the profiler shows it as ``<string>``. This function replaces
+    those names with the label of the section they were run in.
+
+    Args:
+      stats:
+        A dictionary in the format used by ``pstats.Stats.stats``.
+      label:
+        A string with the label to use instead of the file name.
+
+    Returns:
+      A new dictionary with the file names replaced.
+
+    """
+
+    def fix(key: Any) -> Any:
+        filename, lineno, function = key
+        if is_generated(filename):
+            filename = "[" + label + "]"
+        return (filename, lineno, function)
+
+    relabeled: Dict[Any, Any] = {}
+    for key, (calls, ncalls, tottime, cumtime, callers) in stats.items():
+        new_callers = {fix(caller): value for caller, value in callers.items()}
+        relabeled[fix(key)] = (calls, ncalls, tottime, cumtime, new_callers)
+    return relabeled
+
+
+class Profiler:
+    """Class profiling Raider in named sections.
+
+    Each section (for example ``load:01_main.hy``, ``flow:login`` or
+    ``fuzz:batch-3``) gets its own cProfile data, and a background
+    thread samples the call stacks to build flamegraphs. Frames from
+    code evaluated from :term:`hyfiles` are attributed to the section
+    they were run in, instead of showing up as ``<string>``.
+
+    When saving, a ``.pstats`` file is written for each section, plus
+    ``all.pstats`` with everything combined, and ``profile.folded``
+    with the sampled stacks in the collapsed format used by
+    flamegraph.pl and speedscope.
+
+    Attributes:
+      output_dir:
+        A string with the directory where the results will be saved.
+      interval:
+        A float with the number of seconds between stack samples.
+      profiles:
+        A dictionary mapping the section names to cProfile.Profile
+        objects.
+      stacks:
+        A dictionary mapping collapsed stacks to the number of times
+        they were sampled.
+
+    """
+
+    def __init__(self, output_dir: str, interval: float = 0.005) -> None:
+        """Initializes the Profiler object.
+
+        Args:
+          output_dir:
+            A string with the directory where the results will be saved.
+          interval:
+            A float with the number of seconds between stack samples.
+
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.stacks: Dict[str, int] = {}
+
+        self._sections: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Starts the thread sampling the call stacks."""
+        if self._sampler:
+            return
+        self._stop.clear()
+        self._sampler = threading.Thread(
+            target=self._sample_loop, name="raider-profiler", daemon=True
+        )
+        self._sampler.start()
+
+    def stop(self) -> None:
+        """Stops the thread sampling the call stacks."""
+        if self._sampler:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Context manager profiling the code run inside it.
+
+        Sections can be nested. Only the outermost section on each
+        thread is profiled with cProfile, but the sampled stacks are
+        attributed to the innermost one.
+
+        Args:
+          name:
+            A string with the name of the section.
+
+        """
+        thread_id = threading.get_ident()
+        with self._lock:
+            stack = self._sections.setdefault(thread_id, [])
+            stack.append(name)
+            outermost = len(stack) == 1
+            profile = self.profiles.setdefault(name, cProfile.Profile())
+
+        enabled = False
+        if outermost:
+            try:
+                profile.enable()
+                enabled = True
+            except ValueError:
+                # Only one cProfile can run at a time on Python 3.12+,
+                # the stacks are still sampled for this section.
+                pass
+        try:
+            yield
+        finally:
+            if enabled:
+                profile.disable()
+            with self._lock:
+                stack.pop()
+                if not stack:
+                    del self._sections[thread_id]
+
+    def _sample_loop(self) -> None:
+        """Samples the stacks of the threads inside a section."""
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()  # pylint: disable=W0212
+            with self._lock:
+                sections = {
+                    thread_id: stack[-1]
+                    for thread_id, stack in self._sections.items()
+                }
+            for thread_id, section in sections.items():
+                frame = frames.get(thread_id)
+                if frame:
+                    folded = self.fold_stack(frame, section)
+                    with self._lock:
+                        self.stacks[folded] = self.stacks.get(folded, 0) + 1
+
+    @staticmethod
+    def fold_stack(frame: FrameType, section: str) -> str:
+        """Converts a frame into a collapsed stack string.
+
+        Args:
+          frame:
+            The innermost frame of the stack.
+          section:
+            A string with the name of the section being run.
+
+        Returns:
+          A string with the section name followed by the frames from
+          the outermost to the innermost, separated by semicolons.
+
+        """
+        names = []
+        current: Optional[FrameType] = frame
+        while current:
+            code = current.f_code
+            filename = code.co_filename
+            if is_generated(filename):
+                filename = "[" + section + "]"
+            else:
+                filename = os.path.basename(filename)
+            names.append(filename + ":" + code.co_name)
+            current = current.f_back
+        names.append(section)
+        return ";".join(reversed(names))
+
+    def save(self) -> List[str]:
+        """Saves the profiling results in the output directory.
+
+        Returns:
+          A list of strings with the paths of the files written.
+
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        written = []
+        combined: Optional[pstats.Stats] = None
+
+        for name, profile in self.profiles.items():
+            profile.create_stats()
+            if not profile.stats:  # type: ignore
+                continue
+            stats = pstats.Stats(profile)
+            stats.stats = relabel_stats(stats.stats, name)  # type: ignore
+            filename = os.path.join(
+                self.output_dir, re.sub(r"[^\w.-]", "_", name) + ".pstats"
+            )
+            stats.dump_stats(filename)
+            written.append(filename)
+            if combined:
+                combined.add(stats)
+            else:
+                combined = stats
+
+        if combined:
+            filename = os.path.join(self.output_dir, "all.pstats")
+            combined.dump_stats(filename)
+            written.append(filename)
+
+        filename = os.path.join(self.output_dir, "profile.folded")
+        with open(filename, "w", encoding="utf-8") as folded:
+            for stack, count in sorted(self.stacks.items()):
+                folded.write(stack + " " + str(count) + "\n")
+        written.append(filename)
+
+        return written
+
+
+def profile_section(pconfig: Any, name: str) -> ContextManager[None]:
+    """Profiles the code inside the context, if profiling is enabled.
+
+    Args:
+      pconfig:
+        The ProjectConfig object. Nothing is profiled unless its
+        ``profiler`` attribute contains a :class:`Profiler` object.
+      name:
+        A string with the name of the section.
+
+    """
+    profiler = getattr(pconfig, "profiler", None)
+    if profiler:
+        return profiler.section(name)
+    return nullcontext()
@@ -16,7 +16,10 @@
 """Project classes holding project configuration.
 """
 
-from typing import Dict, List, Optional
+import hashlib
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import igraph
 import sys
@@ -25,9 +28,14 @@ from raider.config import Config
 from raider.flow import Flow
 from raider.flowgraph import FlowGraph
 from raider.flowstore import FlowStore
+from raider.limits import RateLimiter
+from raider.profiler import profile_section
+from raider.retries import CircuitBreaker, RetryPolicy
 from raider.structures import DataStore
-from raider.user import Users
+from raider.transport import Transport, get_transport
+from raider.user import UserPool, Users
 from raider.utils import (
+    EVAL_VARIABLES,
     colored_hyfile,
     colored_text,
     create_hy_expression,
@@ -35,6 +43,7 @@ from raider.utils import (
     eval_project_file,
     get_project_file,
     get_project_dir,
+    hyfile_symbols,
     list_hyfiles,
     list_projects,
 )
@@ -45,6 +54,62 @@ class ProjectConfig(Config):
         self.gconfig = config
         self.logger = config.logger
         self.users = None
+        self.timings = None
+        self.profiler = None
+        self.transport_name = "requests"
+        self._transport = None
+        self.limiter = RateLimiter()
+        # Seconds to wait for connecting and for reading the response
+        self.timeout = (10.0, 60.0)
+        self.retry_policy = RetryPolicy()
+        self.breaker = CircuitBreaker()
+        # Skips Print and Save, set while finishing hidden fuzzing
+        # responses
+        self.hide_output = False
+
+    def __deepcopy__(self, memo):
+        # Shared by all Flows of the project, and holds open connections
+        return self
+
+    def share(self, other: "ProjectConfig") -> None:
+        """Uses the connections, limits and timings of another project.
+
+        Used when the same project is loaded several times, so the
+        copies send their requests through the same transport, and the
+        rate limits and the circuit breaker apply to all of them.
+
+        Args:
+          other:
+            The ProjectConfig object to share the settings with.
+
+        """
+        self._transport = other.transport
+        self.limiter = other.limiter
+        self.breaker = other.breaker
+        self.timings = other.timings
+
+    def close_transport(self) -> None:
+        """Closes the transport, so the next request opens a new one.
+
+        Used when the proxy settings change, since they're applied
+        when the transport is created.
+
+        """
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+    @property
+    def transport(self) -> Transport:
+        """Returns the transport sending the HTTP requests.
+
+        It's created the first time it's needed, from the name set in
+        the ``_transport`` variable of the :term:`hyfiles`.
+
+        """
+        if not self._transport:
+            self._transport = get_transport(self)
+        return self._transport
 
     @property
     def proxy(self):
@@ -68,7 +133,7 @@ class ProjectConfig(Config):
 
     @property
     def active_user(self):
-        if self.users:
+        if self.users is not None:
             username = self.users.active_user
         else:
             self.users = Users()
@@ -121,6 +186,13 @@ class Project:
 
         self.flows = {}
         self.flowgraphs = {}
+        # Names defined by each hyfile, and the files' mtime, size and
+        # hash when they were evaluated, used to reload them
+        self.names: Dict[str, Set[str]] = {}
+        self.stamps: Dict[str, Tuple[int, int, str]] = {}
+        self.shared_locals: Dict[str, Any] = {}
+        self._symbols: Dict[str, Tuple[Tuple[int, int, str], Set[str]]]
+        self._symbols = {}
 
         self.logger = gconfig.logger
         self.loaded = False
@@ -157,24 +229,9 @@ class Project:
 
         self.logger.debug("Loading hyfiles for %s project", self.name)
         for hyfile in list_hyfiles(self.name):
-            self.logger.debug("Loading data from %s", hyfile)
-            env_old = shared_locals.copy()
-            shared_locals.update(
-                eval_project_file(self.name, hyfile, shared_locals)
-            )
-            env_new = set(shared_locals.keys()) - set(env_old.keys())
-            env_new = [item for item in shared_locals if item not in env_old]
-            self.flows[hyfile] = []
-            self.flowgraphs[hyfile] = []
-            for key in env_new:
-                if isinstance(shared_locals[key], Flow):
-                    self.flows[hyfile].append(key)
-                if isinstance(shared_locals[key], FlowGraph):
-                    self.flowgraphs[hyfile].append(key)
-
-        for value in shared_locals.values():
-            if isinstance(value, Users):
-                self.pconfig.users = value
+            self.eval_hyfile(hyfile, shared_locals)
+
+        self.apply_settings(shared_locals)
 
         for key, value in shared_locals.items():
             if isinstance(value, Flow):
@@ -182,6 +239,102 @@ class Project:
             if isinstance(value, FlowGraph):
                 self.flowstore.add_flowgraph(key, value)
 
+        self.add_default_flowgraph()
+
+        if "_prefetch" in shared_locals:
+            for flow_name, options in shared_locals["_prefetch"].items():
+                self.flowstore.prefetch(
+                    self.pconfig, flow_name, **(options or {})
+                )
+
+        self.shared_locals = shared_locals
+        self.loaded = True
+
+        return shared_locals
+
+    def eval_hyfile(self, hyfile: str, shared_locals: Dict[str, Any]) -> None:
+        """Evaluates one hyfile and records the names it defines.
+
+        Args:
+          hyfile:
+            A string with the name of the hyfile.
+          shared_locals:
+            A dictionary with the locals of the hyfiles evaluated so
+            far, updated with the ones from this file.
+
+        """
+        self.logger.debug("Loading data from %s", hyfile)
+        self.stamps[hyfile] = self.get_stamp(hyfile)
+        env_old = shared_locals.copy()
+        with profile_section(self.pconfig, "load:" + hyfile):
+            shared_locals.update(
+                eval_project_file(self.name, hyfile, shared_locals)
+            )
+        env_new = [item for item in shared_locals if item not in env_old]
+        self.flows[hyfile] = []
+        self.flowgraphs[hyfile] = []
+        for key in env_new:
+            if isinstance(shared_locals[key], Flow):
+                self.flows[hyfile].append(key)
+            if isinstance(shared_locals[key], FlowGraph):
+                self.flowgraphs[hyfile].append(key)
+
+        # Also includes the names redefined by this file
+        self.names[hyfile] = {
+            key
+            for key, value in shared_locals.items()
+            if key not in EVAL_VARIABLES
+            and (key not in env_old or env_old[key] is not value)
+        }
+
+    def apply_settings(
+        self, shared_locals: Dict[str, Any], names: Optional[Set[str]] = None
+    ) -> None:
+        """Applies the project settings from the hyfiles' variables.
+
+        Args:
+          shared_locals:
+            A dictionary with the locals of the evaluated hyfiles.
+          names:
+            An optional set with the names to apply, when only some
+            hyfiles were evaluated again. All of them are applied if
+            not set.
+
+        """
+
+        def changed(name: str) -> bool:
+            return name in shared_locals and (names is None or name in names)
+
+        for key, value in shared_locals.items():
+            if isinstance(value, (Users, UserPool)) and changed(key):
+                self.pconfig.users = value
+
+        if changed("_transport"):
+            self.pconfig.transport_name = shared_locals["_transport"]
+            self.pconfig.close_transport()
+        if changed("_rate_limit"):
+            self.pconfig.limiter.configure(**shared_locals["_rate_limit"])
+        if changed("_timeout"):
+            timeout = shared_locals["_timeout"]
+            if isinstance(timeout, (int, float)):
+                timeout = (timeout, timeout)
+            self.pconfig.timeout = tuple(timeout)
+        if changed("_retries"):
+            self.pconfig.retry_policy = RetryPolicy(
+                **shared_locals["_retries"]
+            )
+        if changed("_circuit_breaker"):
+            self.pconfig.breaker = CircuitBreaker(
+                **shared_locals["_circuit_breaker"]
+            )
+
+    def add_default_flowgraph(self) -> None:
+        """Adds the DEFAULT FlowGraph, starting with the first Flow."""
+        for flowgraphs in self.flowgraphs.values():
+            if "DEFAULT" in flowgraphs:
+                flowgraphs.remove("DEFAULT")
+        self.flowstore.remove_flowgraph("DEFAULT")
+
         if self.flowstore.values:
             first_flow = self.flowstore.values[0]
             first_flow_name = self.flowstore.get_flow_name_by_flow(first_flow)
@@ -192,17 +345,217 @@ class Project:
             self.flowstore.add_flowgraph("DEFAULT", FlowGraph(first_flow))
             self.flowgraphs[first_flow_hyfile].insert(0, "DEFAULT")
 
+    def reload(self) -> List[str]:
+        """Evaluates again the hyfiles which changed since loading.
 
-        self.loaded = True
+        A hyfile changed if its modification time or size changed, and
+        its content isn't the same anymore. The changed hyfiles are
+        evaluated again, together with the ones using the names they
+        define, and the ones defining the same names, in alphabetical
+        order like in :meth:`load`. The other hyfiles aren't evaluated,
+        and keep their objects.
 
-        return shared_locals
+        The :class:`FlowStore <raider.flowstore.FlowStore>` is updated
+        in place. Reloaded Flows replace the old ones and keep their
+        position, new Flows are added, and removed ones are deleted.
+        The settings like ``_transport`` or ``_rate_limit`` are applied
+        again if their hyfile was reloaded.
+
+        If the project wasn't loaded yet, it's loaded completely.
+
+        Returns:
+          A list with the names of the hyfiles evaluated again.
+
+        Raises:
+          Exception: The error raised by a hyfile. The FlowStore isn't
+            updated, and the hyfiles which weren't evaluated are
+            evaluated again by the next reload.
+
+        """
+        if not self.loaded:
+            self.load()
+            return list(self.stamps)
+
+        hyfiles = list_hyfiles(self.name)
+        changed = {hyfile for hyfile in hyfiles if self.has_changed(hyfile)}
+        removed = set(self.stamps) - set(hyfiles)
+        if not changed and not removed:
+            return []
+
+        reloaded = self.get_dependents(hyfiles, changed | removed)
+        shared_locals = self.shared_locals
+        old_names = {}
+        old_values = {}
+        for hyfile in reloaded | removed:
+            old_names[hyfile] = self.names.pop(hyfile, set())
+            for name in old_names[hyfile]:
+                old_values[name] = shared_locals.pop(name, None)
+        for hyfile in removed:
+            self.stamps.pop(hyfile)
+            self.flows.pop(hyfile, None)
+            self.flowgraphs.pop(hyfile, None)
+            self._symbols.pop(hyfile, None)
+
+        if reloaded:
+            self.logger.info("Reloading %s", ", ".join(sorted(reloaded)))
+        try:
+            for hyfile in hyfiles:
+                if hyfile in reloaded:
+                    self.eval_hyfile(hyfile, shared_locals)
+        except Exception:
+            # Evaluate them again next time, the FlowStore isn't changed
+            for hyfile in reloaded:
+                if hyfile not in self.names:
+                    self.names[hyfile] = old_names[hyfile]
+                    self.stamps.pop(hyfile, None)
+            raise
+
+        names = set()
+        for hyfile in reloaded:
+            names.update(self.names[hyfile])
+
+        for name, value in old_values.items():
+            if name in names:
+                continue
+            if isinstance(value, Flow):
+                self.flowstore.remove_flow(name)
+            if isinstance(value, FlowGraph):
+                self.flowstore.remove_flowgraph(name)
+        for name in [item for item in shared_locals if item in names]:
+            value = shared_locals[name]
+            if isinstance(value, Flow):
+                self.flowstore.add_flow(name, value)
+            elif isinstance(value, FlowGraph):
+                self.flowstore.add_flowgraph(name, value)
+            elif isinstance(old_values.get(name), Flow):
+                self.flowstore.remove_flow(name)
+            elif isinstance(old_values.get(name), FlowGraph):
+                self.flowstore.remove_flowgraph(name)
+
+        self.apply_settings(shared_locals, names)
+        self.add_default_flowgraph()
+        if "_prefetch" in names:
+            self.flowstore.stop_prefetching()
+            self.flowstore.prefetchers.clear()
+            for flow_name, options in shared_locals["_prefetch"].items():
+                self.flowstore.prefetch(
+                    self.pconfig, flow_name, **(options or {})
+                )
+
+        return sorted(reloaded)
+
+    def get_dependents(
+        self, hyfiles: List[str], changed: Set[str]
+    ) -> Set[str]:
+        """Returns the hyfiles to evaluate again after some changed.
+
+        Args:
+          hyfiles:
+            A list with the names of the project's hyfiles.
+          changed:
+            A set with the names of the changed or removed hyfiles.
+
+        Returns:
+          A set with the changed hyfiles which still exist, plus the
+          ones using or redefining a name defined by a reloaded hyfile.
+
+        """
+        reloaded = {hyfile for hyfile in changed if hyfile in hyfiles}
+        names = set()
+        for hyfile in changed:
+            names.update(self.names.get(hyfile, set()))
+
+        pending = True
+        while pending:
+            pending = False
+            for hyfile in hyfiles:
+                if hyfile in reloaded:
+                    continue
+                defined = self.names.get(hyfile, set())
+                if names & (self.get_symbols(hyfile) | defined):
+                    reloaded.add(hyfile)
+                    names.update(defined)
+                    pending = True
+        return reloaded
+
+    def get_stamp(self, hyfile: str) -> Tuple[int, int, str]:
+        """Returns the modification time, size and hash of a hyfile."""
+        filename = get_project_file(self.name, hyfile)
+        stat = os.stat(filename)
+        with open(filename, "rb") as content:
+            digest = hashlib.sha256(content.read()).hexdigest()
+        return (stat.st_mtime_ns, stat.st_size, digest)
+
+    def has_changed(self, hyfile: str) -> bool:
+        """Checks if a hyfile changed since it was evaluated.
+
+        The file is only read when its modification time or size
+        changed, to compare its hash.
+
+        """
+        stamp = self.stamps.get(hyfile)
+        if not stamp:
+            return True
+        stat = os.stat(get_project_file(self.name, hyfile))
+        if (stat.st_mtime_ns, stat.st_size) == stamp[:2]:
+            return False
+        new_stamp = self.get_stamp(hyfile)
+        if new_stamp[2] != stamp[2]:
+            return True
+        # Only touched
+        self.stamps[hyfile] = new_stamp
+        return False
+
+    def get_symbols(self, hyfile: str) -> Set[str]:
+        """Returns the names used in a hyfile, cached until it changes."""
+        stamp = self.stamps.get(hyfile)
+        cached = self._symbols.get(hyfile)
+        if not cached or cached[0] != stamp:
+            filename = get_project_file(self.name, hyfile)
+            cached = (stamp, hyfile_symbols(filename))
+            self._symbols[hyfile] = cached
+        return cached[1]
+
+    def watch(
+        self,
+        callback: Optional[Callable[[List[str]], None]] = None,
+        interval: float = 1.0,
+    ) -> None:
+        """Reloads the project whenever its hyfiles change.
+
+        Checks the hyfiles every ``interval`` seconds until interrupted
+        with Ctrl-C. Errors in the hyfiles are logged, and the hyfile
+        is evaluated again after the next change.
+
+        Args:
+          callback:
+            An optional function called with the list of reloaded
+            hyfiles after each reload.
+          interval:
+            A float with the number of seconds between checks.
+
+        """
+        self.load()
+        try:
+            while True:
+                time.sleep(interval)
+                try:
+                    reloaded = self.reload()
+                except Exception as err:  # pylint: disable=broad-except
+                    self.logger.error("Reloading failed: %s", err)
+                    continue
+                if reloaded and callback:
+                    callback(reloaded)
+        except KeyboardInterrupt:
+            pass
 
     def write_session_file(self) -> None:
         """Saves session data.
 
         Saves user related session data in a file for later use. This
         includes cookies, headers, and other data extracted using
-        Plugins.
+        Plugins. With a :class:`UserPool <raider.user.UserPool>`,
+        only the users kept in memory are saved.
 
         """
         filename = get_project_file(self.name, "_userdata.hy")
@@ -210,8 +563,13 @@ class Project:
         cookies = {}
         headers = {}
         data = {}
+        if isinstance(self.users, UserPool):
+            # Only the users in memory can have session data
+            usernames = self.users.cached()
+        else:
+            usernames = list(self.users)
         with open(filename, "w", encoding="utf-8") as sess_file:
-            for username in self.users:
+            for username in usernames:
                 user = self.users[username]
                 cookies.update({username: user.cookies.to_dict()})
                 headers.update({username: user.headers.to_dict()})
@@ -309,31 +667,56 @@ class Projects(DataStore):
     """Class storing Raider projects.
 
     This class inherits from DataStore, and converts the values into
-    Project objects.
+    Project objects. The objects are only created the first time a
+    project is accessed, so starting Raider doesn't depend on the
+    number of projects.
 
     """
 
     def __init__(self, config: Config, active_project: str = None) -> None:
         """Initializes a Projects object.
 
-        Given a list of Project objects, create the Projects DataStore
-        containing them.
+        Creates the Projects DataStore with the names of the projects
+        found in the configuration directory.
 
         Args:
-          projects:
-            A list of Project objects to be added to the Projects
-            DataStore.
+          config:
+            The global Config object used by the projects.
+          active_project:
+            An optional string with the name of the active project.
 
         """
         if active_project:
             config.active_project = active_project
 
-        values = {}
-        if list_projects():
-            for project in list_projects():
-                values[project] = Project(config, project)
+        self.config = config
+        super().__init__({project: None for project in list_projects()})
+
+    def __getitem__(self, key: Any) -> Any:
+        """Returns the Project, creating it the first time."""
+        if key in self._store and self._store[key] is None:
+            self._store[key] = Project(self.config, key)
+        return super().__getitem__(key)
+
+    def values(self) -> List[Any]:
+        """Returns a list with all the Project objects."""
+        return [self[key] for key in self._store]
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Returns a list of tuples with the names and the Projects."""
+        return [(key, self[key]) for key in self._store]
+
+    def instances(self) -> List["Project"]:
+        """Returns the Project objects created so far."""
+        return [
+            project for project in self._store.values() if project is not None
+        ]
 
-        super().__init__(values)
+    def refresh(self) -> None:
+        """Adds the projects created since the projects were listed."""
+        for project in list_projects(refresh=True):
+            if project not in self._store:
+                self[project] = None
 
     def search_projects(self, search: str = None) -> List[str]:
         matches = set()
@@ -341,9 +724,9 @@ class Projects(DataStore):
             matches = sorted(self.keys())
             return matches
 
-        for project in self.values():
-            if search.lower() in project.name.lower():
-                matches.add(project.name)
+        for project in self.keys():
+            if search.lower() in project.lower():
+                matches.add(project)
 
         matches = sorted(list(matches))
         return {project: {} for project in matches}
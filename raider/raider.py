@@ -17,14 +17,20 @@
 """
 
 import sys
-from typing import Optional
+from typing import Dict, List, Optional, Union
 
 from raider.config import Config
 from raider.flowstore import FlowStore
 from raider.fuzzing import Fuzz
+from raider.limits import RateLimiter
 from raider.plugins.common import Plugin
+from raider.profiler import Profiler
 from raider.projects import Project, Projects
-from raider.user import User
+from raider.results import ResultStore
+from raider.timing import Timings
+from raider.transport import AsyncTransport, TransportError
+from raider.user import User, UserPool
+from raider.utils import get_project_file
 
 
 class Raider:
@@ -78,19 +84,169 @@ class Raider:
         self.projects = Projects(self.gconfig, self._project_name)
         self._flags = flags
 
-    def run(self, flows: str, test: bool = False):
+    def run(
+        self, flows: str, test: bool = False, profile: Optional[str] = None
+    ):
+        """Runs Flows and FlowGraphs.
+
+        Args:
+          flows:
+            A string with the comma separated names of the Flows and
+            FlowGraphs to run.
+          test:
+            A boolean which when True will also run the FlowGraph's
+            test Flow.
+          profile:
+            An optional string with a directory. When set, the project
+            loading and each Flow are profiled, and the results are
+            saved there.
+
+        """
+        if profile:
+            self.enable_profiler(profile)
+            try:
+                self._run(flows, test)
+            finally:
+                self.save_profile()
+        else:
+            self._run(flows, test)
+
+    def _run(self, flows: str, test: bool) -> None:
+        """Runs Flows and FlowGraphs without profiling."""
         self.project.load()
         for name in flows.split(","):
-            if self.flowstore.is_flow(name):
-                result = self.flowstore.run_flow(self.pconfig, name)
-                if result == False:
-                    self.logger.critical("Flow returned (Failure). Exiting!")
+            try:
+                if self.flowstore.is_flow(name):
+                    result = self.flowstore.run_flow(self.pconfig, name)
+                    if result == False:
+                        self.logger.critical(
+                            "Flow returned (Failure). Exiting!"
+                        )
+                        sys.exit()
+                elif self.flowstore.is_flowgraph(name):
+                    self.flowstore.run_flowgraph(self.pconfig, name, test)
+                else:
+                    self.logger.critical(name + " not defined, cannot run!")
                     sys.exit()
-            elif self.flowstore.is_flowgraph(name):
-                self.flowstore.run_flowgraph(self.pconfig, name, test)
-            else:
-                self.logger.critical(name + " not defined, cannot run!")
+            except TransportError as err:
+                self.logger.critical(str(err))
+                sys.exit()
+
+    async def async_run(self, flows: str, test: bool = False) -> None:
+        """Runs Flows and FlowGraphs using asyncio.
+
+        Same as :meth:`run`, but the requests are sent through an
+        :class:`AsyncTransport <raider.transport.AsyncTransport>`:
+
+        .. code-block:: python
+
+            asyncio.run(Raider("myproject").async_run("login"))
+
+        Args:
+          flows:
+            A string with the comma separated names of the Flows and
+            FlowGraphs to run.
+          test:
+            A boolean which when True will also run the FlowGraph's
+            test Flow.
+
+        """
+        self.project.load()
+        async with AsyncTransport(self.pconfig) as transport:
+            for name in flows.split(","):
+                try:
+                    await self._async_run_one(name, test, transport)
+                except TransportError as err:
+                    self.logger.critical(str(err))
+                    sys.exit()
+
+    async def _async_run_one(
+        self, name: str, test: bool, transport: AsyncTransport
+    ) -> None:
+        """Runs one Flow or FlowGraph using asyncio."""
+        if self.flowstore.is_flow(name):
+            result = await self.flowstore.async_run_flow(
+                self.pconfig, name, transport
+            )
+            if result is False:
+                self.logger.critical("Flow returned (Failure). Exiting!")
                 sys.exit()
+        elif self.flowstore.is_flowgraph(name):
+            await self.flowstore.async_run_flowgraph(
+                self.pconfig, name, transport, test
+            )
+        else:
+            self.logger.critical(name + " not defined, cannot run!")
+            sys.exit()
+
+    def run_users(
+        self, flowgraph: str, shard: str = "0/1", resume: bool = True
+    ) -> Dict[str, int]:
+        """Runs a FlowGraph once for every user.
+
+        Each user from the project's :class:`Users
+        <raider.user.Users>` or :class:`UserPool
+        <raider.user.UserPool>` becomes the active user in turn, and
+        the FlowGraph is run for it. When a :class:`UserPool
+        <raider.user.UserPool>` is used, the result for each user is
+        recorded in its database, so an interrupted run can be resumed.
+
+        Args:
+          flowgraph:
+            A string with the name of the FlowGraph to run.
+          shard:
+            A string in the "index/count" format selecting which part
+            of the users to run. Useful to split the users between
+            multiple processes.
+          resume:
+            A boolean which when True skips the users with a result
+            already recorded in the :class:`UserPool
+            <raider.user.UserPool>`.
+
+        Returns:
+          A dictionary with the number of users for each result.
+
+        """
+        self.project.load()
+        if not self.flowstore.is_flowgraph(flowgraph):
+            self.logger.critical(flowgraph + " not defined, cannot run!")
+            sys.exit()
+
+        index, count = [int(item) for item in shard.split("/")]
+        users = self.pconfig.users
+        if isinstance(users, UserPool):
+            usernames = users.shard(index, count, pending=resume)
+        else:
+            usernames = [
+                username
+                for position, username in enumerate(users or [])
+                if position % count == index
+            ]
+
+        results: Dict[str, int] = {}
+        for username in usernames:
+            users.active_user = username
+            self.logger.info("Running %s as %s", flowgraph, username)
+            try:
+                outcome = self.flowstore.walk_flowgraph(
+                    self.pconfig, flowgraph
+                )
+            except TransportError as err:
+                self.logger.error("%s: %s", username, str(err))
+                result = "error"
+            else:
+                if outcome is True:
+                    result = "success"
+                elif outcome is False:
+                    result = "failure"
+                else:
+                    result = "unfinished"
+
+            results[result] = results.get(result, 0) + 1
+            if isinstance(users, UserPool):
+                users.record(username, result)
+
+        return results
 
     def load_session(self) -> None:
         """Loads saved session from ``_userdata.hy``."""
@@ -104,7 +260,15 @@ class Raider:
     def fuzz(
         self,
         flow_name: str,
-        fuzzing_point: str,
+        fuzzing_point: Union[str, List[str]],
+        flowgraph: Optional[str] = None,
+        workers: int = 1,
+        adaptive: bool = False,
+        cluster_bomb: bool = False,
+        results: bool = True,
+        calibrate: bool = False,
+        snapshot: bool = False,
+        prefetch: Optional[List[str]] = None,
     ) -> Fuzz:
         """Fuzz a function with an authenticated user.
 
@@ -119,39 +283,80 @@ class Raider:
           fuzzing_point:
             The name given to the :class:`Plugin
             <raider.plugins.Plugin>` inside :class:`Request
-            <raider.request.Request>` which will be fuzzed.
+            <raider.request.Request>` which will be fuzzed, or a list
+            with the names of multiple Plugins.
+          flowgraph:
+            An optional string with the name of a :class:`FlowGraph
+            <raider.flowgraph.FlowGraph>`. When set, the FlowGraph is
+            followed until reaching the fuzzed Flow, and again every
+            time the fuzzed Flow moves to another one.
+          workers:
+            An integer with the number of concurrent requests. When
+            following a FlowGraph, the number of independently
+            authenticated sessions fuzzing the Flow in parallel.
+          adaptive:
+            A boolean, if True the number of concurrent requests is
+            adjusted automatically up to ``workers``, based on the
+            latency and the errors.
+          cluster_bomb:
+            A boolean, if True all the combinations of the fuzzing
+            strings are tried, instead of combining them one by one.
+          results:
+            A boolean, if True the result of every request is recorded
+            in the project's ``_results.db`` :class:`ResultStore
+            <raider.results.ResultStore>`.
+          calibrate:
+            A boolean, if True random strings are sent first, and the
+            responses looking like theirs are hidden.
+          snapshot:
+            A boolean, if True the state from when the fuzzed Flow was
+            reached is restored when it moves to another Flow, instead
+            of following the FlowGraph again.
+          prefetch:
+            An optional list with the names of the Flows producing
+            one-time tokens. Their outputs are fetched in the
+            background, and served when the Flows run.
 
         """
-        is_authentication = False
-        flow = self.functions[flow_name]
+        self.project.load()
+        flow = self.flowstore[flow_name]
         if not flow:
-            flow = self.authentication[flow_name]
-            is_authentication = True
-        if flow:
-            if self.session_loaded:
-                self.fix_function_plugins(flow_name)
-
-            if is_authentication:
-                fuzzer = Fuzz(
-                    project=self.project,
-                    flow=flow,
-                    fuzzing_point=fuzzing_point,
-                    flags=Fuzz.IS_AUTHENTICATION,
-                )
-            else:
-                fuzzer = Fuzz(
-                    project=self.project,
-                    flow=flow,
-                    fuzzing_point=fuzzing_point,
-                    flags=0,
-                )
-
-        else:
             self.logger.critical(
                 "Function %s not defined, cannot fuzz!", flow_name
             )
             sys.exit()
 
+        if self.session_loaded:
+            self.fix_function_plugins(flow_name)
+
+        for name in prefetch or []:
+            if name not in self.flowstore.prefetchers:
+                self.flowstore.prefetch(self.pconfig, name)
+
+        flags = 0
+        if flowgraph:
+            flags |= Fuzz.IS_AUTHENTICATION
+        if adaptive:
+            flags |= Fuzz.ADAPTIVE_CONCURRENCY
+        if cluster_bomb:
+            flags |= Fuzz.CLUSTER_BOMB
+        if calibrate:
+            flags |= Fuzz.AUTO_CALIBRATE
+        if snapshot:
+            flags |= Fuzz.RESTORE_SNAPSHOT
+
+        fuzzer = Fuzz(
+            project=self.project,
+            flow=flow,
+            fuzzing_point=fuzzing_point,
+            flags=flags,
+            flowgraph=flowgraph,
+        )
+        fuzzer.workers = workers
+        if results:
+            fuzzer.results = ResultStore(
+                get_project_file(self.project.name, "_results.db")
+            )
         return fuzzer
 
     def fix_function_plugins(self, function: str) -> None:
@@ -162,7 +367,7 @@ class Raider:
         extracted data instead of extracting it again.
 
         """
-        flow = self.functions[function]
+        flow = self.flowstore[function]
         if not flow:
             self.logger.critical(
                 "Function %s not found. Cannot continue.", function
@@ -194,6 +399,83 @@ class Raider:
         """Returns the Authentication object"""
         return self.project.flowstore
 
+    def enable_timings(self) -> Timings:
+        """Starts recording timings for the active project.
+
+        Returns:
+          The :class:`Timings <raider.timing.Timings>` object where
+          the measurements will be stored.
+
+        """
+        if not self.pconfig.timings:
+            self.pconfig.timings = Timings()
+        return self.pconfig.timings
+
+    def enable_profiler(self, output_dir: str) -> Profiler:
+        """Starts profiling the active project.
+
+        Call this before loading the project to include the
+        :term:`hyfiles` evaluation in the results.
+
+        Args:
+          output_dir:
+            A string with the directory where the results will be saved.
+
+        Returns:
+          The :class:`Profiler <raider.profiler.Profiler>` object.
+
+        """
+        if not self.pconfig.profiler:
+            self.pconfig.profiler = Profiler(output_dir)
+            self.pconfig.profiler.start()
+        return self.pconfig.profiler
+
+    def save_profile(self) -> None:
+        """Stops profiling and saves the results."""
+        profiler = self.pconfig.profiler
+        if profiler:
+            profiler.stop()
+            for filename in profiler.save():
+                self.logger.info("Profiling data saved to %s", filename)
+            self.pconfig.profiler = None
+
+    def limit_rate(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+    ) -> RateLimiter:
+        """Limits the requests sent to each host.
+
+        Overrides the defaults from the ``_rate_limit`` variable, so it
+        should be called after the project is loaded. Limits for
+        specific hosts set in the project are kept.
+
+        Args:
+          rate:
+            An optional float with the number of requests per second.
+          burst:
+            An optional integer with the number of requests which can
+            be sent at once after being idle.
+          max_in_flight:
+            An optional integer with the maximum number of concurrent
+            requests.
+
+        Returns:
+          The :class:`RateLimiter <raider.limits.RateLimiter>` object
+          of the project.
+
+        """
+        self.pconfig.limiter.configure(
+            rate=rate, burst=burst, max_in_flight=max_in_flight
+        )
+        return self.pconfig.limiter
+
+    @property
+    def timings(self) -> Optional[Timings]:
+        """Returns the Timings object, or None if not enabled."""
+        return self.pconfig.timings
+
     @property
     def user(self) -> User:
         """Returns the User object"""
@@ -202,4 +484,4 @@ class Raider:
     @property
     def session_loaded(self) -> bool:
         """Returns True if the SESSION_LOADED flag is set."""
-        return bool(self.flags & self.SESSION_LOADED)
+        return bool(self._flags & self.SESSION_LOADED)
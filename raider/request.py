@@ -19,20 +19,19 @@
 
 import json
 import logging
-import sys
 import urllib
-from copy import deepcopy
 from functools import partial
 from typing import Any, Dict, List, Optional, Union
 
 import requests
-from urllib3.exceptions import InsecureRequestWarning
 
+from raider.cloning import Clonable
 from raider.plugins.basic.cookie import Cookie
 from raider.plugins.basic.file import File
 from raider.plugins.basic.header import Header
 from raider.plugins.common import Plugin
 from raider.structures import CookieStore, DataStore, HeaderStore
+from raider.transport import AsyncTransport
 from raider.user import User
 from raider.utils import colors
 
@@ -176,7 +175,7 @@ def process_data(raw_data: Dict[str, DataStore], pconfig) -> Dict[str, str]:
     return httpdata
 
 
-class Request:
+class Request(Clonable):
     """Class holding the elements of the HTTP request.
 
     When a Flow object is created, it defines a Request object with
@@ -305,49 +304,49 @@ class Request:
             inputs.update({name: header})
             inputs.update(get_children_plugins(header))
 
-        for key, value in self.data.items():
-            if isinstance(key, Plugin):
-                inputs.update({key.name: key})
-                inputs.update(get_children_plugins(key))
+        def get_data_plugins(data: Dict[Any, Any]) -> Dict[str, Plugin]:
+            """Returns the plugins from the HTTP data.
+
+            Goes recursively through the dictionary, and returns all
+            plugins found in its keys and values.
+
+            """
+            output = {}
+            for key, value in data.items():
+                for item in (key, value):
+                    if isinstance(item, Plugin):
+                        output.update({item.name: item})
+                        output.update(get_children_plugins(item))
+                if isinstance(value, dict):
+                    output.update(get_data_plugins(value))
+            return output
+
+        for value in self.data.values():
             if isinstance(value, Plugin):
                 inputs.update({value.name: value})
                 inputs.update(get_children_plugins(value))
+            else:
+                inputs.update(get_data_plugins(value.to_dict()))
 
         return inputs
 
-    def send(self, pconfig) -> Optional[requests.models.Response]:
-        """Sends the HTTP request.
+    def prepare(self, pconfig) -> Dict[str, Any]:
+        """Prepares the HTTP request.
 
-        With the given user information, replaces the input plugins with
-        their values, and sends the HTTP request. Returns the response.
+        Replaces the input plugins with their values, and returns the
+        arguments for the HTTP client. Used by both :meth:`send` and
+        :meth:`async_send`.
 
         Args:
-          user:
-            A User object with the user specific data to be used when
-            processing inputs.
           pconfig:
             A Config object with the global Raider configuration.
 
         Returns:
-          A requests.models.Response object with the HTTP response
-          received after sending the generated request.
+          A dictionary with the ``url``, ``headers``, ``cookies``,
+          ``params``, ``data``, ``json`` and ``files`` to be sent.
 
         """
-        verify = pconfig.verify
-
         self.logger = pconfig.logger
-        if not verify:
-            # False positive
-            # pylint: disable=no-member
-            requests.packages.urllib3.disable_warnings(
-                category=InsecureRequestWarning
-            )
-
-        if pconfig.use_proxy:
-            proxies = {"all": pconfig.proxy}
-        else:
-            proxies = None
-
         if isinstance(self.url, Plugin):
             url = self.url.get_value(pconfig)
         else:
@@ -385,24 +384,62 @@ class Request:
         self.logger.debug("JSON: %s", str(processed.get("json")))
         self.logger.debug("Multipart: %s", str(processed.get("multipart")))
 
-        try:
-            req = self.function(
-                url=url,
-                headers=headers,
-                cookies=cookies,
-                proxies=proxies,
-                verify=verify,
-                allow_redirects=False,
-                params=params,
-                data=processed.get("data"),
-                json=json_data,
-                files=processed.get("multipart"),
-            )
-        except requests.exceptions.ProxyError:
-            self.logger.critical("Cannot establish connection!")
-            sys.exit()
+        return {
+            "url": url,
+            "headers": headers,
+            "cookies": cookies,
+            "params": params,
+            "data": processed.get("data"),
+            "json": json_data,
+            "files": processed.get("multipart"),
+        }
+
+    def send(self, pconfig) -> requests.models.Response:
+        """Sends the HTTP request.
+
+        With the given user information, replaces the input plugins with
+        their values, and sends the HTTP request through the project's
+        :class:`Transport <raider.transport.Transport>`. Returns the
+        response.
 
-        return req
+        Args:
+          pconfig:
+            A Config object with the global Raider configuration.
+
+        Returns:
+          A requests.models.Response object with the HTTP response
+          received after sending the generated request.
+
+        Raises:
+          TransportError: When the request couldn't be sent, even after
+            retrying.
+
+        """
+        prepared = self.prepare(pconfig)
+        return pconfig.transport.send(self.method, **prepared)
+
+    async def async_send(
+        self, pconfig, transport: AsyncTransport
+    ) -> requests.models.Response:
+        """Sends the HTTP request without blocking the event loop.
+
+        Same as :meth:`send`, but the request is sent through an
+        :class:`AsyncTransport <raider.transport.AsyncTransport>`.
+
+        Args:
+          pconfig:
+            A Config object with the global Raider configuration.
+          transport:
+            The :class:`AsyncTransport
+            <raider.transport.AsyncTransport>` used to send the request.
+
+        Returns:
+          A requests.models.Response object with the HTTP response, so
+          Plugins and Operations work the same way as with :meth:`send`.
+
+        """
+        prepared = self.prepare(pconfig)
+        return await transport.send(self.method, **prepared)
 
 
 class Template(Request):
@@ -448,7 +485,7 @@ class Template(Request):
         of itself with the modified parameters.
 
         """
-        template = deepcopy(self)
+        template = self.clone()
 
         if method:
             template.method = method
@@ -0,0 +1,456 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Storage for the results of fuzzing.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from requests.models import Response
+
+from raider.utils import colored_text
+
+# Columns which can be used to sort and group the results
+COLUMNS = (
+    "run",
+    "position",
+    "payload",
+    "status",
+    "length",
+    "words",
+    "lines",
+    "latency",
+    "hash",
+    "error",
+    "simhash",
+)
+
+
+def response_features(
+    response: Response, content: Optional[bytes] = None
+) -> Dict[str, Any]:
+    """Returns the features used to compare HTTP responses.
+
+    Args:
+      response:
+        A :class:`Response <requests.models.Response>` object.
+      content:
+        Optional bytes used instead of the response body, for example
+        after removing the reflected fuzzing strings.
+
+    Returns:
+      A dictionary with the ``status`` code, the ``length`` of the
+      body in bytes, the number of ``words`` and ``lines``, and the
+      ``hash`` of the body.
+
+    """
+    if content is None:
+        content = response.content or b""
+    return {
+        "status": response.status_code,
+        "length": len(content),
+        "words": len(content.split()),
+        "lines": content.count(b"\n") + 1 if content else 0,
+        "hash": hashlib.blake2b(content, digest_size=8).hexdigest(),
+    }
+
+
+class ResultStore:
+    """Class storing the result of each fuzzing request.
+
+    Every request sent by :class:`Fuzz <raider.fuzzing.Fuzz>` is
+    recorded in a SQLite database, with the fuzzing strings, the status
+    code, the length, the number of words and lines, the latency and a
+    hash of the response body. The columns are indexed, so the runs can
+    be analyzed later without sending the requests again:
+
+    .. code-block:: python
+
+        store = ResultStore("_results.db")
+        store.group_by("status", "length")
+        store.query("status = ? AND latency > ?", (200, 1.5))
+
+    Each :meth:`start_run` call starts a new run, and queries use the
+    last one unless another run is given. The rows are written in
+    batches, so recording doesn't slow down fuzzing.
+
+    Attributes:
+      filename:
+        A string with the path to the SQLite database.
+      run:
+        An integer with the ID of the current run, or None.
+      batch_size:
+        An integer with the number of results written at once.
+
+    """
+
+    def __init__(self, filename: str, batch_size: int = 500) -> None:
+        """Initializes the ResultStore object.
+
+        Args:
+          filename:
+            A string with the path to the SQLite database. It's created
+            if it doesn't exist.
+          batch_size:
+            An integer with the number of results written at once.
+
+        """
+        self.filename = os.path.expanduser(filename)
+        self.batch_size = batch_size
+        self.run: Optional[int] = None
+        self._pending: List[Tuple[Any, ...]] = []
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.filename, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        """Creates the database tables if they don't exist."""
+        with self._lock, self._connection:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run INTEGER PRIMARY KEY,
+                    flow TEXT,
+                    fuzzing_points TEXT,
+                    started REAL
+                );
+                CREATE TABLE IF NOT EXISTS results (
+                    run INTEGER,
+                    position INTEGER,
+                    payload TEXT,
+                    status INTEGER,
+                    length INTEGER,
+                    words INTEGER,
+                    lines INTEGER,
+                    latency REAL,
+                    hash TEXT,
+                    error TEXT,
+                    simhash TEXT
+                );
+                CREATE INDEX IF NOT EXISTS results_status
+                    ON results (run, status);
+                CREATE INDEX IF NOT EXISTS results_length
+                    ON results (run, length);
+                CREATE INDEX IF NOT EXISTS results_hash
+                    ON results (run, hash);
+                CREATE UNIQUE INDEX IF NOT EXISTS results_position
+                    ON results (run, position);
+                """
+            )
+            columns = [
+                row[1]
+                for row in self._connection.execute(
+                    "PRAGMA table_info(results)"
+                )
+            ]
+            if "simhash" not in columns:
+                self._connection.execute(
+                    "ALTER TABLE results ADD COLUMN simhash TEXT"
+                )
+
+    def start_run(self, flow: str, fuzzing_points: Sequence[str]) -> int:
+        """Starts recording a new run.
+
+        Args:
+          flow:
+            A string with the name of the fuzzed Flow.
+          fuzzing_points:
+            A list with the names of the fuzzed Plugins.
+
+        Returns:
+          An integer with the ID of the run.
+
+        """
+        self.flush()
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO runs (flow, fuzzing_points, started) "
+                "VALUES (?, ?, ?)",
+                (flow, ",".join(fuzzing_points), time.time()),
+            )
+            self.run = cursor.lastrowid
+        return self.run
+
+    def resume_run(self, run: int) -> None:
+        """Continues recording an existing run.
+
+        Results recorded again for the same position replace the old
+        ones.
+
+        Args:
+          run:
+            An integer with the ID of the run.
+
+        """
+        self.flush()
+        self.run = run
+
+    def record(
+        self,
+        position: int,
+        payload: str,
+        response: Optional[Response] = None,
+        latency: Optional[float] = None,
+        error: Optional[str] = None,
+        simhash: Optional[int] = None,
+    ) -> None:
+        """Records the result of one fuzzing request.
+
+        Args:
+          position:
+            An integer with the position of the fuzzing strings in the
+            run.
+          payload:
+            A string with the fuzzing strings.
+          response:
+            The :class:`Response <requests.models.Response>` object, or
+            None if the request failed.
+          latency:
+            An optional float with the number of seconds the request
+            took.
+          error:
+            An optional string with the error if the request failed.
+          simhash:
+            An optional integer with the :func:`simhash
+            <raider.similarity.simhash>` fingerprint of the body.
+
+        """
+        if response is not None:
+            features = response_features(response)
+        else:
+            features = dict.fromkeys(
+                ("status", "length", "words", "lines", "hash")
+            )
+        row = (
+            self.run,
+            position,
+            payload,
+            features["status"],
+            features["length"],
+            features["words"],
+            features["lines"],
+            latency,
+            features["hash"],
+            error,
+            "{:016x}".format(simhash) if simhash is not None else None,
+        )
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) < self.batch_size:
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        """Writes the pending results to the database."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if not rows:
+                return
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO results ({}) VALUES ({})".format(
+                        ", ".join(COLUMNS), ", ".join("?" * len(COLUMNS))
+                    ),
+                    rows,
+                )
+
+    def close(self) -> None:
+        """Writes the pending results and closes the database."""
+        self.flush()
+        with self._lock:
+            self._connection.close()
+
+    def _run_id(self, run: Optional[int]) -> Optional[int]:
+        """Returns the ID of the given run, or the last one."""
+        if run is not None:
+            return run
+        if self.run is not None:
+            return self.run
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT MAX(run) FROM runs"
+            ).fetchone()
+        return row[0]
+
+    @staticmethod
+    def _check_columns(columns: Iterable[str]) -> None:
+        """Raises ValueError if the columns don't exist."""
+        for column in columns:
+            if column not in COLUMNS:
+                raise ValueError("Unknown column " + column)
+
+    def query(
+        self,
+        where: str = "1",
+        params: Sequence[Any] = (),
+        order_by: str = "position",
+        limit: Optional[int] = None,
+        run: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Returns the results matching a condition.
+
+        Args:
+          where:
+            A string with the SQL condition, using ``?`` for the
+            parameters.
+          params:
+            A list with the parameters of the condition.
+          order_by:
+            A string with the column used to sort the results. Prefix
+            it with ``-`` to sort in descending order.
+          limit:
+            An optional integer with the maximum number of results.
+          run:
+            An optional integer with the ID of the run. The last run is
+            used if not set.
+
+        Returns:
+          A list of dictionaries mapping the column names to the values.
+
+        """
+        self.flush()
+        descending = order_by.startswith("-")
+        order_by = order_by.lstrip("-")
+        self._check_columns([order_by])
+
+        query = (
+            "SELECT " + ", ".join(COLUMNS) + " FROM results "
+            "WHERE run = ? AND (" + where + ") "
+            "ORDER BY " + order_by + (" DESC" if descending else "")
+        )
+        arguments = [self._run_id(run), *params]
+        if limit is not None:
+            query += " LIMIT ?"
+            arguments.append(limit)
+
+        with self._lock:
+            rows = self._connection.execute(query, arguments).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def group_by(
+        self,
+        *columns: str,
+        where: str = "1",
+        params: Sequence[Any] = (),
+        run: Optional[int] = None,
+    ) -> List[Tuple[Any, ...]]:
+        """Groups the results by some columns.
+
+        Args:
+          columns:
+            The names of the columns to group by.
+          where:
+            A string with the SQL condition, using ``?`` for the
+            parameters.
+          params:
+            A list with the parameters of the condition.
+          run:
+            An optional integer with the ID of the run. The last run is
+            used if not set.
+
+        Returns:
+          A list of tuples with the values of the columns, followed by
+          the number of results and their average latency, starting
+          with the largest groups.
+
+        """
+        self.flush()
+        columns = columns or ("status",)
+        self._check_columns(columns)
+        names = ", ".join(columns)
+        query = (
+            "SELECT " + names + ", COUNT(*), AVG(latency) FROM results "
+            "WHERE run = ? AND (" + where + ") "
+            "GROUP BY " + names + " ORDER BY COUNT(*) DESC"
+        )
+        # Resolved first, since _run_id takes the lock too
+        arguments = [self._run_id(run), *params]
+        with self._lock:
+            return self._connection.execute(query, arguments).fetchall()
+
+    def columns(
+        self, *columns: str, run: Optional[int] = None
+    ) -> List[Tuple[Any, ...]]:
+        """Returns the values of some columns for all the results.
+
+        Unlike :meth:`query`, the rows are returned as tuples, so large
+        runs can be loaded quickly for analysis.
+
+        Args:
+          columns:
+            The names of the columns.
+          run:
+            An optional integer with the ID of the run. The last run is
+            used if not set.
+
+        Returns:
+          A list of tuples with the values, sorted by ``position``.
+
+        """
+        self.flush()
+        self._check_columns(columns)
+        # Resolved first, since _run_id takes the lock too
+        run = self._run_id(run)
+        with self._lock:
+            return self._connection.execute(
+                "SELECT " + ", ".join(columns) + " FROM results "
+                "WHERE run = ? ORDER BY position",
+                (run,),
+            ).fetchall()
+
+    def runs(self) -> List[Tuple[int, str, str, float, int]]:
+        """Returns the runs in the database.
+
+        Returns:
+          A list of tuples with the ID of the run, the name of the Flow,
+          the fuzzing points, the time it started, and the number of
+          results.
+
+        """
+        self.flush()
+        with self._lock:
+            return self._connection.execute(
+                "SELECT runs.run, flow, fuzzing_points, started, "
+                "COUNT(results.run) FROM runs "
+                "LEFT JOIN results ON results.run = runs.run "
+                "GROUP BY runs.run ORDER BY runs.run"
+            ).fetchall()
+
+    def print_groups(self, *columns: str, run: Optional[int] = None) -> None:
+        """Prints the results grouped by some columns."""
+        columns = columns or ("status",)
+        print(
+            colored_text(
+                "".join("{:<12} ".format(column) for column in columns)
+                + "{:>9} {:>12}".format("Count", "Avg latency"),
+                "BLUE-BLACK-B",
+            )
+        )
+        for row in self.group_by(*columns, run=run):
+            values = row[: len(columns)]
+            count, latency = row[len(columns) :]
+            print(
+                "".join("{:<12} ".format(str(value)) for value in values)
+                + "{:>9} {:>10.0f}ms".format(count, (latency or 0) * 1000)
+            )
@@ -0,0 +1,202 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Retries and circuit breaking for failed HTTP requests.
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+# Methods which can be sent again without side effects
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE")
+
+
+class RetryPolicy:
+    """Class deciding when failed requests are sent again.
+
+    Only connection errors and timeouts are retried, the HTTP responses
+    are always returned, whatever their status code. The time between
+    attempts grows exponentially, with full jitter, so workers hitting
+    the same failure don't retry at the same time.
+
+    Configured with the ``_retries`` variable in the :term:`hyfiles`:
+
+    .. code-block:: hylang
+
+        (setv _retries {"retries" 3 "backoff" 1})
+
+    Attributes:
+      retries:
+        An integer with the number of times a request is retried.
+      backoff:
+        A float with the base number of seconds between attempts.
+      max_backoff:
+        A float with the maximum number of seconds between attempts.
+      methods:
+        A tuple of strings with the HTTP methods which can be retried.
+
+    """
+
+    def __init__(
+        self,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        methods: Iterable[str] = IDEMPOTENT_METHODS,
+    ) -> None:
+        """Initializes the RetryPolicy object.
+
+        Args:
+          retries:
+            An integer with the number of times a request is retried.
+          backoff:
+            A float with the base number of seconds between attempts.
+          max_backoff:
+            A float with the maximum number of seconds between
+            attempts.
+          methods:
+            An iterable of strings with the HTTP methods which can be
+            retried. By default only the idempotent ones.
+
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.methods = tuple(method.upper() for method in methods)
+
+    def should_retry(self, method: str, attempt: int) -> bool:
+        """Returns True if the failed request should be sent again.
+
+        Args:
+          method:
+            A string with the HTTP method.
+          attempt:
+            An integer with the number of the attempt which failed,
+            starting from 0.
+
+        """
+        return attempt < self.retries and method.upper() in self.methods
+
+    def delay(self, attempt: int) -> float:
+        """Returns the number of seconds to wait before retrying.
+
+        Args:
+          attempt:
+            An integer with the number of the attempt which failed,
+            starting from 0.
+
+        """
+        ceiling = min(self.max_backoff, self.backoff * 2**attempt)
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Class pausing the requests to hosts which keep failing.
+
+    After ``threshold`` consecutive failed requests to a host, the
+    circuit opens and new requests to this host wait ``reset_timeout``
+    seconds. Then they're sent again, and the circuit closes with the
+    first successful one.
+
+    Configured with the ``_circuit_breaker`` variable in the
+    :term:`hyfiles`:
+
+    .. code-block:: hylang
+
+        (setv _circuit_breaker {"threshold" 5 "reset_timeout" 30})
+
+    Attributes:
+      threshold:
+        An integer with the number of consecutive failures opening the
+        circuit. Set to 0 to disable the circuit breaker.
+      reset_timeout:
+        A float with the number of seconds the host is paused.
+      failures:
+        A dictionary mapping the hosts to the number of consecutive
+        failures.
+      opened:
+        A dictionary mapping the hosts with an open circuit to the time
+        it was opened.
+
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        """Initializes the CircuitBreaker object.
+
+        Args:
+          threshold:
+            An integer with the number of consecutive failures opening
+            the circuit.
+          reset_timeout:
+            A float with the number of seconds the host is paused.
+
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures: Dict[str, int] = {}
+        self.opened: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def delay(self, host: str) -> float:
+        """Returns the number of seconds to wait before sending.
+
+        Args:
+          host:
+            A string with the host of the request.
+
+        """
+        with self._lock:
+            opened = self.opened.get(host)
+        if opened is None:
+            return 0.0
+        return max(opened + self.reset_timeout - time.monotonic(), 0.0)
+
+    def success(self, host: str) -> None:
+        """Closes the circuit after a successful request."""
+        with self._lock:
+            self.failures.pop(host, None)
+            self.opened.pop(host, None)
+
+    def failure(self, host: str) -> bool:
+        """Records a failed request.
+
+        Args:
+          host:
+            A string with the host of the request.
+
+        Returns:
+          True if the circuit was opened by this failure.
+
+        """
+        if not self.threshold:
+            return False
+        with self._lock:
+            failures = self.failures.get(host, 0) + 1
+            self.failures[host] = failures
+            if failures >= self.threshold:
+                reopened = host in self.opened
+                self.opened[host] = time.monotonic()
+                return not reopened
+        return False
+
+    def state(self) -> Dict[str, Tuple[int, bool]]:
+        """Returns the number of failures and if the circuit is open."""
+        with self._lock:
+            return {
+                host: (failures, host in self.opened)
+                for host, failures in self.failures.items()
+            }
@@ -1,22 +1,26 @@
 from raider.flow import Flow
+from raider.index import SearchIndex
 from raider.utils import list_hyfiles, list_projects
 
 
 class Matches:
-    def __init__(self, raider):
+    def __init__(self, raider, index=None):
         self.raider = raider
+        self.index = index
         self.results = {}
 
+    @property
+    def source(self):
+        return self.index or self.raider.projects
+
     def match_projects(self, search):
-        self.results = self.raider.projects.search_projects(search)
+        self.results = self.source.search_projects(search)
 
     def match_hyfiles(self, search):
-        self.results = self.raider.projects.search_hyfiles(
-            self.results, search
-        )
+        self.results = self.source.search_hyfiles(self.results, search)
 
     def match_flows(self, search_flows, search_flowgraphs):
-        self.results = self.raider.projects.search_flows(
+        self.results = self.source.search_flows(
             self.results, search_flows, search_flowgraphs
         )
 
@@ -25,14 +29,19 @@ class Search:
     def __init__(self, raider, args):
         self.raider = raider
         self.args = args
-        self.matches = Matches(raider)
+        if getattr(args, "evaluate", False):
+            self.index = None
+        else:
+            self.index = SearchIndex.open()
+        self.matches = Matches(raider, self.index)
 
     def search(self):
         self.matches.match_projects(self.args.projects)
         self.matches.match_hyfiles(self.args.hyfiles)
         if self.print_flows_enabled or self.print_flowgraphs_enabled:
-            for project in self.matches.results:
-                self.raider.projects[project].load()
+            if not self.index:
+                for project in self.matches.results:
+                    self.raider.projects[project].load()
             self.matches.match_flows(self.args.flows, self.args.graphs)
 
             results = self.matches.results
@@ -61,7 +70,6 @@ class Search:
             for hyfile in self.matches.results[item]:
                 hyfiles_padding = projects_padding + 4
                 hyfiles_flows = self.matches.results[item]
-                flowstore = project.flowstore
 
                 if hyfile in hyfiles_flows:
                     project.print_hyfile(hyfile, spacing=hyfiles_padding)
@@ -70,19 +78,10 @@ class Search:
                             "flowgraphs"
                         ]:
                             flowgraphs_padding = hyfiles_padding + 4
-                            flowgraph = flowstore.flowgraphs[flowgraph_id]
-                            start_flow = flowgraph.start
-                            start_flow_name = flowstore.get_flow_name_by_flow(
-                                start_flow
-                            )
-                            if flowgraph.test:
-                                test_flow_name = (
-                                    flowstore.get_flow_name_by_flow(
-                                        flowgraph.test
-                                    )
-                                )
-                            else:
-                                test_flow_name = None
+                            (
+                                start_flow_name,
+                                test_flow_name,
+                            ) = self.get_flowgraph(item, flowgraph_id)
 
                             project.print_flowgraph(
                                 flowgraph_id,
@@ -98,6 +97,21 @@ class Search:
                                 flows_padding = hyfiles_padding + 4
                             project.print_flow(flow, spacing=flows_padding)
 
+    def get_flowgraph(self, project, flowgraph_id):
+        if self.index:
+            start, test = self.index.get_flowgraph(project, flowgraph_id)
+            # Not a name when the Flow is created inside the FlowGraph
+            return start or "?", test
+
+        flowstore = self.raider.projects[project].flowstore
+        flowgraph = flowstore.flowgraphs[flowgraph_id]
+        start_flow_name = flowstore.get_flow_name_by_flow(flowgraph.start)
+        if flowgraph.test:
+            test_flow_name = flowstore.get_flow_name_by_flow(flowgraph.test)
+        else:
+            test_flow_name = None
+        return start_flow_name, test_flow_name
+
     @property
     def print_hyfiles_enabled(self):
         if isinstance(self.args.hyfiles, str):
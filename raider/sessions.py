@@ -0,0 +1,350 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Pool of authenticated sessions used to fuzz FlowGraphs in parallel.
+"""
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, List, Optional
+
+from raider.flow import Flow
+from raider.projects import Project
+
+
+class SessionError(Exception):
+    """Raised when a session can't reach the fuzzed Flow."""
+
+
+class Session:
+    """One independently authenticated copy of the project.
+
+    Each session loads the project again, so it has its own
+    :class:`User <raider.user.User>` with the cookies, headers and data
+    extracted while following the FlowGraph, and its own :class:`Flow
+    <raider.flow.Flow>` objects with the Plugin values.
+
+    Attributes:
+      index:
+        An integer with the number of the session in the pool.
+      project:
+        The :class:`Project <raider.projects.Project>` of the session.
+      flow:
+        The fuzzed :class:`Flow <raider.flow.Flow>` of the session.
+      plugins:
+        A list with the fuzzed Plugins of the ``flow``, set by the
+        pool's ``prepare`` function.
+      primed:
+        An integer with the number of times the session followed the
+        FlowGraph to reach the fuzzed Flow.
+
+    """
+
+    def __init__(self, index: int, project: Project, flow: Flow) -> None:
+        """Initializes the Session object.
+
+        Args:
+          index:
+            An integer with the number of the session in the pool.
+          project:
+            The loaded :class:`Project <raider.projects.Project>` of
+            the session.
+          flow:
+            The fuzzed :class:`Flow <raider.flow.Flow>` of the session.
+
+        """
+        self.index = index
+        self.project = project
+        self.flow = flow
+        self.plugins: List[Any] = []
+        self.primed = 0
+
+    @property
+    def pconfig(self) -> Any:
+        """Returns the ProjectConfig of the session."""
+        return self.project.pconfig
+
+    @property
+    def flowstore(self) -> Any:
+        """Returns the FlowStore of the session."""
+        return self.project.flowstore
+
+
+class SessionPool:
+    """Class keeping sessions authenticated and ready to be fuzzed.
+
+    Flows using one-time tokens can only be fuzzed after following the
+    FlowGraph leading to them, and sometimes again after every request.
+    Instead of doing it with a single user, the pool keeps ``size``
+    sessions, each one stopped right before the fuzzed Flow.
+
+    A worker checks out a ready session, sends one request, and checks
+    it in with the result of the Flow's operations. If the fuzzed Flow
+    moved to another Flow, the session was consumed, and it follows the
+    FlowGraph again in the background while the other sessions keep
+    fuzzing. Sessions whose request failed are invalidated, and start
+    over from the beginning of the FlowGraph.
+
+    The sessions share the project's transport, rate limits, circuit
+    breaker and timings, so the limits apply to the whole pool and the
+    connections are reused.
+
+    .. code-block:: python
+
+        pool = SessionPool(project, "login", "AUTH", size=8)
+        pool.start()
+        session = pool.checkout()
+        ...
+        pool.checkin(session, next_flow)
+        pool.close()
+
+    Attributes:
+      project:
+        The :class:`Project <raider.projects.Project>` the sessions are
+        copied from.
+      flow_name:
+        A string with the name of the fuzzed Flow.
+      flowgraph:
+        A string with the name of the FlowGraph leading to the Flow.
+      size:
+        An integer with the number of sessions.
+      prepare:
+        An optional function called once with each new
+        :class:`Session`, before it's used.
+      attempts:
+        An integer with the number of consecutive times a session can
+        fail to reach the fuzzed Flow before it's dropped.
+
+    """
+
+    # Evaluating hyfiles isn't thread safe, so sessions load one by one
+    _load_lock = threading.Lock()
+
+    def __init__(
+        self,
+        project: Project,
+        flow_name: str,
+        flowgraph: str,
+        size: int = 4,
+        prepare: Optional[Callable[[Session], None]] = None,
+        attempts: int = 3,
+    ) -> None:
+        """Initializes the SessionPool object.
+
+        Args:
+          project:
+            The :class:`Project <raider.projects.Project>` the sessions
+            are copied from.
+          flow_name:
+            A string with the name of the fuzzed Flow.
+          flowgraph:
+            A string with the name of the FlowGraph leading to the
+            Flow.
+          size:
+            An integer with the number of sessions.
+          prepare:
+            An optional function called once with each new
+            :class:`Session`, before it's used.
+          attempts:
+            An integer with the number of consecutive times a session
+            can fail to reach the fuzzed Flow before it's dropped.
+
+        """
+        self.project = project
+        self.flow_name = flow_name
+        self.flowgraph = flowgraph
+        self.size = size
+        self.prepare = prepare
+        self.attempts = attempts
+
+        self._ready: Deque[Session] = deque()
+        self._alive = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        """Starts loading and priming the sessions in the background."""
+        self._closed = False
+        self._alive = self.size
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.size, thread_name_prefix="raider-session"
+        )
+        for index in range(self.size):
+            self._executor.submit(self._create, index)
+
+    def checkout(self) -> Optional[Session]:
+        """Returns a session ready to send the fuzzed Flow.
+
+        Waits until a session is ready.
+
+        Returns:
+          The :class:`Session`, or None if no session could reach the
+          fuzzed Flow.
+
+        """
+        with self._condition:
+            while not self._ready:
+                if not self._alive or self._closed:
+                    return None
+                self._condition.wait()
+            return self._ready.popleft()
+
+    def checkin(self, session: Session, next_flow: Any = None) -> None:
+        """Returns a session to the pool after sending the fuzzed Flow.
+
+        Args:
+          session:
+            The :class:`Session` which was checked out.
+          next_flow:
+            The value returned by the operations of the fuzzed Flow. If
+            it's the name of another Flow, the session follows the
+            FlowGraph from there in the background, until reaching the
+            fuzzed Flow again.
+
+        """
+        if isinstance(next_flow, str) and next_flow != self.flow_name:
+            self._submit(session, next_flow)
+        else:
+            self._release(session)
+
+    def invalidate(self, session: Session) -> None:
+        """Starts the session over from the beginning of the FlowGraph.
+
+        Args:
+          session:
+            The :class:`Session` which was checked out.
+
+        """
+        self._submit(session, None)
+
+    def close(self) -> None:
+        """Stops priming the sessions and waits for the running ones."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _create(self, index: int) -> None:
+        """Loads a new session and primes it."""
+        project = Project(self.project.pconfig.gconfig, self.project.name)
+        try:
+            with self._load_lock:
+                project.load()
+            project.pconfig.share(self.project.pconfig)
+            session = Session(
+                index, project, project.flowstore[self.flow_name]
+            )
+            if self.prepare:
+                self.prepare(session)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.error("Session %d couldn't be loaded: %s", index, err)
+            self._drop()
+            return
+        self._prime(session, None)
+
+    def _submit(self, session: Session, start: Optional[str]) -> None:
+        """Primes the session in the background."""
+        with self._condition:
+            executor = None if self._closed else self._executor
+        if executor:
+            executor.submit(self._prime, session, start)
+        else:
+            self._drop()
+
+    def _prime(self, session: Session, start: Optional[str]) -> None:
+        """Follows the FlowGraph until reaching the fuzzed Flow.
+
+        Args:
+          session:
+            The :class:`Session` to prime.
+          start:
+            An optional string with the name of the first Flow to run.
+            The start of the FlowGraph is used if not set.
+
+        """
+        for _ in range(self.attempts):
+            if self._closed:
+                break
+            try:
+                self.reach_flow(session, start)
+            except Exception as err:  # pylint: disable=broad-except
+                logging.error("Session %d: %s", session.index, err)
+                start = None
+                continue
+            session.primed += 1
+            self._release(session)
+            return
+        self._drop()
+
+    def reach_flow(self, session: Session, start: Optional[str]) -> None:
+        """Runs the session's Flows until reaching the fuzzed Flow.
+
+        Args:
+          session:
+            The :class:`Session` to run the Flows with.
+          start:
+            An optional string with the name of the first Flow to run.
+            The start of the FlowGraph is used if not set.
+
+        Raises:
+          SessionError: If a Flow didn't return the name of the next
+            Flow before reaching the fuzzed one.
+
+        """
+        flowstore = session.flowstore
+        next_flow = start
+        if next_flow is None:
+            flowgraph = flowstore.flowgraphs.get(self.flowgraph)
+            if not flowgraph:
+                raise SessionError(
+                    "FlowGraph " + self.flowgraph + " not defined"
+                )
+            next_flow = flowstore.get_flow_name_by_flow(flowgraph.start)
+
+        while next_flow != self.flow_name:
+            if self._closed:
+                raise SessionError("Pool closed")
+            if not isinstance(next_flow, str):
+                raise SessionError(
+                    "Cannot reach the "
+                    + self.flow_name
+                    + " flow. Make sure you defined Next correctly."
+                )
+            if not flowstore.is_flow(next_flow):
+                raise SessionError("Flow " + next_flow + " not defined")
+            next_flow = flowstore.run_flow(session.pconfig, next_flow)
+
+    def _release(self, session: Session) -> None:
+        """Makes the session ready to be checked out."""
+        with self._condition:
+            self._ready.append(session)
+            self._condition.notify()
+
+    def _drop(self) -> None:
+        """Removes a session which can't be used anymore."""
+        with self._condition:
+            self._alive -= 1
+            self._condition.notify_all()
+
+    @property
+    def ready(self) -> int:
+        """Returns the number of sessions ready to be checked out."""
+        with self._condition:
+            return len(self._ready)
@@ -0,0 +1,413 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Clustering of near-duplicate HTTP responses.
+"""
+
+import functools
+import hashlib
+import operator
+import re
+import sys
+import threading
+from array import array
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from raider.filters import strip_payloads
+from raider.results import ResultStore
+from raider.utils import colored_text
+
+# Parts of the body which change between otherwise identical responses
+DEFAULT_PATTERNS = (
+    # UUIDs
+    rb"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
+    rb"[0-9a-fA-F]{4}-[0-9a-fA-F]{12}",
+    # Hex and base64 tokens, like CSRF tokens and session IDs
+    rb"[A-Za-z0-9+/_-]{16,}={0,2}",
+    # Numbers, like timestamps and IDs
+    rb"\d+",
+)
+
+# Number of bits in a fingerprint
+FINGERPRINT_BITS = 64
+FINGERPRINT_MASK = (1 << FINGERPRINT_BITS) - 1
+
+# Tokens of the body used to calculate the fingerprint
+TOKEN_REGEX = re.compile(rb"\w+|[^\w\s]")
+
+# Bits of each counter in SPREAD_TABLE
+LANE_BITS = 32
+
+# Table spreading the 8 bits of a byte in separate counters, from the
+# highest bit, so adding the values counts how many times each bit is set
+SPREAD_TABLE = [
+    sum(((value >> (7 - bit)) & 1) << (LANE_BITS * bit) for bit in range(8))
+    for value in range(256)
+]
+LANE_MASK = (1 << LANE_BITS) - 1
+
+
+def normalize(
+    content: bytes,
+    payloads: Sequence[str] = (),
+    patterns: Sequence[re.Pattern] = (),
+) -> bytes:
+    """Removes the parts of the body which change between requests.
+
+    Args:
+      content:
+        The bytes with the response body.
+      payloads:
+        A list with the fuzzing strings, removed from the body.
+      patterns:
+        A list of compiled regular expressions. The matching parts of
+        the body are replaced by a placeholder.
+
+    Returns:
+      The normalized body.
+
+    """
+    content = strip_payloads(content, payloads)
+    for pattern in patterns:
+        content = pattern.sub(b"_", content)
+    return content
+
+
+def rotate(value: int, bits: int) -> int:
+    """Rotates a 64 bits integer to the left."""
+    return (
+        (value << bits) | (value >> (FINGERPRINT_BITS - bits))
+    ) & FINGERPRINT_MASK
+
+
+def simhash(content: bytes, shingle: int = 3) -> int:
+    """Returns the SimHash fingerprint of the content.
+
+    The content is split in tokens, and every sequence of ``shingle``
+    tokens is hashed. Each bit of the fingerprint is set if it's set in
+    most of the hashes, so similar contents get fingerprints differing
+    in a few bits only.
+
+    Each distinct token is hashed once, and the hash of a sequence is
+    made by XOR-ing the hashes of its tokens, rotated by their place in
+    the sequence.
+
+    Args:
+      content:
+        The bytes to fingerprint.
+      shingle:
+        An integer with the number of tokens hashed together.
+
+    Returns:
+      An integer with the 64 bits fingerprint.
+
+    """
+    tokens = TOKEN_REGEX.findall(content) or [b""]
+    hashes = {
+        token: int.from_bytes(
+            hashlib.blake2b(token, digest_size=8).digest(), "big"
+        )
+        for token in set(tokens)
+    }
+
+    shingle = min(shingle, len(tokens))
+    count = len(tokens) - shingle + 1
+    columns = []
+    for offset in range(shingle):
+        rotated = {
+            token: rotate(value, offset) for token, value in hashes.items()
+        }
+        columns.append(
+            map(rotated.__getitem__, tokens[offset : offset + count])
+        )
+    features = array(
+        "Q",
+        set(
+            functools.reduce(
+                lambda first, second: map(operator.xor, first, second),
+                columns,
+            )
+        ),
+    )
+    if sys.byteorder == "little":
+        features.byteswap()
+    digests = features.tobytes()
+    count = len(features)
+
+    # Count the hashes with each bit set, one byte of the hashes at a
+    # time, so the loops run in C instead of once per hash
+    fingerprint = 0
+    for byte in range(FINGERPRINT_BITS // 8):
+        totals = sum(map(SPREAD_TABLE.__getitem__, digests[byte::8]))
+        for bit in range(8):
+            fingerprint <<= 1
+            if ((totals >> (LANE_BITS * bit)) & LANE_MASK) * 2 > count:
+                fingerprint |= 1
+    return fingerprint
+
+
+def hamming(first: int, second: int) -> int:
+    """Returns the number of different bits between two fingerprints."""
+    return bin(first ^ second).count("1")
+
+
+class ResponseClusters:
+    """Class grouping near-duplicate responses.
+
+    Responses which differ only in CSRF tokens, timestamps or the
+    reflected fuzzing strings are put in the same cluster. The bodies
+    are normalized first, then each one gets a :func:`simhash`
+    fingerprint, and fingerprints differing in at most ``distance``
+    bits are clustered together.
+
+    To avoid comparing every pair of responses, the fingerprints are
+    split in ``bands``. Fingerprints within ``distance`` bits have at
+    least one identical band when ``bands`` is greater than
+    ``distance``, so only the fingerprints sharing a band are compared.
+    Identical fingerprints are only stored once, so the time grows
+    roughly linearly with the number of responses.
+
+    .. code-block:: python
+
+        clusters = ResponseClusters()
+        for position, response in enumerate(responses):
+            clusters.add(position, response.content)
+        for key, size in clusters.representatives():
+            print(key, size)
+
+    Attributes:
+      distance:
+        An integer with the maximum number of different bits between
+        fingerprints in the same cluster.
+      bands:
+        An integer with the number of bands the fingerprints are split
+        in.
+      patterns:
+        A list of compiled regular expressions with the parts of the
+        body to ignore.
+
+    """
+
+    def __init__(
+        self,
+        distance: int = 3,
+        bands: Optional[int] = None,
+        patterns: Sequence[bytes] = DEFAULT_PATTERNS,
+    ) -> None:
+        """Initializes the ResponseClusters object.
+
+        Args:
+          distance:
+            An integer with the maximum number of different bits
+            between fingerprints in the same cluster.
+          bands:
+            An optional integer with the number of bands. Uses
+            ``distance + 1`` if not set.
+          patterns:
+            A list of bytes with regular expressions matching the parts
+            of the body to ignore.
+
+        """
+        self.distance = distance
+        self.bands = bands or distance + 1
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+
+        self._width = FINGERPRINT_BITS // self.bands
+        self._buckets: Dict[Tuple[int, int], List[int]] = {}
+        self._parents: Dict[int, int] = {}
+        self._members: Dict[int, List[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, content: bytes, payloads: Sequence[str] = ()) -> int:
+        """Returns the fingerprint of the normalized body.
+
+        Args:
+          content:
+            The bytes with the response body.
+          payloads:
+            A list with the fuzzing strings sent in the request.
+
+        """
+        return simhash(normalize(content, payloads, self.patterns))
+
+    def add(
+        self, key: Hashable, content: bytes, payloads: Sequence[str] = ()
+    ) -> int:
+        """Adds a response to the clusters.
+
+        Args:
+          key:
+            The value identifying the response, like the position of
+            the fuzzing strings.
+          content:
+            The bytes with the response body.
+          payloads:
+            A list with the fuzzing strings sent in the request.
+
+        Returns:
+          An integer with the fingerprint of the response.
+
+        """
+        fingerprint = self.fingerprint(content, payloads)
+        self.add_fingerprint(key, fingerprint)
+        return fingerprint
+
+    def add_fingerprint(self, key: Hashable, fingerprint: int) -> None:
+        """Adds a response with an already calculated fingerprint.
+
+        Args:
+          key:
+            The value identifying the response.
+          fingerprint:
+            An integer with the :func:`simhash` fingerprint.
+
+        """
+        with self._lock:
+            if fingerprint not in self._parents:
+                self._parents[fingerprint] = fingerprint
+                self._members[fingerprint] = []
+                for band in self._bands(fingerprint):
+                    bucket = self._buckets.setdefault(band, [])
+                    for other in bucket:
+                        if hamming(fingerprint, other) <= self.distance:
+                            self._union(fingerprint, other)
+                    bucket.append(fingerprint)
+            self._members[fingerprint].append(key)
+
+    def _bands(self, fingerprint: int) -> List[Tuple[int, int]]:
+        """Returns the bands of the fingerprint with their index."""
+        mask = (1 << self._width) - 1
+        return [
+            (index, (fingerprint >> (index * self._width)) & mask)
+            for index in range(self.bands)
+        ]
+
+    def _find(self, fingerprint: int) -> int:
+        """Returns the fingerprint representing the cluster."""
+        root = fingerprint
+        while self._parents[root] != root:
+            root = self._parents[root]
+        while self._parents[fingerprint] != root:
+            self._parents[fingerprint], fingerprint = (
+                root,
+                self._parents[fingerprint],
+            )
+        return root
+
+    def _union(self, first: int, second: int) -> None:
+        """Merges the clusters of two fingerprints."""
+        first, second = self._find(first), self._find(second)
+        if first != second:
+            self._parents[second] = first
+
+    def clusters(self) -> List[List[Hashable]]:
+        """Returns the keys of the responses in each cluster.
+
+        Returns:
+          A list of clusters, each one a list with the keys in the
+          order they were added, starting with the largest cluster.
+
+        """
+        with self._lock:
+            groups: Dict[int, List[Hashable]] = {}
+            for fingerprint, keys in self._members.items():
+                groups.setdefault(self._find(fingerprint), []).extend(keys)
+        return sorted(groups.values(), key=len, reverse=True)
+
+    def representatives(self) -> List[Tuple[Any, int]]:
+        """Returns one response from each cluster.
+
+        Returns:
+          A list of tuples with the smallest key in each cluster, like
+          the position of the first response, and the size of the
+          cluster, starting with the smallest clusters, which are
+          usually the interesting ones.
+
+        """
+        return [(min(keys), len(keys)) for keys in reversed(self.clusters())]
+
+    def __len__(self) -> int:
+        """Returns the number of clusters."""
+        with self._lock:
+            return len({self._find(item) for item in self._members})
+
+
+def cluster_results(
+    store: ResultStore, run: Optional[int] = None, distance: int = 3
+) -> ResponseClusters:
+    """Clusters the fuzzing results with a recorded fingerprint.
+
+    Args:
+      store:
+        The :class:`ResultStore <raider.results.ResultStore>` with the
+        results.
+      run:
+        An optional integer with the ID of the run. The last one is
+        used if not set.
+      distance:
+        An integer with the maximum number of different bits between
+        fingerprints in the same cluster.
+
+    Returns:
+      The :class:`ResponseClusters` object with the results, using
+      their ``position`` as key.
+
+    """
+    clusters = ResponseClusters(distance)
+    for position, fingerprint in store.columns("position", "simhash", run=run):
+        if fingerprint:
+            clusters.add_fingerprint(position, int(fingerprint, 16))
+    return clusters
+
+
+def print_clusters(
+    clusters: ResponseClusters,
+    store: Optional[ResultStore] = None,
+    run: Optional[int] = None,
+) -> None:
+    """Prints one response from each cluster.
+
+    Args:
+      clusters:
+        The :class:`ResponseClusters` object, using the positions of
+        the fuzzing strings as keys.
+      store:
+        An optional :class:`ResultStore <raider.results.ResultStore>`
+        used to show the fuzzing strings and the status codes.
+      run:
+        An optional integer with the ID of the run in the ``store``.
+
+    """
+    print(
+        colored_text(
+            "{:>7} {:>9} {:>6}  {}".format(
+                "Size", "Position", "Status", "Payload"
+            ),
+            "BLUE-BLACK-B",
+        )
+    )
+    for position, size in clusters.representatives():
+        row = {}
+        if store:
+            rows = store.query("position = ?", (position,), limit=1, run=run)
+            row = rows[0] if rows else {}
+        print(
+            "{:>7} {:>9} {:>6}  {}".format(
+                size,
+                position,
+                str(row.get("status", "")),
+                row.get("payload", ""),
+            )
+        )
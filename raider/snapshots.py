@@ -0,0 +1,156 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Snapshots of the session state between Flows.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+from raider.flow import Flow
+from raider.plugins.common import Plugin
+from raider.projects import Project
+
+
+class Snapshot:
+    """Class holding the session state at a Flow boundary.
+
+    A snapshot captures everything the next Flows depend on: the
+    cookies, headers and data of the active :class:`User
+    <raider.user.User>`, the values of all :class:`Plugins
+    <raider.plugins.common.Plugin>` and the last response of each
+    :class:`Flow <raider.flow.Flow>`. Restoring it puts the project
+    back in this state, so several branches can start from the same
+    point without sending the previous requests again.
+
+    The user's stores aren't copied. The snapshot shares their
+    dictionaries, and the stores copy them before their next change,
+    so taking and restoring snapshots is cheap, and a snapshot can be
+    restored any number of times.
+
+    .. code-block:: python
+
+        next_flow = flowstore.run_flow(pconfig, "login")
+        snapshot = Snapshot.capture(project, next_flow)
+        for branch in ("mfa_sms", "mfa_totp"):
+            snapshot.restore(project)
+            flowstore.run_flow(pconfig, branch)
+
+    Only the state kept by Raider is restored. Server side state, like
+    one-time tokens which were already used, can't be restored.
+
+    Attributes:
+      next_flow:
+        An optional string with the name of the Flow to run after
+        restoring the snapshot.
+      username:
+        A string with the username of the active user.
+      cookies:
+        A dictionary with the user's cookies.
+      headers:
+        A dictionary with the user's headers.
+      data:
+        A dictionary with the rest of the user's data.
+      values:
+        A tuple with the Plugins, their names and their values.
+      responses:
+        A tuple with the Flows and their last response.
+
+    """
+
+    def __init__(
+        self,
+        next_flow: Optional[str],
+        username: str,
+        cookies: Dict[str, str],
+        headers: Dict[str, str],
+        data: Dict[str, Any],
+        values: Tuple[Tuple[Plugin, str, Optional[str]], ...],
+        responses: Tuple[Tuple[Flow, Optional[requests.Response]], ...],
+    ) -> None:
+        """Initializes the Snapshot object.
+
+        Use :meth:`capture` to take a snapshot of a project.
+
+        """
+        self.next_flow = next_flow
+        self.username = username
+        self.cookies = cookies
+        self.headers = headers
+        self.data = data
+        self.values = values
+        self.responses = responses
+
+    @classmethod
+    def capture(
+        cls, project: Project, next_flow: Optional[str] = None
+    ) -> "Snapshot":
+        """Takes a snapshot of the project's session state.
+
+        Args:
+          project:
+            The :class:`Project <raider.projects.Project>` whose state
+            is captured.
+          next_flow:
+            An optional string with the name of the Flow to run after
+            restoring the snapshot, usually the value returned by the
+            last Flow.
+
+        Returns:
+          The :class:`Snapshot` object.
+
+        """
+        user = project.pconfig.active_user
+        flowstore = project.flowstore
+        return cls(
+            next_flow,
+            user.username,
+            user.cookies.snapshot(),
+            user.headers.snapshot(),
+            user.data.snapshot(),
+            tuple(
+                (plugin, plugin.name, plugin.value)
+                for plugin in flowstore.plugins()
+            ),
+            tuple((flow, flow.response) for flow in flowstore.values),
+        )
+
+    def restore(self, project: Project) -> Optional[str]:
+        """Puts the project back in the state of the snapshot.
+
+        Args:
+          project:
+            The :class:`Project <raider.projects.Project>` the snapshot
+            was taken from.
+
+        Returns:
+          Optionally, a string with the name of the next Flow to run.
+
+        """
+        users = project.pconfig.users
+        if users is not None and hasattr(users, "active_user"):
+            users.active_user = self.username
+        user = project.pconfig.active_user
+        user.cookies.restore(self.cookies)
+        user.headers.restore(self.headers)
+        user.data.restore(self.data)
+
+        for plugin, name, value in self.values:
+            plugin.name = name
+            plugin.value = value
+        for flow, response in self.responses:
+            flow.response = response
+        return self.next_flow
@@ -19,11 +19,12 @@ from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import igraph
 
+from raider.cloning import Clonable
 from raider.plugins.basic.cookie import Cookie
 from raider.plugins.basic.header import Header
 
 
-class DataStore:
+class DataStore(Clonable):
     """Class defining a dictionary-like data structure.
 
     This class was created to hold information relevant to Raider in a
@@ -46,6 +47,8 @@ class DataStore:
             self._store = data
         else:
             self._store = {}
+        # True while the dictionary is shared with a snapshot
+        self._shared = False
 
     def __getitem__(self, key: Any) -> Any:
         """Getter to return an element with the key."""
@@ -55,6 +58,7 @@ class DataStore:
 
     def __setitem__(self, key: Any, value: Any) -> None:
         """Setter to add a new element to DataStore."""
+        self._own()
         self._store.update({key: value})
 
     def __iter__(self) -> Iterator[Any]:
@@ -74,12 +78,44 @@ class DataStore:
 
     def update(self, data: Dict[Any, Any]) -> None:
         """Updates the DataStore with a new element."""
+        self._own()
         self._store.update(data)
 
     def pop(self, name: Any) -> Any:
         """Pops an element from the DataStore."""
+        self._own()
         return self._store.pop(name)
 
+    def snapshot(self) -> Dict[Any, Any]:
+        """Returns the elements without copying them.
+
+        The dictionary is shared until the DataStore changes, and it's
+        copied before the first change, so taking a snapshot is cheap
+        and the snapshot never changes. The returned dictionary must
+        not be modified.
+
+        """
+        self._shared = True
+        return self._store
+
+    def restore(self, data: Dict[Any, Any]) -> None:
+        """Replaces the elements with the ones from a snapshot.
+
+        Args:
+          data:
+            A dictionary returned by :meth:`snapshot`. It's shared, and
+            copied before the first change.
+
+        """
+        self._store = data
+        self._shared = True
+
+    def _own(self) -> None:
+        """Copies the elements before a change if they're shared."""
+        if self._shared:
+            self._store = dict(self._store)
+            self._shared = False
+
     def keys(self) -> List[Any]:
         """Returns a list of the keys in the DataStore."""
         return list(self._store)
@@ -143,6 +179,7 @@ class HeaderStore(DataStore):
 
     def merge(self, headerstore: "HeaderStore") -> None:
         """Merge HeaderStore object with another one."""
+        self._own()
         for item in headerstore:
             self._store[item] = headerstore[item]
 
@@ -211,6 +248,7 @@ class CookieStore(DataStore):
 
     def merge(self, cookiestore: "CookieStore") -> None:
         """Merge CookieStore object with another one."""
+        self._own()
         for item in cookiestore:
             self._store[item] = cookiestore[item]
 
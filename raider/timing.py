@@ -0,0 +1,266 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Timing instrumentation for Flows, Plugins and Operations.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from raider.utils import colored_text
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    """Returns the percentile from a list of samples.
+
+    Args:
+      samples:
+        A list of floats with the measured values.
+      percent:
+        A float between 0 and 100 with the desired percentile.
+
+    Returns:
+      A float with the value at the given percentile, using the
+      nearest-rank method. Returns 0 if there are no samples.
+
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class Timings:
+    """Class collecting timing measurements.
+
+    When a :class:`Timings` object is set in the ``timings`` attribute
+    of the ProjectConfig, Raider will record how long each part of the
+    process took. The samples are grouped by a category and a name:
+
+    ``flowgraph``
+      Total time to run a :class:`FlowGraph
+      <raider.flowgraph.FlowGraph>`, by its name.
+    ``flow``
+      Total time to run a :class:`Flow <raider.flow.Flow>`, including
+      the request, the outputs and the operations, by its name.
+    ``request:total``
+      Time from sending the HTTP request until the whole response was
+      received, by the name of the :class:`Flow <raider.flow.Flow>`.
+    ``request:ttfb``
+      Time from sending the HTTP request until the response headers
+      were parsed, by the name of the :class:`Flow <raider.flow.Flow>`.
+      Includes the DNS lookup, connecting and the TLS handshake.
+    ``request:download``
+      Time spent reading the response body.
+    ``request:queue``
+      Time the request waited for the limits of the project's
+      :class:`RateLimiter <raider.limits.RateLimiter>`, by the name of
+      the :class:`Flow <raider.flow.Flow>`. Only recorded when limits
+      are set.
+    ``request:status``
+      Same as ``request:total``, but grouped by the response status
+      code instead of the :class:`Flow <raider.flow.Flow>`.
+    ``plugin:extract``
+      Time to extract an output :class:`Plugin
+      <raider.plugins.common.Plugin>` from the response, by its name.
+    ``plugin:get_value``
+      Time to get the value of an input :class:`Plugin
+      <raider.plugins.common.Plugin>`, by its name.
+    ``operation``
+      Time to run an :class:`Operation <raider.operations.Operation>`,
+      by its class name.
+
+    Attributes:
+      samples:
+        A dictionary mapping a (category, name) tuple to a list of
+        floats with the durations in seconds.
+      status_codes:
+        A dictionary mapping a (flow, status) tuple to the number of
+        responses received.
+
+    """
+
+    def __init__(self) -> None:
+        """Initializes the Timings object."""
+        self.samples: Dict[Tuple[str, str], List[float]] = {}
+        self.status_codes: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+        self._flow: contextvars.ContextVar[str] = contextvars.ContextVar(
+            "flow", default=""
+        )
+
+    @property
+    def flow(self) -> str:
+        """Returns the name of the Flow running in the current thread.
+
+        Stored in a context variable, so each thread and each asyncio
+        task sees its own value.
+
+        """
+        return self._flow.get()
+
+    @flow.setter
+    def flow(self, value: str) -> None:
+        self._flow.set(value)
+
+    def add(self, category: str, name: str, duration: float) -> None:
+        """Adds a new sample.
+
+        Args:
+          category:
+            A string with the category of the sample.
+          name:
+            A string with the name of the measured item.
+          duration:
+            A float with the duration in seconds.
+
+        """
+        with self._lock:
+            self.samples.setdefault((category, name), []).append(duration)
+
+    def add_request(
+        self, response: requests.models.Response, duration: float
+    ) -> None:
+        """Adds the samples for one HTTP request.
+
+        Args:
+          response:
+            The HTTP response received.
+          duration:
+            A float with the total duration in seconds.
+
+        """
+        ttfb = response.elapsed.total_seconds()
+        self.add("request:total", self.flow, duration)
+        self.add("request:ttfb", self.flow, ttfb)
+        self.add("request:download", self.flow, max(duration - ttfb, 0.0))
+        self.add("request:status", str(response.status_code), duration)
+        with self._lock:
+            key = (self.flow, response.status_code)
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+
+    @contextmanager
+    def measure(self, category: str, name: str) -> Iterator[None]:
+        """Context manager measuring the time spent inside it.
+
+        Args:
+          category:
+            A string with the category of the sample.
+          name:
+            A string with the name of the measured item.
+
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(category, name, time.perf_counter() - start)
+
+    def merge(self, other: "Timings") -> None:
+        """Adds all the samples from another :class:`Timings` object."""
+        with self._lock:
+            for key, values in other.samples.items():
+                self.samples.setdefault(key, []).extend(values)
+            for key, count in other.status_codes.items():
+                self.status_codes[key] = self.status_codes.get(key, 0) + count
+
+    def clear(self) -> None:
+        """Removes all the samples."""
+        with self._lock:
+            self.samples = {}
+            self.status_codes = {}
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Returns the aggregated samples.
+
+        Returns:
+          A list of dictionaries, one for each (category, name) pair,
+          with the number of samples, the total, mean, minimum,
+          maximum, and the 50th, 95th and 99th percentile of the
+          durations in seconds.
+
+        """
+        rows = []
+        with self._lock:
+            items = sorted(self.samples.items())
+        for (category, name), values in items:
+            rows.append(
+                {
+                    "category": category,
+                    "name": name,
+                    "count": len(values),
+                    "total": sum(values),
+                    "mean": sum(values) / len(values),
+                    "min": min(values),
+                    "max": max(values),
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "p99": percentile(values, 99),
+                }
+            )
+        return rows
+
+    def get(self, category: str, name: str) -> Optional[Dict[str, Any]]:
+        """Returns the aggregated samples for one item, or None."""
+        for row in self.summary():
+            if row["category"] == category and row["name"] == name:
+                return row
+        return None
+
+    def print_summary(self) -> None:
+        """Prints the aggregated samples in a table."""
+        header = "{:<18} {:<30} {:>7} {:>11} {:>11} {:>11} {:>11}".format(
+            "Category", "Name", "Count", "Total", "Mean", "Min", "Max"
+        )
+        print(colored_text(header, "BLUE-BLACK-B"))
+        for row in self.summary():
+            print(
+                "{:<18} {:<30} {:>7} {:>9.1f}ms {:>9.1f}ms {:>9.1f}ms "
+                "{:>9.1f}ms".format(
+                    row["category"],
+                    row["name"][:30],
+                    row["count"],
+                    row["total"] * 1000,
+                    row["mean"] * 1000,
+                    row["min"] * 1000,
+                    row["max"] * 1000,
+                )
+            )
+
+
+def measure(pconfig: Any, category: str, name: str) -> ContextManager[None]:
+    """Measures the time spent inside the context, if timings are enabled.
+
+    Args:
+      pconfig:
+        The ProjectConfig object. Nothing is measured unless its
+        ``timings`` attribute contains a :class:`Timings` object.
+      category:
+        A string with the category of the sample.
+      name:
+        A string with the name of the measured item.
+
+    """
+    timings = getattr(pconfig, "timings", None)
+    if timings:
+        return timings.measure(category, name)
+    return nullcontext()
@@ -0,0 +1,705 @@
+# Copyright (C) 2020-2022 DigeeX
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""HTTP transports used to send the requests.
+"""
+
+import asyncio
+import datetime
+import sys
+import time
+import urllib.parse
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, Dict, Optional
+
+import requests
+from requests.cookies import cookiejar_from_dict
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import InsecureRequestWarning
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+# Errors after which the request can be sent again
+RETRY_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class TransportError(requests.exceptions.RequestException):
+    """Raised when a request couldn't be sent, even after retrying.
+
+    Callers record it as the result of the request, instead of letting
+    one unreachable host end the whole run.
+
+    Attributes:
+      method:
+        A string with the HTTP method.
+      url:
+        A string with the URL.
+      attempts:
+        An integer with the number of times the request was sent.
+
+    """
+
+    def __init__(
+        self, method: str, url: str, attempts: int, error: Exception
+    ) -> None:
+        """Initializes the TransportError object."""
+        super().__init__(
+            "{} {} failed after {} attempt(s): {}".format(
+                method, url, attempts, error
+            )
+        )
+        self.method = method
+        self.url = url
+        self.attempts = attempts
+
+
+def retry_delay(
+    pconfig: Any, method: str, url: str, attempt: int, error: Exception
+) -> float:
+    """Handles a failed attempt to send a request.
+
+    Records the failure in the project's :class:`CircuitBreaker
+    <raider.retries.CircuitBreaker>`, and checks its :class:`RetryPolicy
+    <raider.retries.RetryPolicy>`.
+
+    Args:
+      pconfig:
+        The ProjectConfig object.
+      method:
+        A string with the HTTP method.
+      url:
+        A string with the URL.
+      attempt:
+        An integer with the number of the attempt which failed,
+        starting from 0.
+      error:
+        The exception raised by the attempt.
+
+    Returns:
+      A float with the number of seconds to wait before retrying.
+
+    Raises:
+      TransportError: When the request shouldn't be retried.
+
+    """
+    host = urllib.parse.urlsplit(url).netloc
+    if pconfig.breaker.failure(host):
+        pconfig.logger.warning(
+            "Too many failures from %s, pausing it for %ss",
+            host,
+            pconfig.breaker.reset_timeout,
+        )
+    if not pconfig.retry_policy.should_retry(method, attempt):
+        raise TransportError(method, url, attempt + 1, error) from error
+    delay = pconfig.retry_policy.delay(attempt)
+    pconfig.logger.warning(
+        "%s %s failed (%s), retrying in %.1fs", method, url, error, delay
+    )
+    return delay
+
+
+def to_requests_exception(error: Exception) -> Exception:
+    """Converts a httpx exception into a requests exception.
+
+    The retries are decided on requests exceptions, so the errors from
+    the httpx transports are converted first.
+
+    """
+    if isinstance(error, httpx.ProxyError):
+        return requests.exceptions.ProxyError(str(error))
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.exceptions.ConnectTimeout(str(error))
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.ReadTimeout(str(error))
+    if isinstance(error, httpx.RemoteProtocolError):
+        return requests.exceptions.ChunkedEncodingError(str(error))
+    return requests.exceptions.ConnectionError(str(error))
+
+
+def httpx_timeout(pconfig: Any) -> Any:
+    """Returns the project's timeouts as a httpx.Timeout object."""
+    connect, read = pconfig.timeout
+    return httpx.Timeout(read, connect=connect)
+
+
+def to_requests_response(
+    response: Any, ttfb: Optional[float] = None
+) -> requests.models.Response:
+    """Converts a httpx response into a requests response.
+
+    Plugins and Operations expect the :class:`requests.models.Response`
+    interface, so responses received with other HTTP clients are
+    converted before being used.
+
+    Args:
+      response:
+        A httpx.Response object with the body already read.
+      ttfb:
+        An optional float with the number of seconds until the
+        response headers were received. Used as the ``elapsed``
+        attribute, same as requests does.
+
+    Returns:
+      A requests.models.Response object with the same data.
+
+    """
+    converted = requests.models.Response()
+    converted.status_code = response.status_code
+    converted.reason = response.reason_phrase
+    converted.url = str(response.url)
+    converted.encoding = response.encoding
+    converted.headers = CaseInsensitiveDict(response.headers.items())
+    converted.cookies = cookiejar_from_dict(dict(response.cookies))
+    # pylint: disable=protected-access
+    converted._content = response.content
+    if ttfb is None:
+        converted.elapsed = response.elapsed
+    else:
+        converted.elapsed = datetime.timedelta(seconds=ttfb)
+    return converted
+
+
+def cookie_header(
+    headers: Dict[str, str], cookies: Dict[str, str]
+) -> Dict[str, str]:
+    """Returns the headers with the cookies added in a Cookie header.
+
+    Args:
+      headers:
+        A dictionary with the request headers.
+      cookies:
+        A dictionary with the cookies to send.
+
+    Returns:
+      A new dictionary with the headers.
+
+    """
+    headers = dict(headers)
+    if cookies:
+        cookie = "; ".join(key + "=" + value for key, value in cookies.items())
+        existing = headers.pop("Cookie", headers.pop("cookie", None))
+        if existing:
+            cookie = existing + "; " + cookie
+        headers["Cookie"] = cookie
+    return headers
+
+
+def blocked_cookie_jar() -> CookieJar:
+    """Returns a cookie jar which never stores any cookies.
+
+    Raider manages the cookies itself with the :class:`User
+    <raider.user.User>` objects, so the HTTP clients must not remember
+    the cookies they receive, otherwise they would leak between users.
+
+    """
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+def httpx_arguments(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts the arguments from requests format to httpx format.
+
+    Args:
+      kwargs:
+        A dictionary with the ``params``, ``data``, ``json`` and
+        ``files`` as returned by :meth:`Request.prepare
+        <raider.request.Request.prepare>`.
+
+    Returns:
+      A dictionary with the arguments for httpx, without empty ones.
+
+    """
+    arguments = {
+        key: value for key, value in kwargs.items() if value is not None
+    }
+    if isinstance(arguments.get("data"), (str, bytes)):
+        arguments["content"] = arguments.pop("data")
+    return arguments
+
+
+class Transport:
+    """Parent class for the transports sending the HTTP requests.
+
+    Each :class:`ProjectConfig <raider.projects.ProjectConfig>` creates
+    one transport the first time a request is sent, and all Flows of
+    the project share its connections. The transport is chosen with the
+    ``_transport`` variable in the :term:`hyfiles`:
+
+    .. code-block:: hylang
+
+        (setv _transport "http2")
+
+    The available transports are listed in :data:`TRANSPORTS`.
+
+    Attributes:
+      pconfig:
+        The ProjectConfig object with the proxy and the SSL settings.
+
+    """
+
+    def __init__(self, pconfig: Any) -> None:
+        """Initializes the Transport object.
+
+        Args:
+          pconfig:
+            The ProjectConfig object with the proxy and the SSL
+            settings.
+
+        """
+        self.pconfig = pconfig
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        **kwargs: Any,
+    ) -> requests.models.Response:
+        """Sends one HTTP request.
+
+        Waits for the limits set in the project's :class:`RateLimiter
+        <raider.limits.RateLimiter>` before sending it. Connection
+        errors and timeouts are retried following the project's
+        :class:`RetryPolicy <raider.retries.RetryPolicy>`, and hosts
+        failing repeatedly are paused by its :class:`CircuitBreaker
+        <raider.retries.CircuitBreaker>`.
+
+        Args:
+          method:
+            A string with the HTTP method.
+          url:
+            A string with the URL.
+          headers:
+            A dictionary with the request headers.
+          cookies:
+            A dictionary with the request cookies.
+          **kwargs:
+            The ``params``, ``data``, ``json`` and ``files`` as
+            returned by :meth:`Request.prepare
+            <raider.request.Request.prepare>`.
+
+        Returns:
+          A requests.models.Response object with the HTTP response.
+
+        Raises:
+          TransportError: When the request failed and can't be retried.
+
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        breaker = self.pconfig.breaker
+        attempt = 0
+        while True:
+            pause = breaker.delay(host)
+            if pause:
+                time.sleep(pause)
+            try:
+                response = self._limited_send(
+                    method, url, headers, cookies, **kwargs
+                )
+            except RETRY_ERRORS as err:
+                delay = retry_delay(self.pconfig, method, url, attempt, err)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            breaker.success(host)
+            return response
+
+    def _limited_send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        **kwargs: Any,
+    ) -> requests.models.Response:
+        """Waits for the rate limits and sends the HTTP request."""
+        limiter = getattr(self.pconfig, "limiter", None)
+        if not limiter:
+            return self._send(method, url, headers, cookies, **kwargs)
+        with limiter.limit(url, self.pconfig):
+            return self._send(method, url, headers, cookies, **kwargs)
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        **kwargs: Any,
+    ) -> requests.models.Response:
+        """Sends the HTTP request, implemented by each transport."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Closes the connections."""
+
+
+class RequestsTransport(Transport):
+    """Transport sending HTTP/1.1 requests with requests.
+
+    This is the default transport. Connections are kept alive between
+    requests to the same host.
+
+    Attributes:
+      session:
+        The requests.Session object sending the requests.
+
+    """
+
+    def __init__(self, pconfig: Any) -> None:
+        """Initializes the RequestsTransport object.
+
+        Args:
+          pconfig:
+            The ProjectConfig object with the proxy and the SSL
+            settings.
+
+        """
+        super().__init__(pconfig)
+        if not pconfig.verify:
+            # False positive
+            # pylint: disable=no-member
+            requests.packages.urllib3.disable_warnings(
+                category=InsecureRequestWarning
+            )
+
+        self.session = requests.Session()
+        self.session.cookies = requests.cookies.RequestsCookieJar(
+            policy=DefaultCookiePolicy(allowed_domains=[])
+        )
+        self.session.verify = pconfig.verify
+        if pconfig.use_proxy:
+            self.session.proxies = {"all": pconfig.proxy}
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        **kwargs: Any,
+    ) -> requests.models.Response:
+        """Sends one HTTP request. See :meth:`Transport.send`."""
+        return self.session.request(
+            method,
+            url,
+            headers=headers,
+            cookies=cookies,
+            allow_redirects=False,
+            timeout=self.pconfig.timeout,
+            **kwargs,
+        )
+
+    def close(self) -> None:
+        """Closes the connections."""
+        self.session.close()
+
+
+class HttpxTransport(Transport):
+    """Transport sending requests with httpx.
+
+    With ``http2`` enabled, the requests to the same host are
+    multiplexed as concurrent streams on a single connection, when the
+    server supports HTTP/2. Otherwise it falls back to HTTP/1.1.
+
+    Requires the ``httpx`` package, and ``h2`` for HTTP/2, installed
+    with ``pip install raider[http2]``.
+
+    Attributes:
+      client:
+        The httpx.Client object sending the requests.
+
+    """
+
+    def __init__(self, pconfig: Any, http2: bool = False) -> None:
+        """Initializes the HttpxTransport object.
+
+        Args:
+          pconfig:
+            The ProjectConfig object with the proxy and the SSL
+            settings.
+          http2:
+            A boolean, if True HTTP/2 will be negotiated.
+
+        """
+        super().__init__(pconfig)
+        if not httpx:
+            pconfig.logger.critical(
+                "httpx is needed for this transport. "
+                "Install it with: pip install raider[http2]"
+            )
+            sys.exit()
+
+        try:
+            self.client = httpx.Client(
+                http2=http2,
+                verify=pconfig.verify,
+                proxy=pconfig.proxy if pconfig.use_proxy else None,
+                follow_redirects=False,
+                timeout=None,
+                cookies=blocked_cookie_jar(),
+            )
+        except ImportError:
+            pconfig.logger.critical(
+                "h2 is needed for HTTP/2. "
+                "Install it with: pip install raider[http2]"
+            )
+            sys.exit()
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        **kwargs: Any,
+    ) -> requests.models.Response:
+        """Sends one HTTP request. See :meth:`Transport.send`."""
+        request = self.client.build_request(
+            method,
+            url,
+            headers=cookie_header(headers, cookies),
+            timeout=httpx_timeout(self.pconfig),
+            **httpx_arguments(kwargs),
+        )
+        start = time.perf_counter()
+        try:
+            response = self.client.send(request, stream=True)
+            ttfb = time.perf_counter() - start
+            try:
+                response.read()
+            finally:
+                response.close()
+        except httpx.TransportError as err:
+            raise to_requests_exception(err) from err
+        return to_requests_response(response, ttfb)
+
+    def close(self) -> None:
+        """Closes the connections."""
+        self.client.close()
+
+
+class Http2Transport(HttpxTransport):
+    """Transport sending HTTP/2 requests with httpx."""
+
+    def __init__(self, pconfig: Any) -> None:
+        """Initializes the Http2Transport object."""
+        super().__init__(pconfig, http2=True)
+
+
+# Transports which can be set with the "_transport" variable
+TRANSPORTS = {
+    "requests": RequestsTransport,
+    "httpx": HttpxTransport,
+    "http2": Http2Transport,
+}
+
+
+def get_transport(pconfig: Any) -> Transport:
+    """Creates the transport selected in the project.
+
+    Args:
+      pconfig:
+        The ProjectConfig object, with the name of the transport in its
+        ``transport_name`` attribute.
+
+    Returns:
+      A new :class:`Transport` object.
+
+    """
+    name = getattr(pconfig, "transport_name", "requests")
+    if name not in TRANSPORTS:
+        pconfig.logger.critical(
+            "Unknown transport %s, use one of: %s",
+            name,
+            ", ".join(TRANSPORTS),
+        )
+        sys.exit()
+    return TRANSPORTS[name](pconfig)
+
+
+class AsyncTransport:
+    """Class sending HTTP requests with asyncio.
+
+    Uses a httpx.AsyncClient, so thousands of requests can be in flight
+    on the same event loop, sharing a connection pool. Responses are
+    converted to :class:`requests.models.Response` objects, so the
+    Plugins and Operations work the same as with the blocking API.
+
+    Requires the ``httpx`` package, installed with ``pip install
+    raider[async]``. When the project uses the ``http2`` transport,
+    HTTP/2 is negotiated as well.
+
+    Attributes:
+      pconfig:
+        The ProjectConfig object with the proxy and the SSL settings.
+      client:
+        The httpx.AsyncClient object sending the requests.
+
+    """
+
+    def __init__(self, pconfig: Any, max_connections: int = 100) -> None:
+        """Initializes the AsyncTransport object.
+
+        Args:
+          pconfig:
+            The ProjectConfig object with the proxy and the SSL
+            settings.
+          max_connections:
+            An integer with the maximum number of open connections.
+
+        """
+        if not httpx:
+            pconfig.logger.critical(
+                "httpx is needed for the asyncio transport. "
+                "Install it with: pip install raider[async]"
+            )
+            sys.exit()
+
+        self.pconfig = pconfig
+        try:
+            self.client = httpx.AsyncClient(
+                http2=getattr(pconfig, "transport_name", None) == "http2",
+                verify=pconfig.verify,
+                proxy=pconfig.proxy if pconfig.use_proxy else None,
+                follow_redirects=False,
+                timeout=None,
+                limits=httpx.Limits(max_connections=max_connections),
+                cookies=blocked_cookie_jar(),
+            )
+        except ImportError:
+            pconfig.logger.critical(
+                "h2 is needed for HTTP/2. "
+                "Install it with: pip install raider[http2]"
+            )
+            sys.exit()
+
+    async def send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        **kwargs: Any,
+    ) -> requests.models.Response:
+        """Sends one HTTP request.
+
+        Waits for the limits set in the project's :class:`RateLimiter
+        <raider.limits.RateLimiter>` before sending it. Connection
+        errors and timeouts are retried following the project's
+        :class:`RetryPolicy <raider.retries.RetryPolicy>`, and hosts
+        failing repeatedly are paused by its :class:`CircuitBreaker
+        <raider.retries.CircuitBreaker>`.
+
+        Args:
+          method:
+            A string with the HTTP method.
+          url:
+            A string with the URL.
+          headers:
+            A dictionary with the request headers.
+          cookies:
+            A dictionary with the request cookies.
+          **kwargs:
+            The ``params``, ``data``, ``json`` and ``files`` as
+            returned by :meth:`Request.prepare
+            <raider.request.Request.prepare>`.
+
+        Returns:
+          A requests.models.Response object with the HTTP response.
+
+        Raises:
+          TransportError: When the request failed and can't be retried.
+
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        breaker = self.pconfig.breaker
+        attempt = 0
+        while True:
+            pause = breaker.delay(host)
+            if pause:
+                await asyncio.sleep(pause)
+            try:
+                response = await self._limited_send(
+                    method, url, headers, cookies, **kwargs
+                )
+            except RETRY_ERRORS as err:
+                delay = retry_delay(self.pconfig, method, url, attempt, err)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            breaker.success(host)
+            return response
+
+    async def _limited_send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        **kwargs: Any,
+    ) -> requests.models.Response:
+        """Waits for the rate limits and sends the HTTP request."""
+        limiter = getattr(self.pconfig, "limiter", None)
+        if not limiter:
+            return await self._send(method, url, headers, cookies, **kwargs)
+        async with limiter.async_limit(url, self.pconfig):
+            return await self._send(method, url, headers, cookies, **kwargs)
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        **kwargs: Any,
+    ) -> requests.models.Response:
+        """Sends the HTTP request. See :meth:`send`."""
+        request = self.client.build_request(
+            method,
+            url,
+            headers=cookie_header(headers, cookies),
+            timeout=httpx_timeout(self.pconfig),
+            **httpx_arguments(kwargs),
+        )
+        start = time.perf_counter()
+        try:
+            response = await self.client.send(request, stream=True)
+            ttfb = time.perf_counter() - start
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+        except httpx.TransportError as err:
+            raise to_requests_exception(err) from err
+        return to_requests_response(response, ttfb)
+
+    async def close(self) -> None:
+        """Closes the connections."""
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncTransport":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
@@ -16,8 +16,13 @@
 """Classes used for handling users.
 """
 
-
-from typing import Dict, List
+import csv
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
 
 import hy
 
@@ -286,3 +291,279 @@ class Users(DataStore):
     def active(self) -> User:
         """Returns the active :class:`User` as an :class:`Users` object."""
         return self[self.active_user]
+
+
+class UserPool:
+    """Class holding a large number of users in a SQLite database.
+
+    Unlike :class:`Users`, which creates every :class:`User` when the
+    :term:`hyfiles` are evaluated, :class:`UserPool` keeps the
+    credentials in a SQLite database indexed by ``username``, and
+    creates the :class:`User` objects only when they're needed. Use it
+    when testing with thousands of accounts:
+
+    .. code-block:: hylang
+
+        (setv users (UserPool "/path/to/credentials.csv"))
+
+    CSV files are expected to have the ``username`` and ``password``
+    in the first two columns. The other columns become the user's
+    ``data`` if the CSV has a header row starting with
+    ``username,password``. The CSV file is imported into a SQLite
+    database next to it (with the ``.db`` extension added), and this
+    database is rebuilt only when the CSV file changes. SQLite files
+    can also be used directly.
+
+    The results of running :class:`FlowGraphs
+    <raider.flowgraph.FlowGraph>` for each user are stored in the same
+    database, so interrupted runs can continue where they stopped.
+
+    Attributes:
+      filename:
+        A string with the path to the SQLite database.
+      active_user:
+        A string with the ``username`` attribute of the currently
+        active :class:`User`.
+      cache_size:
+        An integer with the maximum number of :class:`User` objects
+        kept in memory.
+
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        active_user: Optional[str] = None,
+        cache_size: int = 128,
+    ) -> None:
+        """Initializes the :class:`UserPool` object.
+
+        Args:
+          filename:
+            A string with the path to the CSV file or the SQLite
+            database with the users.
+          active_user:
+            An optional string specifying the default :class:`User`.
+            The first user in the database is used if not set.
+          cache_size:
+            An integer with the maximum number of :class:`User`
+            objects kept in memory.
+
+        """
+        filename = os.path.expanduser(filename)
+        if filename.endswith(".csv"):
+            self.filename = filename + ".db"
+        else:
+            self.filename = filename
+
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, User]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.filename, check_same_thread=False
+        )
+        self._create_tables()
+
+        if filename.endswith(".csv"):
+            self._import_csv(filename)
+
+        if active_user:
+            self.active_user = active_user
+        else:
+            self.active_user = self._first_username()
+
+    def _create_tables(self) -> None:
+        """Creates the database tables if they don't exist."""
+        with self._lock, self._connection:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    password TEXT,
+                    data TEXT
+                );
+                CREATE TABLE IF NOT EXISTS results (
+                    username TEXT PRIMARY KEY,
+                    result TEXT
+                );
+                CREATE TABLE IF NOT EXISTS metadata (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                """
+            )
+
+    def _import_csv(self, filename: str) -> None:
+        """Imports users from a CSV file.
+
+        The import is skipped if the file didn't change since the last
+        time it was imported.
+
+        Args:
+          filename:
+            A string with the path to the CSV file.
+
+        """
+        mtime = str(os.path.getmtime(filename))
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM metadata WHERE key = 'source_mtime'"
+            ).fetchone()
+        if row and row[0] == mtime:
+            return
+
+        def read_rows() -> Iterator[List[Optional[str]]]:
+            with open(filename, encoding="utf-8", newline="") as csvfile:
+                reader = csv.reader(csvfile)
+                fields: List[str] = []
+                for line in reader:
+                    if not line:
+                        continue
+                    if not fields and line[:2] == ["username", "password"]:
+                        fields = line[2:]
+                        continue
+                    data = dict(zip(fields, line[2:]))
+                    password = line[1] if len(line) > 1 else ""
+                    yield [line[0], password, json.dumps(data)]
+
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM users")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO users VALUES (?, ?, ?)", read_rows()
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO metadata VALUES ('source_mtime', ?)",
+                (mtime,),
+            )
+
+    def _first_username(self) -> Optional[str]:
+        """Returns the ``username`` of the first user in the database."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT username FROM users ORDER BY rowid LIMIT 1"
+            ).fetchone()
+        if row:
+            return row[0]
+        return None
+
+    def __getitem__(self, username: str) -> Optional[User]:
+        """Returns the :class:`User` with the given ``username``.
+
+        Recently used :class:`User` objects are kept in memory, so
+        their session data survives between calls.
+
+        """
+        with self._lock:
+            user = self._cache.get(username)
+            if user:
+                self._cache.move_to_end(username)
+                return user
+
+            row = self._connection.execute(
+                "SELECT password, data FROM users WHERE username = ?",
+                (username,),
+            ).fetchone()
+            if not row:
+                return None
+
+            user = User(
+                username, row[0], **{"data": json.loads(row[1] or "{}")}
+            )
+            self._cache[username] = user
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return user
+
+    def cached(self) -> List[str]:
+        """Returns the usernames of the :class:`User` objects in memory."""
+        with self._lock:
+            return list(self._cache)
+
+    def __contains__(self, username: str) -> bool:
+        """Returns True if the ``username`` exists in the database."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM users WHERE username = ?", (username,)
+            ).fetchone()
+        return bool(row)
+
+    def __len__(self) -> int:
+        """Returns the number of users in the database."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM users"
+            ).fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterator to yield the usernames."""
+        return self.shard(0, 1)
+
+    def shard(
+        self, index: int, count: int, pending: bool = False
+    ) -> Iterator[str]:
+        """Yields the usernames belonging to one shard.
+
+        Users are split in ``count`` shards by their position in the
+        database, so different processes can work on different users
+        without coordinating.
+
+        Args:
+          index:
+            An integer with the index of the shard, starting from 0.
+          count:
+            An integer with the total number of shards.
+          pending:
+            A boolean which when True will skip the users that already
+            have a result recorded.
+
+        """
+        query = "SELECT rowid, username FROM users WHERE (rowid - 1) % ? = ?"
+        if pending:
+            query += " AND username NOT IN (SELECT username FROM results)"
+        query += " AND rowid > ? ORDER BY rowid LIMIT 1000"
+
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    query, (count, index, last_rowid)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, username in rows:
+                last_rowid = rowid
+                yield username
+
+    def record(self, username: str, result: str) -> None:
+        """Records the result of running a FlowGraph for the user.
+
+        Args:
+          username:
+            A string with the ``username``.
+          result:
+            A string with the result.
+
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?)",
+                (username, result),
+            )
+
+    def results(self) -> Dict[str, int]:
+        """Returns the number of users grouped by the recorded result."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT result, COUNT(*) FROM results GROUP BY result"
+            ).fetchall()
+        return dict(rows)
+
+    def clear_results(self) -> None:
+        """Removes all recorded results."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM results")
+
+    @property
+    def active(self) -> Optional[User]:
+        """Returns the active :class:`User`."""
+        return self[self.active_user]
@@ -20,7 +20,7 @@ import logging
 import os
 import re
 import sys
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Set, Union
 
 import bs4
 import hy
@@ -45,6 +45,24 @@ colors = {
     "RESET": "\x1b[0m",
 }
 
+# Local variables of eval_file, eval_project_file and
+# import_raider_objects, which end up in the returned locals() but
+# aren't defined by the hyfiles
+EVAL_VARIABLES = frozenset(
+    (
+        "classes",
+        "expr",
+        "file_path",
+        "filename",
+        "hy_imports",
+        "hyfile",
+        "module",
+        "project",
+        "raider_objects",
+        "shared_locals",
+    )
+)
+
 
 def colored_text(text: str, color: str):
     return colors[color] + text + colors['RESET']
@@ -160,7 +178,7 @@ def import_raider_objects() -> Dict[str, Any]:
         "plugins": "*",
         "flow": "Flow",
         "flowgraph": "FlowGraph",
-        "user": "Users",
+        "user": ("Users " "UserPool "),
         "request": ("Request " "Template "),
         "operations": (
             "Http "
@@ -396,24 +414,74 @@ def eval_project_file(
     return shared_locals
 
 
-def list_projects() -> List[str]:
+def hyfile_symbols(filename: str) -> Set[str]:
+    """Returns the names used in a hy file.
+
+    Reads the file without evaluating it, and collects the symbols, so
+    the variables a hyfile depends on can be found. Only the first part
+    of dotted names is kept, and the names are mangled like Python
+    identifiers, as they're stored in the locals() of the evaluated
+    files.
+
+    Args:
+      filename:
+        A string with the path of the hy file.
+
+    Returns:
+      A set with the mangled names of all symbols in the file.
+
+    """
+    models = []
+    with open(filename, encoding="utf-8") as hyfile:
+        try:
+            while True:
+                models.append(hy.read(hyfile))
+        except EOFError:
+            pass
+
+    symbols = set()
+    while models:
+        model = models.pop()
+        if isinstance(model, hy.models.Symbol):
+            name = str(model).split(".")[0]
+            if name:
+                symbols.add(hy.mangle(name))
+        elif isinstance(model, hy.models.Sequence):
+            models.extend(model)
+    return symbols
+
+
+# Project names, listed once per process by list_projects
+_projects: Optional[List[str]] = None
+
+
+def list_projects(refresh: bool = False) -> List[str]:
     """List existing projects.
 
     This function returns the list of projects that have been
-    configured in Raider.
+    configured in Raider. The projects directory is only listed the
+    first time, and the names are cached for the life of the process.
+
+    Args:
+      refresh:
+        A boolean, True to list the projects directory again, for
+        example in long-lived processes.
 
     Returns:
       A list with the strings of the project found in the
       configuration directory.
 
     """
-    projects = []
-    projectdir = os.path.join(get_config_dir(), "projects")
-    os.makedirs(projectdir, exist_ok=True)
-    for filename in os.listdir(projectdir):
-        if not filename[0] == "_":
-            projects.append(filename)
-    return projects
+    global _projects  # pylint: disable=global-statement
+    if _projects is None or refresh:
+        projects = []
+        projectdir = os.path.join(get_config_dir(), "projects")
+        os.makedirs(projectdir, exist_ok=True)
+        for filename in os.listdir(projectdir):
+            if not filename[0] == "_":
+                projects.append(filename)
+        _projects = projects
+    return list(_projects)
 
 
 def list_hyfiles(project: str) -> List[str]:
@@ -0,0 +1,27 @@
+from raider.checkpoint import Checkpoint
+
+
+def test_pending_resends_failed(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    with checkpoint.completing(1, failed=True):
+        pass
+    with checkpoint.completing(2):
+        pass
+
+    pending = [index for index, _ in checkpoint.pending("abcd")]
+
+    assert pending == [0, 1, 3]
+
+
+def test_pending_resends_failed_before_offset(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    for index in range(3):
+        with checkpoint.completing(index, failed=index == 1):
+            pass
+    checkpoint.save()
+
+    checkpoint = Checkpoint.load(checkpoint.filename)
+    pending = [index for index, _ in checkpoint.pending("abcd")]
+
+    assert checkpoint.offset == 3
+    assert pending == [1, 3]
@@ -0,0 +1,47 @@
+import raider.projects
+from raider.config import Config
+from raider.flow import Flow
+from raider.flowgraph import FlowGraph
+from raider.load import LoadTest
+from raider.plugins.basic.header import Header
+from raider.plugins.basic.variable import Variable
+from raider.request import Request
+
+
+def eval_project_file(project, filename, shared_locals):
+    token = Variable("token")
+    login = Flow(
+        Request.get("http://localhost/", headers=[Header.bearerauth(token)])
+    )
+    return {
+        **(shared_locals or {}),
+        "token": token,
+        "login": login,
+        "auth": FlowGraph(login),
+    }
+
+
+def test_virtual_users_have_own_tokens(tmp_path, monkeypatch):
+    project_dir = tmp_path / "projects" / "demo"
+    project_dir.mkdir(parents=True)
+    (project_dir / "01_main.hy").write_text("")
+    monkeypatch.setenv("RAIDERPATH", str(tmp_path))
+    monkeypatch.setattr(
+        raider.projects, "eval_project_file", eval_project_file
+    )
+    projects = []
+    monkeypatch.setattr(
+        LoadTest,
+        "virtual_user",
+        lambda self, index, delay, project: projects.append(project),
+    )
+
+    LoadTest(Config(), "demo", "auth", users=2).run()
+
+    headers = []
+    for number, project in enumerate(projects):
+        project.shared_locals["token"].value = "token" + str(number)
+        header = project.flowstore["login"].request.headers.values()[0]
+        headers.append(header.get_value(project.pconfig))
+    assert headers == ["Bearer token0", "Bearer token1"]
+    assert projects[0].pconfig.limiter is projects[1].pconfig.limiter
@@ -0,0 +1,42 @@
+import threading
+
+from raider.results import ResultStore
+
+
+def call_with_timeout(function, timeout=5):
+    """Runs the function in a thread, failing if it doesn't return."""
+    output = {}
+    thread = threading.Thread(
+        target=lambda: output.update(value=function()), daemon=True
+    )
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "deadlocked"
+    return output["value"]
+
+
+def make_store(path):
+    store = ResultStore(str(path))
+    store.start_run("login", ["password"])
+    store.record(0, "a", latency=0.1)
+    store.record(1, "b", latency=0.3, error="timeout")
+    store.close()
+    # Opened again, so the last run isn't the current one
+    return ResultStore(str(path))
+
+
+def test_group_by_last_run(tmp_path):
+    store = make_store(tmp_path / "results.db")
+    assert store.run is None
+
+    groups = call_with_timeout(lambda: store.group_by("status", "length"))
+
+    assert groups == [(None, None, 2, 0.2)]
+
+
+def test_columns_last_run(tmp_path):
+    store = make_store(tmp_path / "results.db")
+
+    rows = call_with_timeout(lambda: store.columns("payload", "error"))
+
+    assert rows == [("a", None), ("b", "timeout")]